@@ -0,0 +1,67 @@
+"""
+زمان رسم چرخ نقشه تولد (utils.chart) روی یک هسته
+
+لایه ثابت و glyph ها قبل از اندازه‌گیری یک بار ساخته می‌شوند؛ سپس برای
+تاریخ‌های تصادفی زمان رسم لایه سیاره‌ها و زمان کامل تا PNG اندازه‌گیری و با
+رسم کامل چرخ از صفر مقایسه می‌شود. هدف: کمتر از ۲۰ میلی‌ثانیه برای هر چرخ.
+
+اجرا: python -m benchmarks.bench_chart [تعداد] [اندازه]
+"""
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from utils import astro, chart
+
+TARGET_MS = 20.0
+
+
+def _percentiles(samples) -> tuple:
+    ms = np.array(samples) * 1000
+    return float(np.median(ms)), float(np.percentile(ms, 95)), float(ms.max())
+
+
+def _measure(func, rows) -> tuple:
+    samples = []
+    for row in rows:
+        start = time.perf_counter()
+        func(row)
+        samples.append(time.perf_counter() - start)
+    return _percentiles(samples)
+
+
+def main(n: int = 200, size: int = chart.SIZE):
+    rng = np.random.default_rng(1)
+    dates = [date(1940, 1, 1) + timedelta(days=int(d)) for d in rng.integers(0, 30000, n)]
+    positions = astro.get_positions_batch(dates)
+
+    start = time.perf_counter()
+    chart.prepare(size)
+    prepare_ms = (time.perf_counter() - start) * 1000
+
+    def cold(row):
+        # بدون لایه ثابت کش شده: هر بار چرخ از صفر رسم می‌شود
+        chart._wheels.clear()
+        chart.render(row, size)
+
+    results = {
+        "planet layer": _measure(lambda row: chart.render(row, size), positions),
+        "layer + png": _measure(lambda row: chart.to_png(row, size), positions),
+        "collision levels": _measure(lambda row: chart.collision_levels(row[:, 0]), positions),
+        "no wheel cache": _measure(cold, positions[: max(1, n // 10)]),
+    }
+    chart.prepare(size)
+
+    print(f"{n} چرخ {size}x{size}، آماده‌سازی لایه ثابت: {prepare_ms:.1f} ms")
+    print(f"{'step':18} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for name, (p50, p95, worst) in results.items():
+        print(f"{name:18} {p50:8.2f} {p95:8.2f} {worst:8.2f}")
+    p95 = results["layer + png"][1]
+    print(f"هدف {TARGET_MS:.0f} ms: {'✔' if p95 < TARGET_MS else '✘'} (p95 = {p95:.2f} ms)")
+    return results
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,87 @@
+"""
+مقایسه سرعت utils.jalali با persiantools
+
+اجرا: python -m benchmarks.bench_jalali
+"""
+import time
+import random
+
+import numpy as np
+from persiantools.jdatetime import JalaliDate
+
+from utils import jalali
+
+
+def _dates(n: int, seed: int = 1):
+    rnd = random.Random(seed)
+    out = []
+    while len(out) < n:
+        y, m, d = rnd.randint(1300, 1420), rnd.randint(1, 12), rnd.randint(1, 31)
+        if jalali.is_valid(y, m, d):
+            out.append((y, m, d))
+    return out
+
+
+def _best_of(func, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(n: int = 100_000):
+    dates = _dates(n)
+    years, months, days = (np.array(col) for col in zip(*dates))
+    gregorian = [jalali.to_gregorian(*d) for d in dates]
+
+    def persian_to_greg():
+        for y, m, d in dates:
+            JalaliDate(y, m, d).to_gregorian()
+
+    def table_to_greg():
+        to_gregorian = jalali.to_gregorian
+        for y, m, d in dates:
+            to_gregorian(y, m, d)
+
+    def persian_from_greg():
+        for g in gregorian:
+            JalaliDate.to_jalali(g)
+
+    def table_from_greg():
+        from_gregorian = jalali.from_gregorian
+        for g in gregorian:
+            from_gregorian(g)
+
+    def persian_validate():
+        for y, m, d in dates:
+            try:
+                JalaliDate(y, m, d + 1)
+            except ValueError:
+                pass
+
+    def table_validate():
+        is_valid = jalali.is_valid
+        for y, m, d in dates:
+            is_valid(y, m, d + 1)
+
+    def table_vectorized():
+        jalali.to_gregorian_array(years, months, days)
+
+    rows = [
+        ("jalali -> gregorian", persian_to_greg, table_to_greg),
+        ("gregorian -> jalali", persian_from_greg, table_from_greg),
+        ("validation", persian_validate, table_validate),
+        ("jalali -> gregorian (numpy)", persian_to_greg, table_vectorized),
+    ]
+
+    print(f"{n} تاریخ، بهترین زمان از ۵ اجرا")
+    print(f"{'case':32} {'persiantools':>14} {'utils.jalali':>14} {'speedup':>9}")
+    for name, slow, fast in rows:
+        t_slow, t_fast = _best_of(slow), _best_of(fast)
+        print(f"{name:32} {t_slow * 1e9 / n:11.0f} ns {t_fast * 1e9 / n:11.0f} ns {t_slow / t_fast:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
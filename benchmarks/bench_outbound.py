@@ -0,0 +1,71 @@
+"""
+ارسال انبوه پیام به Bot API ساختگی، با و بدون محدودکننده نرخ utils.outbound
+
+بدون محدودکننده بخشی از پیام‌ها با 429 رد می‌شوند؛ با محدودکننده همه
+می‌رسند و زمان کل به سقف سراسری و هر چت نزدیک است.
+
+اجرا: python -m benchmarks.bench_outbound [تعداد پیام] [تعداد چت]
+"""
+import sys
+import time
+import asyncio
+import logging
+
+from telegram import Bot
+from telegram.error import RetryAfter
+from telegram.ext import ExtBot
+
+from benchmarks.fake_bot_api import FakeBotAPI
+from utils.outbound import TokenBucketRateLimiter, build_request
+
+TOKEN = "123456:bench-token"
+
+
+async def _send_all(bot, total: int, chats: int) -> dict:
+    delivered = failed = 0
+
+    async def send(i):
+        nonlocal delivered, failed
+        try:
+            await bot.send_message(chat_id=1000 + i % chats, text=f"bench {i}")
+            delivered += 1
+        except RetryAfter:
+            failed += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(i) for i in range(total)))
+    return {"delivered": delivered, "failed_429": failed, "seconds": time.perf_counter() - start}
+
+
+async def _run(total: int, chats: int, limiter) -> dict:
+    fake = FakeBotAPI()
+    base_url = await fake.start()
+    if limiter is None:
+        bot = Bot(TOKEN, base_url=base_url, request=build_request())
+    else:
+        bot = ExtBot(TOKEN, base_url=base_url, request=build_request(), rate_limiter=limiter)
+    async with bot:
+        result = await _send_all(bot, total, chats)
+    await fake.stop()
+    result["server_429"] = fake.rejected
+    if limiter is not None:
+        result.update(limiter.stats())
+    return result
+
+
+async def main(total: int = 120, chats: int = 40):
+    logging.getLogger("utils.outbound").setLevel(logging.ERROR)
+    results = {
+        "no limiter": await _run(total, chats, None),
+        "token bucket": await _run(total, chats, TokenBucketRateLimiter()),
+    }
+    print(f"{total} پیام به {chats} چت")
+    print(f"{'mode':14} {'delivered':>9} {'failed':>7} {'429s':>6} {'seconds':>8} {'msg/s':>7}")
+    for name, r in results.items():
+        print(f"{name:14} {r['delivered']:9} {r['failed_429']:7} {r['server_429']:6} "
+              f"{r['seconds']:8.2f} {r['delivered'] / r['seconds']:7.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(a) for a in sys.argv[1:3])))
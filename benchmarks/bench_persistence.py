@@ -0,0 +1,65 @@
+"""
+تعداد آپدیت در ثانیه گفتگوی bot✔️✔️_app با و بدون SQLitePersistence
+
+اجرا: python -m benchmarks.bench_persistence [تعداد کاربر]
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import tempfile
+
+from telegram import Update
+from telegram.ext import ApplicationBuilder
+
+from benchmarks.stub import StubRequest, birth_conversation, load_bot_module
+
+
+async def _run(bot_module, users: int, persistence=None) -> dict:
+    builder = ApplicationBuilder().token(os.environ["TELEGRAM_TOKEN"]).request(StubRequest())
+    if persistence is not None:
+        builder = builder.persistence(persistence)
+    application = bot_module.build_application(builder)
+
+    updates = [u for user_id in range(1, users + 1) for u in birth_conversation(user_id)]
+    async with application:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+
+        start = time.perf_counter()
+        for data in updates:
+            await application.process_update(Update.de_json(data, application.bot))
+        elapsed = time.perf_counter() - start
+
+        await application.stop()
+    if application.post_shutdown:
+        await application.post_shutdown(application)
+    return {"updates": len(updates), "seconds": elapsed, "ups": len(updates) / elapsed}
+
+
+async def main(users: int = 300):
+    logging.disable(logging.INFO)
+    bot_module = load_bot_module("bot✔️✔️_app.py")
+    from utils.persistence import SQLitePersistence
+
+    # دور گرم‌کردن تا کش هوروسکوپ و worker ها در هر دو اندازه‌گیری یکسان باشند
+    await _run(bot_module, users)
+
+    results = {"off": await _run(bot_module, users)}
+    with tempfile.TemporaryDirectory() as tmp:
+        persistence = SQLitePersistence(os.path.join(tmp, "bench.sqlite3"), update_interval=1)
+        results["on"] = await _run(bot_module, users, persistence)
+        results["on"]["batches"] = persistence.batches
+        results["on"]["rows_written"] = persistence.writes
+
+    print(f"{users} کاربر × {len(birth_conversation(0))} آپدیت (گفتگوی کامل)")
+    for name, r in results.items():
+        extra = f"  batches={r['batches']} rows={r['rows_written']}" if "batches" in r else ""
+        print(f"persistence {name:3}: {r['ups']:8.0f} updates/s ({r['seconds']:.2f}s){extra}")
+    return results
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(a) for a in sys.argv[1:2])))
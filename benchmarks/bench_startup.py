@@ -0,0 +1,160 @@
+"""
+زمان cold start نقطه ورود Render (python bot_app.py) با و بدون import تأخیری
+
+۱. `-X importtime` هنگام بارگذاری bot_app.py: مجموع زمان import و ماژول‌های
+   سطح اول با بیشترین زمان تجمعی.
+۲. time-to-first-ack: پروسه واقعی bot_app.py روی Bot API ساختگی اجرا و از همان
+   لحظه هر چند میلی‌ثانیه یک آپدیت /start به وبهوک فرستاده می‌شود تا اولین
+   پاسخ 200 برسد؛ سپس زمان اولین sendMessage و زمان پاسخ اولین /horoscope
+   (که utils.astro، numpy و swisseph را در پروسه اصلی و worker لازم دارد).
+
+حالت‌ها: lazy (پیش‌فرض، با pre-warm)، lazy بدون pre-warm و eager (LAZY_IMPORTS=0).
+اجرا: python -m benchmarks.bench_startup [تعداد تکرار]
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import statistics
+import subprocess
+
+from aiohttp import ClientConnectionError, ClientSession
+
+from benchmarks.fake_bot_api import FakeBotAPI
+from benchmarks.stub import BENCH_ENV, ROOT, message_update
+from utils.webhook import SECRET_HEADER, default_secret_token
+
+ENTRY = os.path.join(ROOT, "bot_app.py")
+MODES = {
+    "lazy + prewarm": {"LAZY_IMPORTS": "1", "PREWARM": "1"},
+    "lazy": {"LAZY_IMPORTS": "1", "PREWARM": "0"},
+    "eager": {"LAZY_IMPORTS": "0", "PREWARM": "0"},
+}
+TIMEOUT = 60.0
+POLL = 0.005
+# فاصله پاسخ /start تا پیام بعدی کاربر (فرصت pre-warm)
+THINK_TIME = float(os.environ.get("BENCH_THINK_TIME", 2.0))
+
+
+def _env(extra: dict) -> dict:
+    env = dict(os.environ)
+    env.update(BENCH_ENV)
+    # executor واقعی Render (process) تا زمان ساخت worker ها هم حساب شود
+    env.pop("ASTRO_EXECUTOR", None)
+    env.update(extra)
+    return env
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# ---------- -X importtime ----------
+
+def import_times(extra: dict) -> dict:
+    """
+    بارگذاری bot_app.py (بدون اجرای main) با -X importtime؛ زمان‌ها به میلی‌ثانیه
+    """
+    code = f"import runpy; runpy.run_path({ENTRY!r})"
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                            env=_env(extra), capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+
+    top_level = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # سطر عنوان
+        # سطح تودرتویی با فاصله‌های اول نام مشخص می‌شود
+        if not name[1:].startswith(" "):
+            top_level[name.strip()] = int(cumulative) / 1000
+    return {
+        "wall_ms": wall * 1000,
+        "imports_ms": sum(top_level.values()),
+        "top": sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:6],
+    }
+
+
+# ---------- time-to-first-ack ----------
+
+async def _wait_for(condition, start: float) -> float:
+    while not condition():
+        if time.perf_counter() - start > TIMEOUT:
+            raise TimeoutError("bot_app.py در مهلت پاسخ نداد")
+        await asyncio.sleep(POLL)
+    return time.perf_counter() - start
+
+
+async def first_ack(extra: dict) -> dict:
+    fake = FakeBotAPI(global_limit=10 ** 6, chat_limit=10 ** 6)
+    base_url = await fake.start()
+    port = _free_port()
+    env = _env(dict(extra, PORT=str(port), BOT_API_BASE_URL=base_url))
+    url = f"http://127.0.0.1:{port}/webhook"
+    headers = {SECRET_HEADER: default_secret_token(BENCH_ENV["BOT_TOKEN"])}
+
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(sys.executable, ENTRY, cwd=ROOT, env=env,
+                                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        async with ClientSession() as session:
+            ack = None
+            while ack is None:
+                try:
+                    async with session.post(url, json=message_update(1, "/start"), headers=headers) as response:
+                        if response.status == 200:
+                            ack = time.perf_counter() - start
+                except ClientConnectionError:
+                    await _wait_for(lambda: process.returncode is None, start)
+                    await asyncio.sleep(POLL)
+                if time.perf_counter() - start > TIMEOUT:
+                    raise TimeoutError("وبهوک bot_app.py در مهلت bind نشد")
+            reply = await _wait_for(lambda: fake.calls.get("sendMessage", 0) >= 1, start)
+
+            # اولین درخواستی که ماژول‌های سنگین را لازم دارد
+            await asyncio.sleep(THINK_TIME)
+            sent = time.perf_counter()
+            async with session.post(url, json=message_update(2, "/horoscope"), headers=headers) as response:
+                response.raise_for_status()
+            heavy = await _wait_for(lambda: fake.calls.get("sendMessage", 0) >= 2, sent)
+    finally:
+        if process.returncode is None:
+            process.terminate()
+        await process.wait()
+        await fake.stop()
+    return {"ack_ms": ack * 1000, "reply_ms": reply * 1000, "heavy_reply_ms": heavy * 1000}
+
+
+def main(repeats: int = 3):
+    print(f"-X importtime (bot_app.py بدون main، بهترین {repeats} اجرا)")
+    for mode, extra in MODES.items():
+        if mode == "lazy":
+            continue  # pre-warm روی import اثری ندارد
+        samples = [import_times(extra) for _ in range(repeats)]
+        times = min(samples, key=lambda run: run["wall_ms"])
+        print(f"  {mode:16} wall {times['wall_ms']:7.0f} ms  imports {times['imports_ms']:7.0f} ms")
+        for name, ms in times["top"]:
+            print(f"    {name:30} {ms:7.1f} ms")
+
+    print(f"\ntime-to-first-ack (میانه {repeats} اجرا)")
+    print(f"{'mode':16} {'ack ms':>8} {'reply ms':>9} {'/horoscope ms':>14}")
+    # حالت‌ها یک در میان اجرا می‌شوند تا گرم شدن کش دیسک به نفع یکی تمام نشود
+    runs = {mode: [] for mode in MODES}
+    for _ in range(repeats):
+        for mode, extra in MODES.items():
+            runs[mode].append(asyncio.run(first_ack(extra)))
+    results = {}
+    for mode, samples in runs.items():
+        r = results[mode] = {key: statistics.median(run[key] for run in samples) for key in samples[0]}
+        print(f"{mode:16} {r['ack_ms']:8.0f} {r['reply_ms']:9.0f} {r['heavy_reply_ms']:14.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
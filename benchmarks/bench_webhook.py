@@ -0,0 +1,120 @@
+"""
+مقایسه ورودی وبهوک aiohttp (utils.webhook) با مسیر قدیمی Flask → update_queue
+
+هر دو سرور روی localhost بالا می‌آیند و با تعداد مشخصی کلاینت همزمان
+آپدیت‌های ساختگی دریافت می‌کنند؛ خروجی: درخواست در ثانیه و p50/p99 زمان ack.
+
+اجرا: python -m benchmarks.bench_webhook [تعداد درخواست] [همزمانی]
+"""
+import sys
+import time
+import logging
+import socket
+import asyncio
+import threading
+
+from aiohttp import ClientSession, web
+from telegram import Bot, Update
+
+from utils.webhook import SECRET_HEADER, create_webhook_app
+
+SECRET = "bench-secret"
+
+
+class _StubApplication:
+    """فقط bot و update_queue؛ آپدیت‌ها در صف می‌مانند و پردازش نمی‌شوند"""
+
+    def __init__(self):
+        self.bot = Bot("123456:bench-token")
+        self.update_queue = asyncio.Queue()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _update_payload(update_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1700000000,
+            "chat": {"id": 1000 + update_id % 50, "type": "private"},
+            "from": {"id": 1000 + update_id % 50, "is_bot": False, "first_name": "bench"},
+            "text": "1375",
+        },
+    }
+
+
+def _start_flask(application, port: int):
+    from flask import Flask, request, jsonify
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    app = Flask(__name__)
+
+    @app.route("/webhook", methods=["POST"])
+    def webhook():
+        data = request.get_json(force=True)
+        update = Update.de_json(data, application.bot)
+        application.update_queue.put_nowait(update)
+        return jsonify({"status": "ok"})
+
+    server = make_server("127.0.0.1", port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def _load(url: str, total: int, concurrency: int, headers: dict) -> dict:
+    latencies = []
+    counter = iter(range(total))
+
+    async def worker(session):
+        for update_id in counter:
+            start = time.perf_counter()
+            async with session.post(url, json=_update_payload(update_id), headers=headers) as resp:
+                await resp.read()
+                assert resp.status == 200, resp.status
+            latencies.append(time.perf_counter() - start)
+
+    async with ClientSession() as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def main(total: int = 5000, concurrency: int = 32):
+    results = {}
+
+    application = _StubApplication()
+    port = _free_port()
+    runner = web.AppRunner(create_webhook_app(application, "/webhook", SECRET), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    results["aiohttp"] = await _load(f"http://127.0.0.1:{port}/webhook", total, concurrency, {SECRET_HEADER: SECRET})
+    await runner.cleanup()
+
+    application = _StubApplication()
+    port = _free_port()
+    server = _start_flask(application, port)
+    results["flask"] = await _load(f"http://127.0.0.1:{port}/webhook", total, concurrency, {})
+    server.shutdown()
+
+    print(f"{total} آپدیت، {concurrency} کلاینت همزمان")
+    print(f"{'ingress':10} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, r in results.items():
+        print(f"{name:10} {r['rps']:10.0f} {r['p50_ms']:9.2f} {r['p99_ms']:9.2f}")
+    return results
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(a) for a in sys.argv[1:3])))
@@ -0,0 +1,203 @@
+"""
+Bot API ساختگی روی aiohttp برای تست بار لایه ارسال (utils.outbound) و کل ربات
+
+مسیرها مثل api.telegram.org هستند: POST /bot<token>/<method>
+متدهای getMe، sendMessage، sendPhoto، sendDocument، editMessageText،
+answerCallbackQuery، setWebhook، deleteWebhook و getWebhookInfo پاسخ واقعی‌نما
+دارند و بقیه True برمی‌گردانند.
+محدودیت‌های تلگرام تقلید می‌شوند: اگر در پنجره یک ثانیه‌ای بیش از chat_limit پیام
+به یک چت یا بیش از global_limit پیام در کل برسد، پاسخ 429 با retry_after برمی‌گردد.
+latency (± latency_jitter) به هر پاسخ اضافه و با احتمال error_rate روی متدهای
+ارسال 429 تزریق می‌شود. expect(chat_id) منتظر اولین پیام بعدی ربات به یک چت
+می‌ماند (برای اندازه‌گیری زمان رفت و برگشت در benchmarks.loadgen).
+
+اجرا به تنهایی: python -m benchmarks.fake_bot_api [port] [--latency ثانیه] [--error-rate احتمال]
+"""
+import time
+import json
+import random
+import asyncio
+import argparse
+import itertools
+from collections import deque
+
+from aiohttp import web
+
+BOT_INFO = {"id": 1, "is_bot": True, "first_name": "fake", "username": "fake_bot"}
+
+
+class FakeBotAPI:
+    def __init__(self, global_limit: int = 30, chat_limit: int = 1, window: float = 0.9,
+                 retry_after: int = 1, latency: float = 0.0, latency_jitter: float = 0.0,
+                 error_rate: float = 0.0, seed: int = None):
+        self.global_limit = global_limit
+        self.chat_limit = chat_limit
+        # کمی کوتاه‌تر از یک ثانیه، مثل تلگرام که به تأخیر شبکه حساس نیست
+        self.window = window
+        self.retry_after = retry_after
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+        self._global = deque()
+        self._chats = {}
+        self._message_ids = itertools.count(1)
+        # chat_id → future هایی که منتظر پیام بعدی ربات به آن چت هستند
+        self._waiters = {}
+        self.webhook = {}
+        self.calls = {}
+        self.rejected = 0
+        self.injected = 0
+        self.uploaded_bytes = 0
+
+    # ---------- محدودیت‌ها ----------
+
+    def _over_limit(self, times: deque, limit: int, now: float) -> bool:
+        while times and now - times[0] >= self.window:
+            times.popleft()
+        return len(times) >= limit
+
+    def _flooded(self, chat_id) -> bool:
+        now = time.monotonic()
+        chat_times = self._chats.setdefault(chat_id, deque())
+        if self._over_limit(self._global, self.global_limit, now) or self._over_limit(chat_times, self.chat_limit, now):
+            return True
+        self._global.append(now)
+        chat_times.append(now)
+        return False
+
+    # ---------- پاسخ‌ها ----------
+
+    async def _params(self, request: web.Request) -> dict:
+        if request.content_type == "application/json":
+            return await request.json()
+        return dict(await request.post())
+
+    def _too_many_requests(self) -> web.Response:
+        return web.json_response({
+            "ok": False,
+            "error_code": 429,
+            "description": f"Too Many Requests: retry after {self.retry_after}",
+            "parameters": {"retry_after": self.retry_after},
+        }, status=429)
+
+    def _message(self, chat_id, params: dict, message_id: int = None) -> dict:
+        return {
+            "message_id": message_id or next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id), "type": "private" if int(chat_id) > 0 else "group"},
+            "text": params.get("text", ""),
+        }
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = await self._params(request)
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if self.latency or self.latency_jitter:
+            await asyncio.sleep(max(0.0, self.latency + self._random.uniform(-1, 1) * self.latency_jitter))
+
+        chat_id = params.get("chat_id")
+        if chat_id is not None and method.startswith(("send", "edit", "copy", "forward")):
+            if self._flooded(chat_id):
+                self.rejected += 1
+                return self._too_many_requests()
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.injected += 1
+                return self._too_many_requests()
+
+        if method == "getMe":
+            result = BOT_INFO
+        elif method == "setWebhook":
+            self.webhook = {"url": params.get("url"), "secret_token": params.get("secret_token")}
+            result = True
+        elif method == "deleteWebhook":
+            self.webhook = {}
+            result = True
+        elif method == "getWebhookInfo":
+            result = {"url": self.webhook.get("url", ""), "has_custom_certificate": False, "pending_update_count": 0}
+        elif chat_id is not None and method.startswith("send"):
+            result = self._message(chat_id, params)
+            if method in ("sendPhoto", "sendDocument"):
+                result.update(self._attachment(method, params))
+        elif chat_id is not None and method == "editMessageText":
+            result = self._message(chat_id, params, int(params.get("message_id", 0)) or None)
+        else:
+            # answerCallbackQuery و بقیه متدها
+            result = True
+
+        if chat_id is not None and isinstance(result, dict):
+            self._replied(int(chat_id), method)
+        return web.json_response({"ok": True, "result": result})
+
+    # ---------- انتظار برای پاسخ ربات ----------
+
+    def expect(self, chat_id: int) -> asyncio.Future:
+        """
+        future ای که با اولین پیام (send*/editMessageText) بعدی ربات به chat_id کامل می‌شود
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(chat_id, []).append(future)
+        return future
+
+    def _replied(self, chat_id: int, method: str):
+        waiters = self._waiters.pop(chat_id, None)
+        for future in waiters or ():
+            if not future.done():
+                future.set_result(method)
+
+    def _attachment(self, method: str, params: dict) -> dict:
+        # آپلود (FileField) file_id تازه می‌گیرد؛ file_id رشته‌ای همان را برمی‌گرداند
+        field = "photo" if method == "sendPhoto" else "document"
+        value = params.get(field)
+        if isinstance(value, str):
+            file_id = value
+        else:
+            file_id = f"fake-{field}-{next(self._message_ids)}"
+            self.uploaded_bytes += len(value.file.read()) if value is not None else 0
+        info = {"file_id": file_id, "file_unique_id": file_id}
+        if field == "photo":
+            return {"photo": [dict(info, width=512, height=512)]}
+        return {"document": info}
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """
+        سرور را بالا می‌آورد و base_url مناسب ApplicationBuilder.base_url را برمی‌گرداند
+        """
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}/bot"
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    def stats(self) -> dict:
+        return {
+            "calls": dict(self.calls),
+            "rejected_429": self.rejected,
+            "injected_429": self.injected,
+            "uploaded_bytes": self.uploaded_bytes,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.fake_bot_api")
+    parser.add_argument("port", nargs="?", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="تأخیر هر پاسخ (ثانیه)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="± تغییر تصادفی تأخیر (ثانیه)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="احتمال 429 تزریقی روی ارسال‌ها")
+    parser.add_argument("--global-limit", type=int, default=30)
+    parser.add_argument("--chat-limit", type=int, default=1)
+    args = parser.parse_args()
+    fake = FakeBotAPI(global_limit=args.global_limit, chat_limit=args.chat_limit, latency=args.latency,
+                      latency_jitter=args.jitter, error_rate=args.error_rate)
+    print(json.dumps({"base_url": f"http://127.0.0.1:{args.port}/bot"}))
+    web.run_app(fake.app(), host="127.0.0.1", port=args.port, access_log=None)
@@ -0,0 +1,309 @@
+"""
+تست بار وبهوک: پروسه واقعی یکی از bot*_app.py روی Bot API ساختگی
+
+ربات با BOT_API_BASE_URL به benchmarks.fake_bot_api وصل و وبهوکش روی یک پورت
+آزاد بالا می‌آید. گفتگوهای چندمرحله‌ای (SCENARIOS، متناسب با هر فایل) با
+فاصله‌های نمایی (open loop) طوری شروع می‌شوند که مجموع آپدیت‌ها به rate در ثانیه
+برسد؛ هر کاربر بعد از پاسخ ربات و کمی مکث (think) مرحله بعد را می‌فرستد.
+زمان ack وبهوک و زمان رفت و برگشت (ارسال آپدیت تا اولین sendMessage/
+editMessageText همان چت) اندازه‌گیری و با p50/p95/p99 و شمار خطاها گزارش می‌شود.
+
+اجرا: python -m benchmarks.loadgen bot✔️✔️_app.py [--rate 20] [--duration 30] [--think 1]
+      [--latency 0.05] [--jitter 0.02] [--error-rate 0.01] [--json نتیجه.json]
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+from aiohttp import ClientConnectionError, ClientSession, ClientTimeout
+
+from benchmarks.fake_bot_api import FakeBotAPI
+from benchmarks.stub import ROOT, birth_conversation, callback_update, message_update
+from utils.webhook import SECRET_HEADER
+
+TOKEN = "123456:load-token"
+SECRET = "load-secret"
+START_TIMEOUT = 60.0
+REPLY_TIMEOUT = float(os.environ.get("LOADGEN_REPLY_TIMEOUT", 15))
+
+
+# ---------- سناریوها ----------
+
+def _commands(user_id: int) -> list:
+    # bot_app.py و نسخه‌های مشابه: فرمان‌ها و پیام آزاد (echo)
+    return [
+        message_update(user_id, "/start"),
+        message_update(user_id, "سلام"),
+        message_update(user_id, "/healing"),
+    ]
+
+
+def _language_birth(user_id: int) -> list:
+    return [
+        message_update(user_id, "/start"),
+        callback_update(user_id, "fa"),
+        message_update(user_id, str(1340 + user_id % 60)),
+        message_update(user_id, str(1 + user_id % 12)),
+        message_update(user_id, str(1 + user_id % 28)),
+    ]
+
+
+def _options(user_id: int) -> list:
+    return [
+        message_update(user_id, "/start"),
+        callback_update(user_id, str(1 + user_id % 2)),
+        message_update(user_id, "سلام"),
+    ]
+
+
+def _day_month_year(user_id: int) -> list:
+    return [
+        message_update(user_id, "/horoscope"),
+        message_update(user_id, str(1 + user_id % 28)),
+        message_update(user_id, str(1 + user_id % 12)),
+        message_update(user_id, str(1960 + user_id % 40)),
+    ]
+
+
+def _calendar(calendar: str):
+    def scenario(user_id: int) -> list:
+        return [
+            message_update(user_id, "/horoscope"),
+            message_update(user_id, calendar),
+            message_update(user_id, str(1340 + user_id % 60)),
+            message_update(user_id, str(1 + user_id % 12)),
+            message_update(user_id, str(1 + user_id % 28)),
+        ]
+    return scenario
+
+
+SCENARIOS = {
+    "bot0_app.py": _commands,
+    "bot_app.py": _commands,
+    "bot✔️_app.py": _language_birth,
+    "bot✔️✔️_app.py": birth_conversation,
+    "bot✔️✔️✔️_app.py": _options,
+    "bot✔️✔️✔️✔️_app.py": _commands,
+    "bot✔️✔️✔️✔️✔️_app.py": _day_month_year,
+    "bot✔️✔️✔️✔️✔️✔️_app.py": _calendar("شمسی"),
+    "bot✔️✔️✔️✔️✔️✔️✔️_app.py": _calendar("هجری شمسی"),
+}
+
+
+# ---------- پروسه ربات ----------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _start_bot(filename: str, base_url: str, port: int, workdir: str):
+    env = dict(os.environ)
+    env.update({
+        "BOT_TOKEN": TOKEN,
+        "TELEGRAM_TOKEN": TOKEN,
+        "WEBHOOK_URL": "https://load.invalid/webhook",
+        "WEBHOOK_SECRET": SECRET,
+        "PORT": str(port),
+        "BOT_API_BASE_URL": base_url,
+        # فایل‌های SQLite و کش تصاویر در پوشه موقت، نه data/
+        "PERSISTENCE_PATH": os.path.join(workdir, "bot_state.sqlite3"),
+        "SIGIL_CACHE_DIR": os.path.join(workdir, "sigils"),
+        "CHART_CACHE_DIR": os.path.join(workdir, "charts"),
+    })
+    log = open(os.path.join(workdir, "bot.log"), "wb")
+    process = await asyncio.create_subprocess_exec(sys.executable, os.path.join(ROOT, filename), cwd=ROOT, env=env,
+                                                   stdout=log, stderr=subprocess.STDOUT)
+    log.close()
+    return process
+
+
+async def _wait_ready(fake: FakeBotAPI, process, session: ClientSession, port: int):
+    # آماده یعنی پورت bind شده و setWebhook (آخرین مرحله serve) رسیده است
+    deadline = time.monotonic() + START_TIMEOUT
+    while True:
+        if process.returncode is not None:
+            raise RuntimeError(f"ربات با کد {process.returncode} خارج شد")
+        if time.monotonic() > deadline:
+            raise TimeoutError("ربات در مهلت بالا نیامد")
+        if fake.webhook:
+            try:
+                async with session.get(f"http://127.0.0.1:{port}/"):
+                    return
+            except ClientConnectionError:
+                pass
+        await asyncio.sleep(0.05)
+
+
+# ---------- تولید بار ----------
+
+class LoadResult:
+    def __init__(self):
+        self.sent = 0
+        self.replies = 0
+        self.conversations = 0
+        self.completed = 0
+        self.ack_latencies = []
+        self.reply_latencies = []
+        self.errors = {}
+
+    def error(self, kind: str):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+
+async def _conversation(session, url: str, fake: FakeBotAPI, steps: list, think: float,
+                        rng: random.Random, result: LoadResult):
+    result.conversations += 1
+    headers = {SECRET_HEADER: SECRET}
+    for n, data in enumerate(steps):
+        if n:
+            await asyncio.sleep(rng.expovariate(1 / think) if think > 0 else 0)
+        chat_id = (data.get("message") or data["callback_query"]["message"])["chat"]["id"]
+        reply = fake.expect(chat_id)
+        start = time.perf_counter()
+        result.sent += 1
+        try:
+            async with session.post(url, json=data, headers=headers) as response:
+                result.ack_latencies.append(time.perf_counter() - start)
+                if response.status != 200:
+                    result.error(f"http_{response.status}")
+                    reply.cancel()
+                    return
+        except (ClientConnectionError, asyncio.TimeoutError):
+            result.error("connection")
+            reply.cancel()
+            return
+        try:
+            await asyncio.wait_for(reply, REPLY_TIMEOUT)
+        except asyncio.TimeoutError:
+            result.error(f"reply_timeout_step{n}")
+            return
+        result.replies += 1
+        result.reply_latencies.append(time.perf_counter() - start)
+    result.completed += 1
+
+
+async def generate(fake: FakeBotAPI, port: int, scenario, rate: float, duration: float, think: float,
+                   seed: int = 1) -> dict:
+    """
+    شروع گفتگوها با نرخ rate آپدیت در ثانیه به مدت duration ثانیه و انتظار برای پایان همه
+    """
+    rng = random.Random(seed)
+    url = f"http://127.0.0.1:{port}/webhook"
+    conversation_rate = rate / len(scenario(1))
+    result = LoadResult()
+    tasks = set()
+    user_ids = iter(range(1_000_001, sys.maxsize))
+
+    async with ClientSession(timeout=ClientTimeout(total=REPLY_TIMEOUT)) as session:
+        start = time.perf_counter()
+        next_start = start
+        while next_start - start < duration:
+            await asyncio.sleep(max(0.0, next_start - time.perf_counter()))
+            task = asyncio.create_task(_conversation(session, url, fake, scenario(next(user_ids)), think,
+                                                     random.Random(rng.random()), result))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            next_start += rng.expovariate(conversation_rate)
+        if tasks:
+            await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+    return _report(result, elapsed, rate, fake)
+
+
+def _percentiles(samples: list) -> dict:
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    ms = np.array(samples) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]).tolist()
+    return {"p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "max_ms": float(ms.max())}
+
+
+def _report(result: LoadResult, elapsed: float, rate: float, fake: FakeBotAPI) -> dict:
+    return {
+        "target_rate": rate,
+        "seconds": elapsed,
+        "conversations": result.conversations,
+        "completed": result.completed,
+        "updates_sent": result.sent,
+        "replies": result.replies,
+        "throughput": result.replies / elapsed if elapsed else 0.0,
+        "ack": _percentiles(result.ack_latencies),
+        "end_to_end": _percentiles(result.reply_latencies),
+        "errors": dict(result.errors),
+        "bot_api": fake.stats(),
+    }
+
+
+def print_report(filename: str, report: dict):
+    def line(name: str, p: dict) -> str:
+        if p["p50_ms"] is None:
+            return f"{name:12} -"
+        return (f"{name:12} {p['p50_ms']:9.1f} {p['p95_ms']:9.1f} {p['p99_ms']:9.1f} {p['max_ms']:9.1f}")
+
+    api = report["bot_api"]
+    print(f"{filename}: {report['conversations']} گفتگو ({report['completed']} کامل)، "
+          f"{report['updates_sent']} آپدیت در {report['seconds']:.1f}s (هدف {report['target_rate']:g}/s)")
+    print(f"throughput: {report['throughput']:.1f} پاسخ/s")
+    print(f"{'ms':12} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    print(line("ack", report["ack"]))
+    print(line("end-to-end", report["end_to_end"]))
+    print(f"errors: {report['errors'] or 0}")
+    print(f"bot api: 429 محدودیت={api['rejected_429']} 429 تزریقی={api['injected_429']} calls={api['calls']}")
+
+
+async def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadgen")
+    parser.add_argument("entry", nargs="?", default="bot✔️✔️_app.py", choices=sorted(SCENARIOS))
+    parser.add_argument("--rate", type=float, default=20.0, help="آپدیت در ثانیه")
+    parser.add_argument("--duration", type=float, default=30.0, help="مدت شروع گفتگوهای تازه (ثانیه)")
+    parser.add_argument("--think", type=float, default=1.0, help="میانگین مکث کاربر بین مراحل (ثانیه)")
+    parser.add_argument("--latency", type=float, default=0.0, help="تأخیر Bot API ساختگی (ثانیه)")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="احتمال 429 تزریقی روی ارسال‌ها")
+    parser.add_argument("--global-limit", type=int, default=30)
+    parser.add_argument("--chat-limit", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", help="نوشتن نتیجه به صورت JSON")
+    args = parser.parse_args(argv)
+
+    fake = FakeBotAPI(global_limit=args.global_limit, chat_limit=args.chat_limit, latency=args.latency,
+                      latency_jitter=args.jitter, error_rate=args.error_rate, seed=args.seed)
+    base_url = await fake.start()
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as workdir:
+        process = await _start_bot(args.entry, base_url, port, workdir)
+        try:
+            async with ClientSession() as session:
+                await _wait_ready(fake, process, session, port)
+            report = await generate(fake, port, SCENARIOS[args.entry], args.rate, args.duration, args.think,
+                                    args.seed)
+        except Exception:
+            with open(os.path.join(workdir, "bot.log"), errors="replace") as f:
+                sys.stderr.write(f.read()[-4000:])
+            raise
+        finally:
+            if process.returncode is None:
+                process.terminate()
+            await process.wait()
+            await fake.stop()
+
+    report["entry"] = args.entry
+    print_report(args.entry, report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
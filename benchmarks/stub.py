@@ -0,0 +1,116 @@
+"""
+ابزار مشترک benchmark ها: Bot API ساختگی در حافظه و بارگذاری فایل‌های bot*_app.py
+"""
+import os
+import json
+import itertools
+import importlib.util
+
+from telegram.request import BaseRequest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# متغیرهای محیطی لازم برای import شدن فایل‌های ربات بدون Render
+BENCH_ENV = {
+    "BOT_TOKEN": "123456:bench-token",
+    "TELEGRAM_TOKEN": "123456:bench-token",
+    "WEBHOOK_URL": "https://bench.invalid/webhook",
+    "ASTRO_EXECUTOR": "thread",
+}
+
+
+class StubRequest(BaseRequest):
+    """
+    به جای HTTP، پاسخ موفق ساختگی Bot API را برمی‌گرداند و تعداد فراخوانی‌ها را می‌شمارد
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self._message_ids = itertools.count(1)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        api_method = url.rsplit("/", 1)[-1]
+        self.calls[api_method] = self.calls.get(api_method, 0) + 1
+        params = request_data.parameters if request_data is not None else {}
+
+        if api_method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+        elif api_method in ("sendMessage", "editMessageText", "sendPhoto", "sendDocument"):
+            result = {
+                "message_id": next(self._message_ids),
+                "date": 0,
+                "chat": {"id": int(params.get("chat_id", 0)), "type": "private"},
+                "text": params.get("text", ""),
+            }
+            if api_method == "sendPhoto":
+                result["photo"] = [{"file_id": "stub-photo", "file_unique_id": "stub-photo", "width": 1, "height": 1}]
+            elif api_method == "sendDocument":
+                result["document"] = {"file_id": "stub-document", "file_unique_id": "stub-document"}
+        else:
+            result = True
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+def load_bot_module(filename: str, name: str = "bench_bot"):
+    """
+    import یک فایل bot*_app.py با مسیر (نام فایل‌ها شامل ✔️ است و import عادی ندارند)
+    """
+    for key, value in BENCH_ENV.items():
+        os.environ.setdefault(key, value)
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+_update_ids = itertools.count(1)
+
+
+def message_update(user_id: int, text: str) -> dict:
+    update_id = next(_update_ids)
+    message = {
+        "message_id": update_id,
+        "date": 0,
+        "chat": {"id": user_id, "type": "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": "bench"},
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": update_id, "message": message}
+
+
+def callback_update(user_id: int, data: str) -> dict:
+    update_id = next(_update_ids)
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "chat_instance": str(user_id),
+            "data": data,
+            "from": {"id": user_id, "is_bot": False, "first_name": "bench"},
+            "message": {"message_id": 1, "date": 0, "chat": {"id": user_id, "type": "private"}, "text": "lang"},
+        },
+    }
+
+
+def birth_conversation(user_id: int) -> list:
+    """
+    گفتگوی کامل bot✔️✔️_app: /start → زبان → سال → ماه → روز → ساعت → شهر
+    """
+    return [
+        message_update(user_id, "/start"),
+        callback_update(user_id, "fa"),
+        message_update(user_id, str(1340 + user_id % 60)),
+        message_update(user_id, str(1 + user_id % 12)),
+        message_update(user_id, str(1 + user_id % 29)),
+        message_update(user_id, f"{user_id % 24}:{user_id % 60:02d}"),
+        message_update(user_id, "تهران"),
+    ]
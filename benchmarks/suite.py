@@ -0,0 +1,433 @@
+"""
+مجموعه benchmark مسیرهای داغ: astro، تبدیل تاریخ جلالی، ساخت متن هوروسکوپ و
+گفتگوی کامل bot✔️✔️_app (ConversationHandler واقعی با Update ساختگی و StubRequest)
+
+برای هر benchmark تعداد اجرا در هر دور طوری انتخاب می‌شود که دور حداقل
+ROUND_TIME ثانیه طول بکشد؛ میانه، p95 و کمینه زمان هر اجرا از ROUNDS دور
+گزارش و به JSON نوشته می‌شود. compare نتیجه را با baseline ذخیره شده مقایسه
+می‌کند و اگر میانه و کمینه یک benchmark هر دو بیش از THRESHOLD کندتر شده
+باشند کد خروج 1 برمی‌گرداند.
+
+اجرا:
+  python -m benchmarks.suite run [-k astro] [-o results.json] [--save-baseline] [--compare]
+  python -m benchmarks.suite compare [baseline.json] [results.json] [--threshold 0.15]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import inspect
+import logging
+import platform
+import argparse
+import warnings
+import statistics
+import subprocess
+from datetime import date, datetime, timedelta, timezone
+
+from benchmarks.stub import BENCH_ENV, ROOT, StubRequest, load_bot_module, message_update, callback_update, \
+    birth_conversation
+
+# قبل از import شدن utils.executor (ASTRO_EXECUTOR در زمان import خوانده می‌شود)
+for _key, _value in BENCH_ENV.items():
+    os.environ.setdefault(_key, _value)
+
+import numpy as np  # noqa: E402
+
+from utils import astro, jalali  # noqa: E402
+
+RESULTS_PATH = os.environ.get("BENCH_RESULTS", os.path.join(ROOT, "benchmarks", "results.json"))
+BASELINE_PATH = os.environ.get("BENCH_BASELINE", os.path.join(ROOT, "benchmarks", "baseline.json"))
+THRESHOLD = float(os.environ.get("BENCH_THRESHOLD", 0.15))
+ROUNDS = int(os.environ.get("BENCH_ROUNDS", 15))
+ROUND_TIME = float(os.environ.get("BENCH_ROUND_TIME", 0.05))
+
+# نام → (گروه، تابع آماده‌سازی)
+BENCHMARKS = {}
+
+
+def benchmark(name: str, group: str):
+    """
+    ثبت یک benchmark؛ تابع یا callable یک اجرا را برمی‌گرداند، یا async generator
+    است که یک coroutine function را yield می‌کند (آماده‌سازی و پاکسازی دو طرف yield)
+    """
+    def register(func):
+        BENCHMARKS[name] = (group, func)
+        return func
+    return register
+
+
+def _dates(n: int, seed: int = 1) -> list:
+    rng = np.random.default_rng(seed)
+    return [date(1940, 1, 1) + timedelta(days=int(d)) for d in rng.integers(0, 30000, n)]
+
+
+def _cycle(values):
+    # نمونه‌های از پیش ساخته به ترتیب و چرخشی؛ هر اجرا ورودی تازه (کش نشده) می‌گیرد
+    values = list(values)
+    state = [0]
+
+    def next_value():
+        i = state[0]
+        state[0] = (i + 1) % len(values)
+        return values[i]
+    return next_value
+
+
+# ---------- astro ----------
+
+@benchmark("astro.get_horoscope.miss", "astro")
+def _get_horoscope_miss():
+    # بدون کش: موقعیت‌ها از جدول ephemeris + ساخت متن
+    uncached = astro.get_horoscope.__wrapped__
+    next_date = _cycle(_dates(1000))
+    return lambda: uncached(next_date(), "fa")
+
+
+@benchmark("astro.get_horoscope.hit", "astro")
+def _get_horoscope_hit():
+    birth_date = date(1990, 5, 15)
+    astro.get_horoscope(birth_date, "fa")
+    return lambda: astro.get_horoscope(birth_date, "fa")
+
+
+@benchmark("astro.get_positions_batch.1000", "astro")
+def _positions_batch():
+    dates = _dates(1000)
+    return lambda: astro.get_positions_batch(dates)
+
+
+@benchmark("astro.get_houses.miss", "astro")
+def _get_houses_miss():
+    uncached = astro.get_houses.__wrapped__
+    next_date = _cycle(_dates(1000))
+    return lambda: uncached(next_date(), 14, 30, 35.69, 51.42, "Asia/Tehran", "fa")
+
+
+# ---------- متن هوروسکوپ ----------
+
+@benchmark("text.format_horoscope.fa", "text")
+def _format_horoscope_fa():
+    next_positions = _cycle(astro.get_positions_batch(_dates(1000)))
+    return lambda: astro.format_horoscope(next_positions(), "fa")
+
+
+@benchmark("text.format_horoscope.en", "text")
+def _format_horoscope_en():
+    next_positions = _cycle(astro.get_positions_batch(_dates(1000)))
+    return lambda: astro.format_horoscope(next_positions(), "en")
+
+
+@benchmark("text.format_daily", "text")
+def _format_daily():
+    positions = astro.get_positions_batch([date(2024, 3, 20)])[0]
+    aspects = astro.format_aspects(*astro.aspect_matrix(positions[:, 0]), astro.PLANET_NAMES,
+                                   astro.PLANET_NAMES, "fa", limit=3)
+    next_sign = _cycle(range(len(astro.SIGNS)))
+    return lambda: astro.format_daily(positions, next_sign(), "fa", aspects)
+
+
+@benchmark("text.daily_horoscopes.miss", "text")
+def _daily_horoscopes_miss():
+    uncached = astro.daily_horoscopes.__wrapped__
+    next_day = _cycle(_dates(365, seed=2))
+    return lambda: uncached(next_day(), "fa")
+
+
+# ---------- تاریخ جلالی ----------
+
+def _jalali_dates(n: int = 1000, seed: int = 3) -> list:
+    return [jalali.from_gregorian(d) for d in _dates(n, seed)]
+
+
+@benchmark("jalali.to_gregorian", "jalali")
+def _to_gregorian():
+    next_date = _cycle(_jalali_dates())
+    return lambda: jalali.to_gregorian(*next_date())
+
+
+@benchmark("jalali.from_gregorian", "jalali")
+def _from_gregorian():
+    next_date = _cycle(_dates(1000, seed=3))
+    return lambda: jalali.from_gregorian(next_date())
+
+
+@benchmark("jalali.is_valid", "jalali")
+def _is_valid():
+    next_date = _cycle(_jalali_dates())
+    return lambda: jalali.is_valid(*next_date())
+
+
+@benchmark("jalali.to_gregorian_array.1000", "jalali")
+def _to_gregorian_array():
+    years, months, days = (np.array(column) for column in zip(*_jalali_dates()))
+    return lambda: jalali.to_gregorian_array(years, months, days)
+
+
+# ---------- گفتگوی کامل (end-to-end) ----------
+
+def _skip_conversation(user_id: int) -> list:
+    # start → زبان → سال → ماه → روز و /skip برای ساعت و شهر
+    return [
+        message_update(user_id, "/start"),
+        callback_update(user_id, "fa"),
+        message_update(user_id, str(1340 + user_id % 60)),
+        message_update(user_id, str(1 + user_id % 12)),
+        message_update(user_id, str(1 + user_id % 29)),
+        message_update(user_id, "/skip"),
+    ]
+
+
+_bot_module = None
+
+
+async def _application():
+    global _bot_module
+    from telegram.ext import ApplicationBuilder
+
+    if _bot_module is None:
+        _bot_module = load_bot_module("bot✔️✔️_app.py")
+    builder = ApplicationBuilder().token(os.environ["TELEGRAM_TOKEN"]).request(StubRequest())
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # PTBUserWarning درباره per_message
+        application = _bot_module.build_application(builder)
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    return application
+
+
+async def _close(application):
+    await application.shutdown()
+    if application.post_shutdown:
+        await application.post_shutdown(application)
+
+
+def _conversation_benchmark(conversation):
+    async def setup():
+        from telegram import Update
+
+        application = await _application()
+        user_ids = iter(range(1, 10 ** 9))
+
+        async def run_conversation():
+            for data in conversation(next(user_ids)):
+                await application.process_update(Update.de_json(data, application.bot))
+        try:
+            yield run_conversation
+        finally:
+            await _close(application)
+    return setup
+
+
+benchmark("e2e.conversation.skip", "e2e")(_conversation_benchmark(_skip_conversation))
+benchmark("e2e.conversation.full", "e2e")(_conversation_benchmark(birth_conversation))
+
+
+@benchmark("e2e.horoscope_cmd", "e2e")
+async def _horoscope_cmd():
+    from telegram import Update
+
+    application = await _application()
+    users = range(1, 201)
+    for user_id in users:
+        for data in birth_conversation(user_id):
+            await application.process_update(Update.de_json(data, application.bot))
+    next_user = _cycle(users)
+
+    async def run_command():
+        await application.process_update(Update.de_json(message_update(next_user(), "/horoscope"), application.bot))
+    try:
+        yield run_command
+    finally:
+        await _close(application)
+
+
+# ---------- اندازه‌گیری ----------
+
+def _summary(samples: list, number: int) -> dict:
+    us = sorted(s * 1e6 for s in samples)
+    return {
+        "median_us": statistics.median(us),
+        "p95_us": us[min(len(us) - 1, int(len(us) * 0.95))],
+        "min_us": us[0],
+        "rounds": len(us),
+        "number": number,
+    }
+
+
+def _measure(step) -> dict:
+    def timed(number: int) -> float:
+        start = time.perf_counter()
+        for _ in range(number):
+            step()
+        return time.perf_counter() - start
+
+    timed(1)  # گرم کردن کش‌ها و import ها
+    number = 1
+    while timed(number) < ROUND_TIME and number < 10 ** 6:
+        number *= 4
+    return _summary([timed(number) / number for _ in range(ROUNDS)], number)
+
+
+async def _measure_async(step) -> dict:
+    async def timed(number: int) -> float:
+        start = time.perf_counter()
+        for _ in range(number):
+            await step()
+        return time.perf_counter() - start
+
+    await timed(1)
+    number = 1
+    while await timed(number) < ROUND_TIME and number < 10 ** 5:
+        number *= 4
+    return _summary([await timed(number) / number for _ in range(ROUNDS)], number)
+
+
+async def _run_async(setup) -> dict:
+    steps = setup()
+    step = await steps.__anext__()
+    try:
+        return await _measure_async(step)
+    finally:
+        await steps.aclose()
+
+
+def run_benchmark(name: str) -> dict:
+    group, setup = BENCHMARKS[name]
+    if inspect.isasyncgenfunction(setup):
+        result = asyncio.run(_run_async(setup))
+    else:
+        result = _measure(setup())
+    result["group"] = group
+    return result
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(pattern: str = None) -> dict:
+    logging.disable(logging.INFO)
+    results = {}
+    for name in BENCHMARKS:
+        if pattern and pattern not in name:
+            continue
+        results[name] = r = run_benchmark(name)
+        print(f"{name:34} {r['median_us']:11.1f} µs  p95 {r['p95_us']:11.1f} µs  (×{r['number']})")
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "rounds": ROUNDS,
+        },
+        "results": results,
+    }
+
+
+# ---------- مقایسه با baseline ----------
+
+def compare(baseline: dict, current: dict, threshold: float = THRESHOLD) -> list:
+    """
+    [(نام، میانه قبلی، میانه فعلی، نسبت، وضعیت)]؛ وضعیت: regression، faster، ok، new یا missing
+    """
+    rows = []
+    before, after = baseline["results"], current["results"]
+    for name in list(before) + [name for name in after if name not in before]:
+        if name not in after:
+            rows.append((name, before[name]["median_us"], None, None, "missing"))
+            continue
+        if name not in before:
+            rows.append((name, None, after[name]["median_us"], None, "new"))
+            continue
+        old, new = before[name]["median_us"], after[name]["median_us"]
+        ratio = new / old if old else float("inf")
+        # میانه و کمینه هر دو باید تغییر کرده باشند تا نویز یک دور هشدار نسازد
+        best_ratio = after[name]["min_us"] / before[name]["min_us"] if before[name]["min_us"] else float("inf")
+        if min(ratio, best_ratio) > 1 + threshold:
+            status = "regression"
+        elif max(ratio, best_ratio) < 1 - threshold:
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append((name, old, new, ratio, status))
+    return rows
+
+
+def print_comparison(rows: list, baseline: dict, current: dict, threshold: float) -> int:
+    print(f"baseline {baseline['meta'].get('commit')} ({baseline['meta'].get('date')}) → "
+          f"{current['meta'].get('commit')} ({current['meta'].get('date')}), آستانه ±{threshold:.0%}")
+    print(f"{'benchmark':34} {'before µs':>11} {'after µs':>11} {'ratio':>7}  status")
+    for name, old, new, ratio, status in rows:
+        old_text = f"{old:11.1f}" if old is not None else f"{'-':>11}"
+        new_text = f"{new:11.1f}" if new is not None else f"{'-':>11}"
+        ratio_text = f"{ratio:7.2f}" if ratio is not None else f"{'-':>7}"
+        flag = "  ✘" if status == "regression" else ""
+        print(f"{name:34} {old_text} {new_text} {ratio_text}  {status}{flag}")
+    regressions = sum(1 for row in rows if row[4] == "regression")
+    print(f"{regressions} regression" if regressions else "بدون regression")
+    return 1 if regressions else 0
+
+
+def _load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save(data: dict, path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    print(f"→ {path}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="اجرای benchmark ها و نوشتن JSON")
+    run_parser.add_argument("-k", dest="pattern", help="فقط benchmark هایی که نامشان شامل این متن است")
+    run_parser.add_argument("-o", "--output", default=RESULTS_PATH)
+    run_parser.add_argument("--save-baseline", action="store_true", help=f"نوشتن نتیجه در {BASELINE_PATH} هم")
+    run_parser.add_argument("--compare", action="store_true", help="مقایسه با baseline بعد از اجرا")
+    run_parser.add_argument("--threshold", type=float, default=THRESHOLD)
+
+    compare_parser = commands.add_parser("compare", help="مقایسه دو فایل JSON")
+    compare_parser.add_argument("baseline", nargs="?", default=BASELINE_PATH)
+    compare_parser.add_argument("current", nargs="?", default=RESULTS_PATH)
+    compare_parser.add_argument("--threshold", type=float, default=THRESHOLD)
+
+    commands.add_parser("list", help="فهرست benchmark ها")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for name, (group, _) in BENCHMARKS.items():
+            print(f"{group:8} {name}")
+        return 0
+
+    if args.command == "compare":
+        baseline, current = _load(args.baseline), _load(args.current)
+        return print_comparison(compare(baseline, current, args.threshold), baseline, current, args.threshold)
+
+    current = run(args.pattern)
+    _save(current, args.output)
+    if args.save_baseline:
+        _save(current, BASELINE_PATH)
+    if args.compare and os.path.exists(BASELINE_PATH):
+        baseline = _load(BASELINE_PATH)
+        if args.pattern:
+            baseline["results"] = {k: v for k, v in baseline["results"].items() if args.pattern in k}
+        return print_comparison(compare(baseline, current, args.threshold), baseline, current, args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,10 +3,10 @@ import logging
 from datetime import datetime
 from telegram import ReplyKeyboardMarkup, Update
 from telegram.ext import (
-    ApplicationBuilder, CommandHandler, MessageHandler,
+    CommandHandler, MessageHandler,
     ContextTypes, filters, ConversationHandler
 )
-from utils import astro, healing
+from utils import astro, healing, executor, outbound, webhook
 
 # خواندن توکن و وبهوک از ENV
 BOT_TOKEN = os.getenv("BOT_TOKEN")
@@ -29,20 +29,16 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = update.message.text
     # می‌توانید متدهای astro و healing را اینجا فراخوانی کنید
-    result = astro.predict(text)  # نمونه
+    result = await executor.run(astro.predict, text)  # نمونه
     await update.message.reply_text(f"نتیجه پیشگویی: {result}")
 
 # --- تعریف اپلیکیشن و وبهوک ---
 if __name__ == "__main__":
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+    app = outbound.application_builder(BOT_TOKEN).post_init(executor.start).post_shutdown(executor.shutdown).build()
 
     # هندلرها
     app.add_handler(CommandHandler("start", start))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
 
     # اجرای وبهوک
-    app.run_webhook(
-        listen="0.0.0.0",
-        port=int(os.environ.get("PORT", 10000)),
-        webhook_url=WEBHOOK_URL
-    )
+    webhook.run(app, WEBHOOK_URL, port=int(os.environ.get("PORT", 10000)))
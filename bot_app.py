@@ -1,13 +1,12 @@
 import os
-from flask import Flask, request, jsonify
 from telegram import Update
 from telegram.ext import (
-    ApplicationBuilder,
     CommandHandler,
     MessageHandler,
     ContextTypes,
     filters
 )
+from utils import executor, lazy, outbound, webhook
 
 # -----------------------------
 #  دریافت متغیرهای محیطی Render
@@ -19,15 +18,13 @@ PORT = int(os.environ.get("PORT", 10000))
 # -----------------------------
 #  ساخت اپلیکیشن تلگرام (بدون Dispatcher)
 # -----------------------------
-application = ApplicationBuilder().token(BOT_TOKEN).build()
+application = outbound.application_builder(BOT_TOKEN).post_init(executor.start).post_shutdown(executor.shutdown).build()
 
 # -----------------------------
-#  ایمپورت utils (بدون تغییر)
+#  ایمپورت utils (تأخیری: swisseph و numpy بعد از bind وبهوک بارگذاری می‌شوند)
 # -----------------------------
-try:
-    from utils import astro, healing
-except Exception as e:
-    print("خطا در ایمپورت utils:", e)
+astro = lazy.module("utils.astro")
+healing = lazy.module("utils.healing")
 
 # -----------------------------
 #  تعریف هندلرها
@@ -41,7 +38,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def horoscope_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         birth_text = update.message.text.strip()
-        result = astro.get_horoscope(birth_text)
+        result = await executor.run(astro.get_horoscope, birth_text)
         await update.message.reply_text(result)
     except Exception as e:
         await update.message.reply_text(f"خطا در تولید هوروسکوپ: {e}")
@@ -66,32 +63,8 @@ application.add_handler(CommandHandler("horoscope", horoscope_handler))
 application.add_handler(CommandHandler("healing", healing_handler))
 application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, echo))
 
-# -----------------------------
-#  Flask → Webhook endpoint
-# -----------------------------
-app = Flask(__name__)
-
-@app.route("/", methods=["GET"])
-def index():
-    return "ربات فعال است!", 200
-
-@app.route("/webhook", methods=["POST"])
-def webhook():
-    try:
-        data = request.get_json(force=True)
-        update = Update.de_json(data, application.bot)
-        application.update_queue.put_nowait(update)
-    except Exception as e:
-        print("خطا در پردازش وب‌هوک:", e)
-    return jsonify({"ok": True})
-
 # -----------------------------
 #  اجرای Webhook روی Render
 # -----------------------------
 if __name__ == "__main__":
-    application.run_webhook(
-        listen="0.0.0.0",
-        port=PORT,
-        url_path="webhook",
-        webhook_url=WEBHOOK_URL
-    )
+    webhook.run(application, WEBHOOK_URL, port=PORT, path="/webhook")
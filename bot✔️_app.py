@@ -7,10 +7,11 @@ from telegram import (
     InlineKeyboardMarkup
 )
 from telegram.ext import (
-    ApplicationBuilder, CommandHandler, MessageHandler,
+    CommandHandler, MessageHandler,
     ContextTypes, CallbackQueryHandler, ConversationHandler, filters
 )
-from utils import astro, healing
+from utils import astro, healing, executor, outbound, webhook
+from utils.state import STATE_TTL, user_states
 
 # -----------------------------------
 # Load environment variables
@@ -29,6 +30,8 @@ logging.basicConfig(
     level=logging.INFO
 )
 logger = logging.getLogger(__name__)
+# conversation_timeout در هر مرحله یک job اضافه و حذف می‌کند
+logging.getLogger("apscheduler").setLevel(logging.WARNING)
 
 # -----------------------------------
 # Conversation states
@@ -60,7 +63,7 @@ async def language_choice(update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
         await query.answer()
         lang = query.data
-        context.user_data["lang"] = lang
+        user_states.get(update.effective_user.id).lang = lang
 
         if lang == "fa":
             await query.edit_message_text("زبان انتخاب شد: فارسی\n\nسال تولد را وارد کنید:")
@@ -72,7 +75,7 @@ async def language_choice(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # --- If user typed the language manually (fallback) ---
     text = update.message.text.strip()
     lang = "fa" if "فارسی" in text else "en"
-    context.user_data["lang"] = lang
+    user_states.get(update.effective_user.id).lang = lang
 
     if lang == "fa":
         await update.message.reply_text("زبان انتخاب شد: فارسی\n\nسال تولد را وارد کنید:")
@@ -85,8 +88,9 @@ async def language_choice(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # Enter year
 # -----------------------------------
 async def enter_year(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    context.user_data["year"] = update.message.text
-    lang = context.user_data.get("lang", "fa")
+    state = user_states.get(update.effective_user.id)
+    state.year = update.message.text
+    lang = state.lang or "fa"
 
     if lang == "fa":
         await update.message.reply_text("ماه تولد را وارد کنید:")
@@ -98,8 +102,9 @@ async def enter_year(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # Enter month
 # -----------------------------------
 async def enter_month(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    context.user_data["month"] = update.message.text
-    lang = context.user_data.get("lang", "fa")
+    state = user_states.get(update.effective_user.id)
+    state.month = update.message.text
+    lang = state.lang or "fa"
 
     if lang == "fa":
         await update.message.reply_text("روز تولد را وارد کنید:")
@@ -112,19 +117,30 @@ async def enter_month(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # -----------------------------------
 async def enter_day(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
-    context.user_data["day"] = update.message.text
-    lang = context.user_data.get("lang", "fa")
+    state = user_states.get(update.effective_user.id)
+    state.day = update.message.text
+    lang = state.lang or "fa"
+    if not state.has_date():
+        # وضعیت گفتگو منقضی شده (USER_STATE_TTL)
+        user_states.pop(update.effective_user.id)
+        if lang == "fa":
+            await update.message.reply_text("⌛️ مهلت وارد کردن اطلاعات تمام شده است. لطفاً دوباره /start را بزنید.")
+        else:
+            await update.message.reply_text("⌛️ Your session has expired. Please /start again.")
+        return ConversationHandler.END
 
     # Astro + Healing (unchanged)
-    astro_result = astro.get_prediction(context.user_data)
-    healing_result = healing.suggest_sigil(context.user_data)
+    user_data = state.as_dict()
+    astro_result = await executor.run(astro.get_prediction, user_data)
+    healing_result = await executor.run(healing.suggest_sigil, user_data)
 
     if lang == "fa":
-        header = f"🔮 تاریخ ثبت شد: {context.user_data['year']}-{context.user_data['month']}-{context.user_data['day']}\n\n"
+        header = f"🔮 تاریخ ثبت شد: {state.year}-{state.month}-{state.day}\n\n"
     else:
-        header = f"🔮 Date received: {context.user_data['year']}-{context.user_data['month']}-{context.user_data['day']}\n\n"
+        header = f"🔮 Date received: {state.year}-{state.month}-{state.day}\n\n"
 
     await update.message.reply_text(header + astro_result + "\n\n" + healing_result)
+    user_states.pop(update.effective_user.id)
 
     return ConversationHandler.END
 
@@ -138,7 +154,7 @@ async def health(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # MAIN
 # -----------------------------------
 def main():
-    application = ApplicationBuilder().token(BOT_TOKEN).build()
+    application = outbound.application_builder(BOT_TOKEN).post_init(executor.start).post_shutdown(executor.shutdown).build()
 
     conv_handler = ConversationHandler(
         entry_points=[CommandHandler("start", start)],
@@ -154,7 +170,9 @@ def main():
         },
 
         fallbacks=[CommandHandler("start", start)],
-        per_message=True    # برای جلوگیری از باگ CallbackQuery
+        per_message=True,    # برای جلوگیری از باگ CallbackQuery
+        # گفتگو همزمان با حذف وضعیت در user_states تمام می‌شود
+        conversation_timeout=STATE_TTL,
     )
 
     application.add_handler(conv_handler)
@@ -167,12 +185,7 @@ def main():
     WEBHOOK_PATH = "/webhook"
     WEBHOOK_FULL_URL = WEBHOOK_URL + WEBHOOK_PATH
 
-    application.run_webhook(
-        listen="0.0.0.0",
-        port=PORT,
-        url_path=WEBHOOK_PATH,
-        webhook_url=WEBHOOK_FULL_URL
-    )
+    webhook.run(application, WEBHOOK_FULL_URL, port=PORT, path=WEBHOOK_PATH)
 
 
 if __name__ == "__main__":
@@ -1,5 +1,7 @@
 # bot_app.py
 import os
+import asyncio
+import calendar
 import logging
 from datetime import datetime
 from telegram import (
@@ -16,11 +18,23 @@ from telegram.ext import (
     ContextTypes,
     filters,
 )
-from persiantools.jdatetime import JalaliDate
 from dotenv import load_dotenv
 
 # این ماژول‌ها باید در پوشه utils شما موجود باشند و نام توابع/رنگ/خروجی‌ها مطابق استفاده زیر باشند.
-from utils import astro, healing
+from utils import executor, lazy, media, outbound, webhook
+from utils.state import STATE_TTL, UserState, user_states
+from utils.persistence import SQLitePersistence
+from utils.broadcast import SubscriberStore, daily_broadcast
+from utils.cache import horoscope_cache
+
+# ماژول‌های سنگین (numpy، swisseph، Pillow) در اولین استفاده یا pre-warm بعد از bind وبهوک import می‌شوند
+astro = lazy.module("utils.astro")
+chart = lazy.module("utils.chart")
+gazetteer = lazy.module("utils.gazetteer")
+healing = lazy.module("utils.healing")
+jalali = lazy.module("utils.jalali")
+sigil = lazy.module("utils.sigil")
+synastry = lazy.module("utils.synastry")
 
 # ---------- بارگذاری env ----------
 load_dotenv()
@@ -31,9 +45,11 @@ logging.basicConfig(
     level=logging.INFO,
 )
 logger = logging.getLogger(__name__)
+# conversation_timeout در هر مرحله یک job اضافه و حذف می‌کند
+logging.getLogger("apscheduler").setLevel(logging.WARNING)
 
 # ---------- حالت‌های Conversation ----------
-SELECT_LANGUAGE, ENTER_YEAR, ENTER_MONTH, ENTER_DAY = range(4)
+SELECT_LANGUAGE, ENTER_YEAR, ENTER_MONTH, ENTER_DAY, ENTER_TIME, ENTER_PLACE = range(6)
 
 # ---------- خواندن ENV (از Render) ----------
 TOKEN = os.getenv("TELEGRAM_TOKEN")
@@ -69,7 +85,7 @@ async def language_choice(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
 
     lang = query.data
-    context.user_data["lang"] = lang
+    user_states.get(update.effective_user.id).lang = lang
 
     # پاسخ دادن به کاربر و درخواست سال تولد
     if lang == "fa":
@@ -88,15 +104,15 @@ async def enter_year(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         year = int(text)
     except Exception:
-        lang = context.user_data.get("lang")
+        lang = user_states.get(update.effective_user.id).lang
         if lang == "fa":
             await update.message.reply_text("⚠️ سال نامعتبر است. لطفاً فقط عدد وارد کنید (مثال: 1375).")
         else:
             await update.message.reply_text("⚠️ Invalid year. Please enter a number (e.g., 1996).")
         return ENTER_YEAR
 
-    context.user_data["year"] = year
-    lang = context.user_data.get("lang")
+    user_states.get(update.effective_user.id).year = year
+    lang = user_states.get(update.effective_user.id).lang
     if lang == "fa":
         await update.message.reply_text("ماه تولد را وارد کنید (1 تا 12):")
     else:
@@ -110,15 +126,15 @@ async def enter_month(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if month < 1 or month > 12:
             raise ValueError()
     except Exception:
-        lang = context.user_data.get("lang")
+        lang = user_states.get(update.effective_user.id).lang
         if lang == "fa":
             await update.message.reply_text("⚠️ ماه نامعتبر است. عددی بین 1 تا 12 وارد کنید.")
         else:
             await update.message.reply_text("⚠️ Invalid month. Enter a number between 1 and 12.")
         return ENTER_MONTH
 
-    context.user_data["month"] = month
-    lang = context.user_data.get("lang")
+    user_states.get(update.effective_user.id).month = month
+    lang = user_states.get(update.effective_user.id).lang
     if lang == "fa":
         await update.message.reply_text("روز تولد را وارد کنید (1 تا 31):")
     else:
@@ -132,35 +148,131 @@ async def enter_day(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if day < 1 or day > 31:
             raise ValueError()
     except Exception:
-        lang = context.user_data.get("lang")
+        lang = user_states.get(update.effective_user.id).lang
         if lang == "fa":
             await update.message.reply_text("⚠️ روز نامعتبر است. عددی بین 1 تا 31 وارد کنید.")
         else:
             await update.message.reply_text("⚠️ Invalid day. Enter a number between 1 and 31.")
         return ENTER_DAY
 
-    # خواندن year/month که قبلاً ذخیره شده
-    year = context.user_data.get("year")
-    month = context.user_data.get("month")
-    lang = context.user_data.get("lang", "en")
+    state = user_states.get(update.effective_user.id)
+    year = state.year
+    month = state.month
+    lang = state.lang or "en"
 
-    # تبدیل تاریخ (اگر زبان فارسی است: Jalali -> Gregorian)
-    try:
+    # اعتبارسنجی تاریخ بدون exception (شمسی از جدول utils.jalali)
+    if lang == "fa":
+        valid = jalali.is_valid(year, month, day)
+    else:
+        valid = isinstance(year, int) and 1 <= year <= 9999 and day <= calendar.monthrange(year, month)[1]
+
+    if not valid:
+        user_states.pop(update.effective_user.id)
         if lang == "fa":
-            # JalaliDate از persiantools
-            gregorian = JalaliDate(year, month, day).to_gregorian()
-            birth_date = datetime(gregorian.year, gregorian.month, gregorian.day)
+            await update.message.reply_text("⚠️ ترکیب تاریخ نامعتبر است. لطفاً دوباره /start را بزنید و تاریخ را اصلاح کنید.")
         else:
-            birth_date = datetime(year, month, day)
+            await update.message.reply_text("⚠️ Invalid date combination. Please /start and try again.")
+        return ConversationHandler.END
+
+    state.day = day
+    # ساعت و محل تولد اختیاری است (برای طالع و خانه‌ها)
+    if lang == "fa":
+        await update.message.reply_text("ساعت تولد را وارد کنید (مثال: 14:30)؛ اگر نمی‌دانید /skip را بزنید.")
+    else:
+        await update.message.reply_text("Enter your birth time (e.g., 14:30), or /skip if you don't know it.")
+    return ENTER_TIME
+
+# ارقام فارسی/عربی در ساعت تولد
+_DIGITS = str.maketrans("۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩", "01234567890123456789")
+
+async def enter_time(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    text = update.message.text.strip().translate(_DIGITS).replace("٫", ":").replace(".", ":")
+    state = user_states.get(update.effective_user.id)
+    try:
+        hour, _, minute = text.partition(":")
+        hour, minute = int(hour), int(minute or 0)
+        if not (0 <= hour <= 23 and 0 <= minute <= 59):
+            raise ValueError()
     except Exception:
+        if state.lang == "fa":
+            await update.message.reply_text("⚠️ ساعت نامعتبر است. به شکل 14:30 وارد کنید یا /skip را بزنید.")
+        else:
+            await update.message.reply_text("⚠️ Invalid time. Use the 14:30 format, or /skip.")
+        return ENTER_TIME
+
+    state.hour, state.minute = hour, minute
+    if state.lang == "fa":
+        await update.message.reply_text("شهر محل تولد را وارد کنید (مثال: تهران)؛ یا /skip:")
+    else:
+        await update.message.reply_text("Enter your city of birth (e.g., Tehran), or /skip:")
+    return ENTER_PLACE
+
+async def enter_place(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    جستجوی شهر در gazetteer آفلاین؛ اگر چند شهر پیدا شد انتخاب با inline keyboard
+    """
+    lang = user_states.get(update.effective_user.id).lang
+    places = gazetteer.search(update.message.text, limit=4)
+    if not places:
         if lang == "fa":
-            await update.message.reply_text("⚠️ ترکیب تاریخ نامعتبر است. لطفاً دوباره /start را بزنید و تاریخ را اصلاح کنید.")
+            await update.message.reply_text("⚠️ شهری با این نام پیدا نشد. دوباره وارد کنید یا /skip را بزنید.")
         else:
-            await update.message.reply_text("⚠️ Invalid date combination. Please /start and try again.")
+            await update.message.reply_text("⚠️ No city found with that name. Try again, or /skip.")
+        return ENTER_PLACE
+    if len(places) == 1:
+        return await finish_birth(update, context, places[0])
+
+    keyboard = [
+        [InlineKeyboardButton(f"{(place.name_fa or place.name) if lang == 'fa' else place.name} ({place.country})",
+                              callback_data=f"place:{place.id}")]
+        for place in places
+    ]
+    if lang == "fa":
+        await update.message.reply_text("کدام شهر؟", reply_markup=InlineKeyboardMarkup(keyboard))
+    else:
+        await update.message.reply_text("Which city?", reply_markup=InlineKeyboardMarkup(keyboard))
+    return ENTER_PLACE
+
+async def place_choice(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    return await finish_birth(update, context, gazetteer.place(int(query.data.split(":", 1)[1])))
+
+async def skip_time(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # /skip در مرحله ساعت یا شهر: فقط بر اساس تاریخ تولد
+    return await finish_birth(update, context, None)
+
+async def finish_birth(update: Update, context: ContextTypes.DEFAULT_TYPE, place):
+    # خواندن year/month/day/ساعت که قبلاً ذخیره شده (گفتگو در این مرحله تمام می‌شود)
+    state = user_states.pop(update.effective_user.id) or UserState()
+    year, month, day = state.year, state.month, state.day
+    lang = state.lang or "en"
+    if not state.has_date():
+        # وضعیت گفتگو منقضی شده (یا بعد از ری‌استارت از دست رفته)
+        if (state.lang or context.user_data.get("lang")) == "fa":
+            await update.effective_message.reply_text("⌛️ مهلت وارد کردن اطلاعات تمام شده است. لطفاً دوباره /start را بزنید.")
+        else:
+            await update.effective_message.reply_text("⌛️ Your session has expired. Please /start again.")
         return ConversationHandler.END
 
-    # ذخیره در user_data
+    # تبدیل تاریخ (اگر زبان فارسی است: Jalali -> Gregorian)
+    if lang == "fa":
+        gregorian = jalali.to_gregorian(year, month, day)
+        birth_date = datetime(gregorian.year, gregorian.month, gregorian.day)
+    else:
+        birth_date = datetime(year, month, day)
+
+    # ذخیره در user_data (پروفایل کاربر؛ با SQLitePersistence بعد از ری‌استارت هم می‌ماند)
     context.user_data["birth_date"] = birth_date
+    context.user_data["lang"] = lang
+    if state.hour is not None and place is not None:
+        context.user_data["birth_time"] = (state.hour, state.minute)
+        context.user_data["birth_place"] = place._asdict()
+    else:
+        context.user_data.pop("birth_time", None)
+        context.user_data.pop("birth_place", None)
+    if "match" in context.user_data:
+        synastry.synastry_index.upsert(update.effective_user.id, birth_date)
 
     # ---------- فراخوانی ماژول پیشگویی (astro) و پیشنهاد sigil (healing) ----------
     # فرض: astro.get_horoscope یا astro.get_prediction تابعی است که با یک datetime یا user_data کار می‌کند.
@@ -168,17 +280,17 @@ async def enter_day(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # سعی می‌کنیم تابع‌های متداول را صدا بزنیم؛ اگر نام تابع متفاوت است در utils آن را تغییر دهید.
         # نخست تلاش برای get_horoscope با datetime
         if hasattr(astro, "get_horoscope"):
-            result = astro.get_horoscope(birth_date)
+            result = await executor.run(astro.get_horoscope, birth_date, lang)
         elif hasattr(astro, "get_prediction"):
-            result = astro.get_prediction({"birth_date": birth_date})
+            result = await executor.run(astro.get_prediction, {"birth_date": birth_date, "lang": lang})
         else:
             result = "🪄 پیشگویی در دسترس نیست (astro)."
 
         # healing: پیشنهاد sigil — فرض تابع suggest_sigil یا suggest exists
         if hasattr(healing, "suggest_sigil"):
-            healing_result = healing.suggest_sigil({"birth_date": birth_date})
+            healing_result = await executor.run(healing.suggest_sigil, {"birth_date": birth_date, "lang": lang})
         elif hasattr(healing, "get_sigil"):
-            healing_result = healing.get_sigil({"birth_date": birth_date})
+            healing_result = await executor.run(healing.get_sigil, {"birth_date": birth_date, "lang": lang})
         else:
             healing_result = "🪬 پیشنهاد Sigil در دسترس نیست (healing)."
 
@@ -187,40 +299,277 @@ async def enter_day(update: Update, context: ContextTypes.DEFAULT_TYPE):
         result = f"⚠️ خطا در تولید پیشگویی: {e}"
         healing_result = ""
 
-    # ارسال نتیجه به زبان مناسب
+    houses_result = await get_houses(context.user_data, lang)
+    if houses_result:
+        result = f"{result}\n\n{houses_result}"
+
+    # ارسال نتیجه به زبان مناسب (بعد از انتخاب شهر با دکمه، update.message نداریم)
+    # اشتراک فال روزانه فقط با انتخاب کاربر (دکمه زیر نتیجه یا /subscribe)
     if lang == "fa":
-        await update.message.reply_text(f"🎯 نتیجه تحلیل:\n\n{result}\n\n🔮 پیشنهاد: {healing_result}")
+        keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("🔔 فال روزانه هر شب", callback_data="daily:subscribe")]])
+        await update.effective_message.reply_text(f"🎯 نتیجه تحلیل:\n\n{result}\n\n🔮 پیشنهاد: {healing_result}",
+                                                  reply_markup=keyboard)
     else:
-        await update.message.reply_text(f"🎯 Your horoscope:\n\n{result}\n\n🔮 Suggestion: {healing_result}")
+        keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("🔔 Daily horoscope", callback_data="daily:subscribe")]])
+        await update.effective_message.reply_text(f"🎯 Your horoscope:\n\n{result}\n\n🔮 Suggestion: {healing_result}",
+                                                  reply_markup=keyboard)
+    await send_sigil(update, birth_date)
 
     return ConversationHandler.END
 
+# طالع و خانه‌ها اگر ساعت و محل تولد ثبت شده باشد
+async def get_houses(user_data: dict, lang: str) -> str:
+    birth_time = user_data.get("birth_time")
+    place = user_data.get("birth_place")
+    if birth_time is None or place is None:
+        return ""
+    try:
+        return await executor.run(
+            astro.get_houses, user_data["birth_date"], *birth_time,
+            place["latitude"], place["longitude"], place["timezone"], lang,
+        )
+    except Exception:
+        logger.exception("خطا هنگام محاسبه خانه‌ها:")
+        return ""
+
+# ارسال تصویر sigil (رندر در pool و کش روی دیسک در utils.sigil، کش file_id در utils.media)
+async def send_sigil(update: Update, birth_date):
+    try:
+        path = await sigil.sigil_image(birth_date)
+        # بعد از اولین ارسال فقط file_id تلگرام فرستاده می‌شود
+        await media.file_ids.send(update.get_bot(), update.effective_chat.id, path)
+    except Exception:
+        logger.exception("خطا هنگام ساخت/ارسال تصویر sigil:")
+
+# /chart: چرخ نقشه تولد (utils.chart)
+async def chart_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    birth_date = context.user_data.get("birth_date")
+    if birth_date is None:
+        if context.user_data.get("lang", "fa") == "fa":
+            await update.message.reply_text("تاریخ تولد شما ثبت نشده است. لطفاً /start را بزنید.")
+        else:
+            await update.message.reply_text("No saved birth date. Please /start first.")
+        return
+    try:
+        path = await chart.chart_image(birth_date)
+        await media.file_ids.send(update.get_bot(), update.effective_chat.id, path)
+    except Exception:
+        logger.exception("خطا هنگام ساخت/ارسال چرخ نقشه تولد:")
+
+async def sigil_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    birth_date = context.user_data.get("birth_date")
+    if birth_date is None:
+        if context.user_data.get("lang", "fa") == "fa":
+            await update.message.reply_text("تاریخ تولد شما ثبت نشده است. لطفاً /start را بزنید.")
+        else:
+            await update.message.reply_text("No saved birth date. Please /start first.")
+        return
+    await send_sigil(update, birth_date)
+
+# /horoscope برای کاربرانی که تاریخ تولدشان قبلاً ذخیره شده (بدون تکرار گفتگو)
+async def horoscope_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    birth_date = context.user_data.get("birth_date")
+    lang = context.user_data.get("lang", "fa")
+    if birth_date is None:
+        if lang == "fa":
+            await update.message.reply_text("تاریخ تولد شما ثبت نشده است. لطفاً /start را بزنید.")
+        else:
+            await update.message.reply_text("No saved birth date. Please /start first.")
+        return
+
+    try:
+        result = await executor.run(astro.get_horoscope, birth_date, lang)
+    except Exception as e:
+        logger.exception("خطا هنگام اجرای astro:")
+        result = f"⚠️ خطا در تولید پیشگویی: {e}"
+    houses_result = await get_houses(context.user_data, lang)
+    if houses_result:
+        result = f"{result}\n\n{houses_result}"
+
+    if lang == "fa":
+        await update.message.reply_text(f"🎯 نتیجه تحلیل:\n\n{result}")
+    else:
+        await update.message.reply_text(f"🎯 Your horoscope:\n\n{result}")
+
+# /events: رویدادهای پیش رو (ورود به برج، رجعت عطارد، بازگشت مشتری و زحل)
+async def events_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    birth_date = context.user_data.get("birth_date")
+    lang = context.user_data.get("lang", "fa")
+    if birth_date is None:
+        if lang == "fa":
+            await update.message.reply_text("تاریخ تولد شما ثبت نشده است. لطفاً /start را بزنید.")
+        else:
+            await update.message.reply_text("No saved birth date. Please /start first.")
+        return
+
+    try:
+        result = await executor.run(astro.upcoming_events, birth_date, datetime.now().date(), lang)
+    except Exception as e:
+        logger.exception("خطا هنگام جستجوی رویدادها:")
+        result = f"⚠️ خطا در جستجوی رویدادها: {e}"
+    await update.message.reply_text(result)
+
+# /match: سازگاری با کاربرانی که /match را فعال کرده‌اند؛ /match off برای خروج
+async def match_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    birth_date = context.user_data.get("birth_date")
+    lang = context.user_data.get("lang", "fa")
+    user_id = update.effective_user.id
+    if context.args and context.args[0].lower() == "off":
+        context.user_data.pop("match", None)
+        synastry.synastry_index.remove(user_id)
+        await update.message.reply_text("از فهرست سازگاری خارج شدید." if lang == "fa" else "You left the match list.")
+        return
+    if birth_date is None:
+        if lang == "fa":
+            await update.message.reply_text("تاریخ تولد شما ثبت نشده است. لطفاً /start را بزنید.")
+        else:
+            await update.message.reply_text("No saved birth date. Please /start first.")
+        return
+
+    # با اولین /match کاربر (با نام کوچک) در فهرست دیگران هم دیده می‌شود
+    context.user_data["match"] = {"name": update.effective_user.first_name}
+    synastry.synastry_index.upsert(user_id, birth_date)
+    matches = await asyncio.to_thread(synastry.synastry_index.matches, user_id, birth_date, 5)
+
+    profiles = context.application.user_data
+    lines = [
+        f"{profiles.get(other, {}).get('match', {}).get('name', other)}: {score:.0f}%"
+        for other, score in matches
+    ]
+    if not lines:
+        lines = ["هنوز کاربر دیگری در فهرست نیست." if lang == "fa" else "No other users in the list yet."]
+    title = "💞 بیشترین سازگاری:" if lang == "fa" else "💞 Most compatible:"
+    await update.message.reply_text("\n".join([title, *lines]))
+
+# /subscribe (یا دکمه زیر نتیجه) و /unsubscribe برای فال روزانه
+async def subscribe_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    birth_date = context.user_data.get("birth_date")
+    lang = context.user_data.get("lang", "fa")
+    if birth_date is None:
+        if lang == "fa":
+            await update.effective_message.reply_text("تاریخ تولد شما ثبت نشده است. لطفاً /start را بزنید.")
+        else:
+            await update.effective_message.reply_text("No saved birth date. Please /start first.")
+        return
+
+    await daily_broadcast.subscribe(update.effective_user.id, update.effective_chat.id, birth_date, lang)
+    if lang == "fa":
+        await update.effective_message.reply_text("✅ فال روزانه هر شب ساعت ۰۰:۰۰ به وقت تهران برای شما ارسال می‌شود. لغو: /unsubscribe")
+    else:
+        await update.effective_message.reply_text("✅ You will receive a daily horoscope every midnight (Tehran time). Cancel: /unsubscribe")
+
+async def subscribe_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    await query.edit_message_reply_markup(reply_markup=None)
+    await subscribe_cmd(update, context)
+
+async def unsubscribe_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await daily_broadcast.unsubscribe(update.effective_user.id)
+    if context.user_data.get("lang", "fa") == "fa":
+        await update.message.reply_text("اشتراک فال روزانه لغو شد.")
+    else:
+        await update.message.reply_text("Daily horoscope unsubscribed.")
+
 # Health command (تلگرام)
 async def health_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text("Health OK - Bot is running ✔")
+    stats = horoscope_cache.stats()
+    states = user_states.stats()
+    sends = outbound.rate_limiter.stats()
+    sigils = sigil.stats()
+    charts = chart.stats()
+    uploads = media.file_ids.stats()
+    matches = synastry.synastry_index.stats()
+    await update.message.reply_text(
+        "Health OK - Bot is running ✔\n"
+        f"cache: {stats['entries']} entries, {stats['bytes']} bytes, "
+        f"hits={stats['hits']} misses={stats['misses']} evictions={stats['evictions']} "
+        f"hit_rate={stats['hit_rate']:.2%}\n"
+        f"user states: {states['entries']} entries, ~{states['approx_bytes']} bytes, "
+        f"expired={states['expired']} evicted={states['evicted']}\n"
+        f"outbound: {sends['requests']} requests, throttled={sends['throttled']} "
+        f"429 retries={sends['retries_429']} errors={sends['errors']} "
+        f"avg latency={sends['latency_avg'] * 1000:.1f} ms\n"
+        f"sigils: {sigils['renders']} renders, hit_rate={sigils['hit_rate']:.2%}\n"
+        f"charts: {charts['renders']} renders, hit_rate={charts['hit_rate']:.2%}\n"
+        f"file_id cache: {uploads['entries']} entries, uploaded={uploads['bytes_uploaded']} bytes, "
+        f"avoided={uploads['bytes_avoided']} bytes\n"
+        f"synastry: {matches['profiles']} profiles, {matches['bytes']} bytes, queries={matches['queries']}"
+    )
 
-# ---------- تابع main ----------
-def main():
-    # ساخت اپلیکیشن و استفاده از TOKEN از ENV
-    application = ApplicationBuilder().token(TOKEN).build()
+# ---------- ساخت Application ----------
+async def post_init(application):
+    await executor.start(application)
+    # ماتریس سازگاری از پروفایل‌های ذخیره شده (user_data بعد از initialize بارگذاری شده است)
+    synastry.synastry_index.load({
+        user_id: data["birth_date"] for user_id, data in application.user_data.items()
+        if "match" in data and data.get("birth_date") is not None
+    })
+
+async def post_shutdown(application):
+    await executor.shutdown(application)
+    # last_used های جمع شده کش file_id
+    await media.file_ids.flush()
+
+def build_application(builder: ApplicationBuilder = None):
+    """
+    ساخت اپلیکیشن با همه هندلرها؛ benchmark ها می‌توانند builder خودشان را بدهند
+    """
+    if builder is None:
+        # ساخت اپلیکیشن و استفاده از TOKEN از ENV؛ پروفایل‌ها و گفتگوها در SQLite ذخیره می‌شوند
+        builder = outbound.application_builder(TOKEN).persistence(SQLitePersistence())
+    application = builder.post_init(post_init).post_shutdown(post_shutdown).build()
+    if isinstance(application.persistence, SQLitePersistence):
+        # مشترکین فال روزانه و file_id ها در همان فایل SQLite
+        daily_broadcast.attach(SubscriberStore(application.persistence.path))
+        media.file_ids.open(application.persistence.path)
 
     # ConversationHandler: 
     conv_handler = ConversationHandler(
         entry_points=[CommandHandler("start", start)],
         states={
             # SELECT_LANGUAGE از طریق CallbackQueryHandler (inline keyboard) مدیریت می‌شود
-            SELECT_LANGUAGE: [CallbackQueryHandler(language_choice)],
+            SELECT_LANGUAGE: [CallbackQueryHandler(language_choice, pattern=r"^(fa|en)$")],
             # بقیه مراحل پیام متنی هستند
             ENTER_YEAR: [MessageHandler(filters.TEXT & ~filters.COMMAND, enter_year)],
             ENTER_MONTH: [MessageHandler(filters.TEXT & ~filters.COMMAND, enter_month)],
             ENTER_DAY: [MessageHandler(filters.TEXT & ~filters.COMMAND, enter_day)],
+            # ساعت و شهر تولد اختیاری‌اند (/skip)
+            ENTER_TIME: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, enter_time),
+                CommandHandler("skip", skip_time),
+            ],
+            ENTER_PLACE: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, enter_place),
+                CallbackQueryHandler(place_choice, pattern=r"^place:"),
+                CommandHandler("skip", skip_time),
+            ],
         },
         fallbacks=[CommandHandler("start", start)],
         # از مقدار پیش‌فرض per_message=False استفاده می‌کنیم تا MessageHandler ها کار کنند.
+        # گفتگو همزمان با حذف وضعیت در user_states (STATE_TTL) تمام می‌شود
+        conversation_timeout=STATE_TTL,
+        name="birth_date",
+        persistent=application.persistence is not None,
     )
 
     application.add_handler(conv_handler)
+    application.add_handler(CommandHandler("horoscope", horoscope_cmd))
+    application.add_handler(CommandHandler("sigil", sigil_cmd))
+    application.add_handler(CommandHandler("chart", chart_cmd))
+    application.add_handler(CommandHandler("events", events_cmd))
+    application.add_handler(CommandHandler("match", match_cmd))
+    application.add_handler(CommandHandler("subscribe", subscribe_cmd))
+    application.add_handler(CallbackQueryHandler(subscribe_button, pattern=r"^daily:subscribe$"))
+    application.add_handler(CommandHandler("unsubscribe", unsubscribe_cmd))
     application.add_handler(CommandHandler("health", health_cmd))
+    return application
+
+# ---------- تابع main ----------
+def main():
+    application = build_application()
+    # ارسال روزانه فال در نیمه‌شب تهران (و ادامه ارسال نیمه‌کاره بعد از ری‌استارت)
+    daily_broadcast.schedule(application.job_queue)
 
     # ---------- Webhook configuration for Render ----------
     # Render از PORT محیطی استفاده می‌کند. پیش‌فرض 8000.
@@ -234,16 +583,8 @@ def main():
 
     logger.info("Setting webhook to: %s", WEBHOOK_FULL_URL)
 
-    # Application.run_webhook: url_path نباید leading slash داشته باشد در بعضی نسخه‌ها، بنابراین بدون / هم می‌دهیم
-    url_path_for_ptb = WEBHOOK_PATH.lstrip("/")
-
-    # راه‌اندازی وبهوک
-    application.run_webhook(
-        listen="0.0.0.0",
-        port=PORT,
-        url_path=url_path_for_ptb,
-        webhook_url=WEBHOOK_FULL_URL,
-    )
+    # راه‌اندازی وبهوک (سرور aiohttp روی همان event loop اپلیکیشن)
+    webhook.run(application, WEBHOOK_FULL_URL, port=PORT, path=WEBHOOK_PATH)
 
 if __name__ == "__main__":
     main()
@@ -1,9 +1,7 @@
 import os
 import logging
-from flask import Flask, request, Response
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
-    ApplicationBuilder,
     CommandHandler,
     MessageHandler,
     CallbackQueryHandler,
@@ -11,7 +9,8 @@ from telegram.ext import (
     filters,
     ContextTypes
 )
-from utils import astro, healing  # همان ماژول‌های اصلی شما
+from utils import astro, healing, outbound, webhook  # همان ماژول‌های اصلی شما
+from utils.state import STATE_TTL
 
 # ------------------ Logging ------------------
 logging.basicConfig(
@@ -19,17 +18,16 @@ logging.basicConfig(
     level=logging.INFO
 )
 logger = logging.getLogger(__name__)
+# conversation_timeout در هر مرحله یک job اضافه و حذف می‌کند
+logging.getLogger("apscheduler").setLevel(logging.WARNING)
 
 # ------------------ TELEGRAM TOKEN ------------------
 TELEGRAM_TOKEN = os.environ.get("TELEGRAM_TOKEN")
 if not TELEGRAM_TOKEN:
     raise ValueError("❌ TELEGRAM_TOKEN در متغیرهای محیطی تنظیم نشده است.")
 
-# ------------------ Flask App ------------------
-app = Flask(__name__)
-
 # ------------------ Telegram Bot Application ------------------
-application = ApplicationBuilder().token(TELEGRAM_TOKEN).build()
+application = outbound.application_builder(TELEGRAM_TOKEN).build()
 
 # ------------------ ConversationHandler States ------------------
 CHOOSING, TYPING = range(2)
@@ -80,43 +78,20 @@ conv_handler = ConversationHandler(
         ]
     },
     fallbacks=[CommandHandler('cancel', cancel)],
-    per_message=False
+    per_message=False,
+    # گفتگوی رها شده با همان مهلت بقیه ربات‌ها (USER_STATE_TTL) تمام می‌شود
+    conversation_timeout=STATE_TTL
 )
 
 application.add_handler(conv_handler)
 
-# ------------------ Webhook Route ------------------
-@app.route("/webhook", methods=["POST"])
-def webhook():
-    """دریافت آپدیت از تلگرام و پردازش آن"""
-    if request.method == "POST":
-        update = Update.de_json(request.get_json(force=True), application.bot)
-        application.update_queue.put_nowait(update)
-        return Response("ok", status=200)
-    else:
-        return Response("Method not allowed", status=405)
-
-# ------------------ Start Flask + Telegram ------------------
+# ------------------ Start Webhook (aiohttp + Telegram on one loop) ------------------
 if __name__ == "__main__":
     WEBHOOK_URL = os.environ.get(
         "WEBHOOK_URL",
         "https://mehrozkiyad-professional-render-ver2.onrender.com/webhook"
     )
 
-    # ثبت webhook در تلگرام
-    import asyncio
-
-    async def set_webhook():
-        await application.bot.set_webhook(WEBHOOK_URL)
-        logger.info(f"Webhook set to: {WEBHOOK_URL}")
-
-    asyncio.run(set_webhook())
-
-    # شروع background task برای پردازش آپدیت‌ها
-    from threading import Thread
-    Thread(target=lambda: application.run_polling(), daemon=True).start()
-
-    # اجرا Flask روی Render
     port = int(os.environ.get("PORT", 10000))
-    logger.info(f"Starting Flask server on 0.0.0.0:{port}")
-    app.run(host="0.0.0.0", port=port)
+    logger.info(f"Starting webhook server on 0.0.0.0:{port}")
+    webhook.run(application, WEBHOOK_URL, port=port)
@@ -1,13 +1,12 @@
 import os
-from flask import Flask, request, jsonify
 from telegram import Update
 from telegram.ext import (
-    ApplicationBuilder,
     CommandHandler,
     MessageHandler,
     ContextTypes,
     filters
 )
+from utils import executor, outbound, webhook
 
 # --- دریافت متغیرهای محیطی ---
 BOT_TOKEN = os.environ.get("BOT_TOKEN")
@@ -15,7 +14,7 @@ WEBHOOK_URL = os.environ.get("WEBHOOK_URL")  # مثال: https://yourapp.onrende
 PORT = int(os.environ.get("PORT", 10000))
 
 # --- ایجاد برنامه تلگرام ---
-application = ApplicationBuilder().token(BOT_TOKEN).build()
+application = outbound.application_builder(BOT_TOKEN).post_init(executor.start).post_shutdown(executor.shutdown).build()
 
 # --- import utils شما ---
 try:
@@ -31,7 +30,7 @@ async def horoscope_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # مثال گرفتن هوروسکوپ از utils
     birth_date = update.message.text  # اینجا می‌توانید تاریخ را از پیام بگیرید
     try:
-        horoscope = astro.get_horoscope(birth_date)
+        horoscope = await executor.run(astro.get_horoscope, birth_date)
         await update.message.reply_text(horoscope)
     except Exception as e:
         await update.message.reply_text(f"خطا در تولید هوروسکوپ: {e}")
@@ -53,29 +52,6 @@ application.add_handler(CommandHandler("horoscope", horoscope_handler))
 application.add_handler(CommandHandler("healing", healing_handler))
 application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, echo))
 
-# --- Flask App برای Webhook ---
-app = Flask(__name__)
-
-@app.route("/webhook", methods=["POST"])
-def webhook():
-    """مسیر webhook تلگرام"""
-    data = request.get_json(force=True)
-    update = Update.de_json(data, application.bot)
-    application.update_queue.put_nowait(update)
-    return jsonify({"status": "ok"})
-
-@app.route("/", methods=["GET"])
-def index():
-    return "ربات فعال است!", 200
-
 # --- اجرای webhook ---
 if __name__ == "__main__":
-    # نام مسیر webhook برای run_webhook
-    url_path = WEBHOOK_URL.split("/")[-1]
-    
-    application.run_webhook(
-        listen="0.0.0.0",
-        port=PORT,
-        url_path=url_path,
-        webhook_url=WEBHOOK_URL
-    )
+    webhook.run(application, WEBHOOK_URL, port=PORT)
@@ -1,14 +1,14 @@
 import os
-from flask import Flask, request, jsonify
 from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
 from telegram.ext import (
-    ApplicationBuilder,
     CommandHandler,
     MessageHandler,
     ConversationHandler,
     ContextTypes,
     filters
 )
+from utils import executor, outbound, webhook
+from utils.state import STATE_TTL, UserState, user_states
 
 # --- دریافت متغیرهای محیطی ---
 BOT_TOKEN = os.environ.get("BOT_TOKEN")
@@ -16,7 +16,7 @@ WEBHOOK_URL = os.environ.get("WEBHOOK_URL")
 PORT = int(os.environ.get("PORT", 10000))
 
 # --- ایجاد برنامه تلگرام ---
-application = ApplicationBuilder().token(BOT_TOKEN).build()
+application = outbound.application_builder(BOT_TOKEN).post_init(executor.start).post_shutdown(executor.shutdown).build()
 
 # --- import utils ---
 try:
@@ -43,25 +43,28 @@ async def horoscope_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return DAY
 
 async def horoscope_day(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    context.user_data['day'] = update.message.text
+    user_states.get(update.effective_user.id).day = update.message.text
     await update.message.reply_text("لطفاً ماه تولد خود را وارد کنید (عدد):")
     return MONTH
 
 async def horoscope_month(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    context.user_data['month'] = update.message.text
+    user_states.get(update.effective_user.id).month = update.message.text
     await update.message.reply_text("لطفاً سال تولد خود را وارد کنید (میلادی):")
     return YEAR
 
 async def horoscope_year(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    context.user_data['year'] = update.message.text
-    day = context.user_data['day']
-    month = context.user_data['month']
-    year = context.user_data['year']
+    state = user_states.pop(update.effective_user.id) or UserState()
+    state.year = update.message.text
+    if not state.has_date():
+        # وضعیت گفتگو منقضی شده (USER_STATE_TTL)
+        await update.message.reply_text("⌛️ مهلت وارد کردن اطلاعات تمام شده است. لطفاً دوباره /horoscope را بزنید.")
+        return ConversationHandler.END
+    day, month, year = state.day, state.month, state.year
 
     # تولید هوروسکوپ با astro
     try:
         birth_date = f"{year}-{month}-{day}"
-        horoscope = astro.get_horoscope(birth_date)
+        horoscope = await executor.run(astro.get_horoscope, birth_date)
         await update.message.reply_text(f"هوروسکوپ شما:\n{horoscope}", reply_markup=reply_markup)
     except Exception as e:
         await update.message.reply_text(f"خطا در تولید هوروسکوپ: {e}", reply_markup=reply_markup)
@@ -69,6 +72,7 @@ async def horoscope_year(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ConversationHandler.END
 
 async def horoscope_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_states.pop(update.effective_user.id)
     await update.message.reply_text("عملیات هوروسکوپ لغو شد.", reply_markup=reply_markup)
     return ConversationHandler.END
 
@@ -90,7 +94,9 @@ horoscope_conv = ConversationHandler(
         MONTH: [MessageHandler(filters.TEXT & ~filters.COMMAND, horoscope_month)],
         YEAR: [MessageHandler(filters.TEXT & ~filters.COMMAND, horoscope_year)]
     },
-    fallbacks=[CommandHandler('cancel', horoscope_cancel)]
+    fallbacks=[CommandHandler('cancel', horoscope_cancel)],
+    # گفتگو همزمان با حذف وضعیت در user_states تمام می‌شود
+    conversation_timeout=STATE_TTL
 )
 
 application.add_handler(CommandHandler("start", start))
@@ -98,25 +104,5 @@ application.add_handler(horoscope_conv)
 application.add_handler(CommandHandler("healing", healing_handler))
 application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, echo))
 
-# --- Flask App ---
-app = Flask(__name__)
-
-@app.route("/webhook", methods=["POST"])
-def webhook():
-    data = request.get_json(force=True)
-    update = Update.de_json(data, application.bot)
-    application.update_queue.put_nowait(update)
-    return jsonify({"status": "ok"})
-
-@app.route("/", methods=["GET"])
-def index():
-    return "ربات فعال است!", 200
-
 if __name__ == "__main__":
-    url_path = WEBHOOK_URL.split("/")[-1]
-    application.run_webhook(
-        listen="0.0.0.0",
-        port=PORT,
-        url_path=url_path,
-        webhook_url=WEBHOOK_URL
-    )
+    webhook.run(application, WEBHOOK_URL, port=PORT)
@@ -1,10 +1,11 @@
 import os
 from telegram import Update, ReplyKeyboardMarkup
 from telegram.ext import (
-    ApplicationBuilder, CommandHandler, MessageHandler,
+    CommandHandler, MessageHandler,
     ConversationHandler, ContextTypes, filters
 )
-from persiantools.jdatetime import JalaliDate
+from utils import executor, jalali, outbound, webhook
+from utils.state import STATE_TTL, UserState, user_states
 
 # --- دریافت متغیرهای محیطی ---
 BOT_TOKEN = os.environ.get("BOT_TOKEN")
@@ -19,8 +20,7 @@ except ImportError:
 
 # --- تعریف مراحل ConversationHandler ---
 CALENDAR, YEAR, MONTH, DAY = range(4)
-calendar_type = {}  # ذخیره انتخاب کاربر
-birth_data = {}     # ذخیره سال/ماه/روز انتخابی
+# انتخاب تقویم و سال/ماه/روز هر کاربر در user_states (utils.state) نگه داشته می‌شود
 
 # --- کیبورد ها ---
 sh_years = [[str(y)] for y in range(1350, 1406)]
@@ -33,9 +33,12 @@ gr_year_keyboard = ReplyKeyboardMarkup(gr_years, one_time_keyboard=True, resize_
 month_keyboard = ReplyKeyboardMarkup(months, one_time_keyboard=True, resize_keyboard=True)
 day_keyboard = ReplyKeyboardMarkup(days, one_time_keyboard=True, resize_keyboard=True)
 
-# --- تبدیل شمسی به میلادی ---
+# --- تبدیل شمسی به میلادی (None برای تاریخ نامعتبر) ---
 def sh_to_gr(year, month, day):
-    return JalaliDate(year=int(year), month=int(month), day=int(day)).to_gregorian()
+    year, month, day = int(year), int(month), int(day)
+    if not jalali.is_valid(year, month, day):
+        return None
+    return jalali.to_gregorian(year, month, day)
 
 # --- Handlers ---
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -43,43 +46,48 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return CALENDAR
 
 async def calendar_choice(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user_id = update.message.from_user.id
-    calendar_type[user_id] = update.message.text
-    if calendar_type[user_id] == "شمسی":
+    state = user_states.get(update.message.from_user.id)
+    state.calendar = update.message.text
+    if state.calendar == "شمسی":
         await update.message.reply_text("سال تولد خود را انتخاب کنید:", reply_markup=sh_year_keyboard)
     else:
         await update.message.reply_text("سال تولد خود را انتخاب کنید:", reply_markup=gr_year_keyboard)
     return YEAR
 
 async def year_choice(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user_id = update.message.from_user.id
-    birth_data[user_id] = {"year": update.message.text}
+    user_states.get(update.message.from_user.id).year = update.message.text
     await update.message.reply_text("ماه تولد خود را انتخاب کنید:", reply_markup=month_keyboard)
     return MONTH
 
 async def month_choice(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user_id = update.message.from_user.id
-    birth_data[user_id]["month"] = update.message.text
+    user_states.get(update.message.from_user.id).month = update.message.text
     await update.message.reply_text("روز تولد خود را انتخاب کنید:", reply_markup=day_keyboard)
     return DAY
 
 async def day_choice(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user_id = update.message.from_user.id
-    birth_data[user_id]["day"] = update.message.text
+    state = user_states.pop(update.message.from_user.id) or UserState()
+    state.day = update.message.text
+    if not state.has_date():
+        # وضعیت گفتگو منقضی شده (USER_STATE_TTL)
+        await update.message.reply_text("⌛️ مهلت وارد کردن اطلاعات تمام شده است. لطفاً دوباره /horoscope را بزنید.")
+        return ConversationHandler.END
 
     # تبدیل به میلادی در صورت نیاز
-    if calendar_type[user_id] == "شمسی":
-        g_date = sh_to_gr(int(birth_data[user_id]["year"]),
-                          int(birth_data[user_id]["month"]),
-                          int(birth_data[user_id]["day"]))
+    if state.calendar == "شمسی":
+        g_date = sh_to_gr(int(state.year),
+                          int(state.month),
+                          int(state.day))
+        if g_date is None:
+            await update.message.reply_text("تاریخ شمسی نامعتبر است. لطفاً دوباره /horoscope را بزنید.")
+            return ConversationHandler.END
     else:
-        g_date = (int(birth_data[user_id]["year"]),
-                  int(birth_data[user_id]["month"]),
-                  int(birth_data[user_id]["day"]))
+        g_date = (int(state.year),
+                  int(state.month),
+                  int(state.day))
 
     # تولید هوروسکوپ
     try:
-        horoscope = astro.get_horoscope(g_date)
+        horoscope = await executor.run(astro.get_horoscope, g_date)
     except Exception as e:
         horoscope = f"خطا در تولید هوروسکوپ: {e}"
 
@@ -87,6 +95,7 @@ async def day_choice(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ConversationHandler.END
 
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_states.pop(update.message.from_user.id)
     await update.message.reply_text("عملیات لغو شد.")
     return ConversationHandler.END
 
@@ -101,7 +110,7 @@ async def echo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(f"پیام شما: {update.message.text}")
 
 # --- ایجاد Application ---
-application = ApplicationBuilder().token(BOT_TOKEN).build()
+application = outbound.application_builder(BOT_TOKEN).post_init(executor.start).post_shutdown(executor.shutdown).build()
 
 # --- ثبت ConversationHandler ---
 conv_handler = ConversationHandler(
@@ -112,34 +121,15 @@ conv_handler = ConversationHandler(
         MONTH: [MessageHandler(filters.TEXT & ~filters.COMMAND, month_choice)],
         DAY: [MessageHandler(filters.TEXT & ~filters.COMMAND, day_choice)],
     },
-    fallbacks=[CommandHandler('cancel', cancel)]
+    fallbacks=[CommandHandler('cancel', cancel)],
+    # گفتگو همزمان با حذف وضعیت در user_states تمام می‌شود
+    conversation_timeout=STATE_TTL
 )
 
 application.add_handler(conv_handler)
 application.add_handler(CommandHandler("healing", healing_handler))
 application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, echo))
 
-# --- Flask App ---
-from flask import Flask, request, jsonify
-app = Flask(__name__)
-
-@app.route("/webhook", methods=["POST"])
-def webhook():
-    data = request.get_json(force=True)
-    update = Update.de_json(data, application.bot)
-    application.update_queue.put_nowait(update)
-    return jsonify({"status": "ok"})
-
-@app.route("/", methods=["GET"])
-def index():
-    return "ربات فعال است!", 200
-
 # --- اجرای webhook ---
 if __name__ == "__main__":
-    url_path = WEBHOOK_URL.split("/")[-1]
-    application.run_webhook(
-        listen="0.0.0.0",
-        port=PORT,
-        url_path=url_path,
-        webhook_url=WEBHOOK_URL
-    )
+    webhook.run(application, WEBHOOK_URL, port=PORT)
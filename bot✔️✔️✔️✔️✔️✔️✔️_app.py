@@ -1,15 +1,14 @@
 import os
-from flask import Flask, request, jsonify
 from telegram import Update, ReplyKeyboardMarkup, KeyboardButton
 from telegram.ext import (
-    ApplicationBuilder,
     CommandHandler,
     MessageHandler,
     ContextTypes,
     ConversationHandler,
     filters
 )
-from persiantools.jdatetime import JalaliDate
+from utils import executor, jalali, outbound, webhook
+from utils.state import STATE_TTL, UserState, user_states
 
 # --- دریافت متغیرهای محیطی ---
 BOT_TOKEN = os.environ.get("BOT_TOKEN")
@@ -17,7 +16,7 @@ WEBHOOK_URL = os.environ.get("WEBHOOK_URL")
 PORT = int(os.environ.get("PORT", 10000))
 
 # --- ایجاد برنامه تلگرام ---
-application = ApplicationBuilder().token(BOT_TOKEN).build()
+application = outbound.application_builder(BOT_TOKEN).post_init(executor.start).post_shutdown(executor.shutdown).build()
 
 # --- import utils شما ---
 try:
@@ -46,7 +45,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # --- انتخاب تقویم ---
 async def select_calendar(update: Update, context: ContextTypes.DEFAULT_TYPE):
     calendar = update.message.text
-    context.user_data['calendar'] = calendar
+    user_states.get(update.effective_user.id).calendar = calendar
     if calendar == "هجری شمسی":
         keyboard = [shamsi_years[i:i+5] for i in range(0, len(shamsi_years), 5)]
     else:
@@ -57,7 +56,7 @@ async def select_calendar(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # --- انتخاب سال ---
 async def select_year(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    context.user_data['year'] = int(update.message.text)
+    user_states.get(update.effective_user.id).year = int(update.message.text)
     keyboard = [months[i:i+3] for i in range(0, len(months), 3)]
     reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
     await update.message.reply_text("ماه تولد خود را انتخاب کنید:", reply_markup=reply_markup)
@@ -65,7 +64,7 @@ async def select_year(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # --- انتخاب ماه ---
 async def select_month(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    context.user_data['month'] = int(update.message.text)
+    user_states.get(update.effective_user.id).month = int(update.message.text)
     keyboard = [days[i:i+7] for i in range(0, len(days), 7)]
     reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
     await update.message.reply_text("روز تولد خود را انتخاب کنید:", reply_markup=reply_markup)
@@ -73,21 +72,25 @@ async def select_month(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # --- انتخاب روز و نمایش هوروسکوپ ---
 async def select_day(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    context.user_data['day'] = int(update.message.text)
-    cal = context.user_data['calendar']
-    y, m, d = context.user_data['year'], context.user_data['month'], context.user_data['day']
+    state = user_states.pop(update.effective_user.id) or UserState()
+    state.day = int(update.message.text)
+    if not state.has_date():
+        # وضعیت گفتگو منقضی شده (USER_STATE_TTL)
+        await update.message.reply_text("⌛️ مهلت وارد کردن اطلاعات تمام شده است. لطفاً دوباره /horoscope را بزنید.")
+        return ConversationHandler.END
+    cal = state.calendar
+    y, m, d = state.year, state.month, state.day
     
     # تبدیل شمسی به میلادی
     if cal == "هجری شمسی":
-        try:
-            g_date = JalaliDate(y, m, d).to_gregorian()
-            y, m, d = g_date.year, g_date.month, g_date.day
-        except Exception as e:
-            await update.message.reply_text(f"خطا در تبدیل تاریخ: {e}")
+        if not jalali.is_valid(y, m, d):
+            await update.message.reply_text(f"خطا در تبدیل تاریخ: تاریخ شمسی نامعتبر {y}-{m}-{d}")
             return ConversationHandler.END
+        g_date = jalali.to_gregorian(y, m, d)
+        y, m, d = g_date.year, g_date.month, g_date.day
     
     try:
-        horoscope = astro.get_horoscope(f"{y}-{m}-{d}")
+        horoscope = await executor.run(astro.get_horoscope, f"{y}-{m}-{d}")
         await update.message.reply_text(f"هوروسکوپ شما:\n{horoscope}")
     except Exception as e:
         await update.message.reply_text(f"خطا در تولید هوروسکوپ: {e}")
@@ -96,6 +99,7 @@ async def select_day(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # --- cancel ---
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_states.pop(update.effective_user.id)
     await update.message.reply_text("عملیات لغو شد.")
     return ConversationHandler.END
 
@@ -108,7 +112,9 @@ conv_handler = ConversationHandler(
         SELECT_MONTH: [MessageHandler(filters.TEXT & ~filters.COMMAND, select_month)],
         SELECT_DAY: [MessageHandler(filters.TEXT & ~filters.COMMAND, select_day)],
     },
-    fallbacks=[CommandHandler('cancel', cancel)]
+    fallbacks=[CommandHandler('cancel', cancel)],
+    # گفتگو همزمان با حذف وضعیت در user_states تمام می‌شود
+    conversation_timeout=STATE_TTL
 )
 application.add_handler(conv_handler)
 
@@ -126,26 +132,6 @@ async def echo(update: Update, context: ContextTypes.DEFAULT_TYPE):
 application.add_handler(CommandHandler("healing", healing_handler))
 application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, echo))
 
-# --- Flask App ---
-app = Flask(__name__)
-
-@app.route("/webhook", methods=["POST"])
-def webhook():
-    data = request.get_json(force=True)
-    update = Update.de_json(data, application.bot)
-    application.update_queue.put_nowait(update)
-    return jsonify({"status": "ok"})
-
-@app.route("/", methods=["GET"])
-def index():
-    return "ربات فعال است!", 200
-
 # --- اجرای webhook ---
 if __name__ == "__main__":
-    url_path = WEBHOOK_URL.split("/")[-1]
-    application.run_webhook(
-        listen="0.0.0.0",
-        port=PORT,
-        url_path=url_path,
-        webhook_url=WEBHOOK_URL
-    )
+    webhook.run(application, WEBHOOK_URL, port=PORT)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# اجرای pytest از هر پوشه‌ای: ریشه مخزن (بسته utils) در مسیر import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
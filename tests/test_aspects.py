@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from utils import astro
+
+
+def test_default_orbs_are_valid():
+    assert astro.check_orbs(astro.ASPECT_ORBS).tolist() == [8, 6, 7, 8, 8]
+
+
+@pytest.mark.parametrize("orbs", [
+    [8, 6, 15, 8, 8],      # 15 برابر نصف فاصله تربیع تا تثلیث است؛ باید کمتر باشد
+    [8, 16, 7, 8, 8],      # تسدیس 16 از نصف فاصله 60 تا 90 بیشتر است
+    [8, 6, 7, 8],          # تعداد اشتباه
+    [-1, 6, 7, 8, 8],
+])
+def test_invalid_orbs_are_rejected(orbs):
+    with pytest.raises(ValueError):
+        astro.check_orbs(orbs)
+
+
+def test_invalid_orbs_from_env_fail_at_import():
+    env = dict(os.environ, ASPECT_ORBS="8,6,20,8,8")
+    result = subprocess.run([sys.executable, "-c", "import utils.astro"], env=env,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            capture_output=True, text=True)
+    assert result.returncode != 0
+    assert "ValueError" in result.stderr and "ASPECT_ORBS" in result.stderr
+
+
+def test_aspect_matrix_matches_nearest_aspect():
+    longitudes = np.array([0.0, 95.0, 118.0, 185.0])
+    kinds, deviations = astro.aspect_matrix(longitudes)
+    assert kinds[0, 1] == 2 and deviations[0, 1] == pytest.approx(5.0)    # تربیع
+    assert kinds[0, 2] == 3 and deviations[0, 2] == pytest.approx(2.0)    # تثلیث
+    assert kinds[0, 3] == 4 and deviations[0, 3] == pytest.approx(5.0)    # مقابله
+    assert kinds[1, 2] == -1                                               # 23° بدون زاویه
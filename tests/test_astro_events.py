@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+import swisseph as swe
+
+from utils import astro
+
+# جستجوی کامل ساعتی با swe.calc و دوبخشی تا حدود یک ثانیه
+STEP = 1 / 24
+TOLERANCE = 2 / 1440  # دو دقیقه؛ دقت _refine یک دقیقه است
+
+
+def _grid(year: int) -> np.ndarray:
+    return np.arange(swe.julday(year, 1, 1, 0.0), swe.julday(year + 1, 1, 1, 0.0), STEP)
+
+
+def _bisect(func, lo: float, hi: float) -> float:
+    f_lo = func(lo)
+    while hi - lo > 1e-5:
+        mid = (lo + hi) / 2
+        if func(mid) == f_lo:
+            lo = mid
+        else:
+            hi = mid
+    return (lo + hi) / 2
+
+
+def brute_ingresses(body: int, year: int) -> list:
+    code = astro.PLANET_CODES[body]
+
+    def sign(jd):
+        return int(swe.calc(jd, code)[0][0] // 30) % 12
+
+    grid = _grid(year)
+    signs = [sign(jd) for jd in grid.tolist()]
+    return [(_bisect(sign, grid[i], grid[i + 1]), signs[i + 1])
+            for i in range(len(grid) - 1) if signs[i] != signs[i + 1]]
+
+
+def brute_stations(body: int, year: int) -> list:
+    code = astro.PLANET_CODES[body]
+
+    def retrograde(jd):
+        return swe.calc(jd, code)[0][3] < 0
+
+    grid = _grid(year)
+    states = [retrograde(jd) for jd in grid.tolist()]
+    return [(_bisect(retrograde, grid[i], grid[i + 1]), -1 if states[i + 1] else 1)
+            for i in range(len(grid) - 1) if states[i] != states[i + 1]]
+
+
+def _tt(event) -> float:
+    return event.jd + swe.deltat(event.jd)
+
+
+@pytest.mark.parametrize("body, year", [(2, 2024), (3, 2023), (4, 2024), (5, 2024), (6, 2025), (7, 2025)])
+def test_ingresses_match_sign_changes(body, year):
+    expected = brute_ingresses(body, year)
+    events = astro.ingresses(body, year)
+    assert len(events) == len(expected)
+    for event, (jd, sign) in zip(events, expected):
+        assert event.kind == astro.EVENT_INGRESS and event.body == body
+        assert event.detail == sign
+        assert _tt(event) == pytest.approx(jd, abs=TOLERANCE)
+        # لحظه رویداد روی مرز برج است
+        assert abs((event.longitude + 15) % 30 - 15) < 0.01
+
+
+@pytest.mark.parametrize("body, year", [(2, 2024), (3, 2023), (4, 2024), (5, 2024), (6, 2025)])
+def test_stations_match_speed_sign_changes(body, year):
+    expected = brute_stations(body, year)
+    events = astro.stations(body, year)
+    assert expected, "سال آزمون باید ایستگاه داشته باشد"
+    assert len(events) == len(expected)
+    for event, (jd, direction) in zip(events, expected):
+        assert event.kind == astro.EVENT_STATION and event.body == body
+        assert event.detail == direction
+        assert _tt(event) == pytest.approx(jd, abs=TOLERANCE)
+
+
+def test_mercury_retrograde_reenters_previous_sign():
+    # رجعت عطارد در ۲۰۲۴ سه بار برج را پس و پیش می‌کند
+    details = [event.detail for event in astro.ingresses(2, 2024)]
+    backwards = [prev for prev, cur in zip(details, details[1:]) if cur == (prev - 1) % 12]
+    assert backwards
@@ -0,0 +1,74 @@
+from utils.cache import LRUCache, cached
+
+
+def test_entry_cap_evicts_least_recently_used():
+    cache = LRUCache(max_entries=3, max_bytes=10 ** 6)
+    for key in "abc":
+        cache.put(key, key)
+    assert cache.get("a") == "a"  # a تازه می‌شود؛ b قدیمی‌ترین است
+    cache.put("d", "d")
+
+    assert len(cache) == 3
+    assert cache.get("b") is None
+    assert [cache.get(k) for k in "acd"] == ["a", "c", "d"]
+    assert cache.evictions == 1
+
+
+def test_byte_cap_counts_utf8_bytes():
+    cache = LRUCache(max_entries=100, max_bytes=10)
+    cache.put("x", "ابج")  # ۶ بایت
+    cache.put("y", "1234")
+    assert cache.bytes == 10
+
+    cache.put("z", "5")
+    assert cache.get("x") is None
+    assert cache.bytes == 5
+    assert cache.evictions == 1
+
+
+def test_replacing_a_key_updates_bytes():
+    cache = LRUCache(max_entries=10, max_bytes=100)
+    cache.put("k", "a" * 40)
+    cache.put("k", "b" * 10)
+    assert len(cache) == 1
+    assert cache.bytes == 10
+
+
+def test_value_larger_than_byte_cap_is_not_stored():
+    cache = LRUCache(max_entries=10, max_bytes=8)
+    cache.put("small", "1234")
+    cache.put("big", "123456789")
+    assert cache.get("big") is None
+    assert cache.get("small") == "1234"
+    assert cache.bytes == 4
+
+
+def test_cached_calls_function_once_per_key():
+    cache = LRUCache(max_entries=10, max_bytes=1000)
+    calls = []
+
+    @cached(cache, lambda x: ("square", x))
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert [square(3), square(3), square(4)] == [9, 9, 16]
+    assert calls == [3, 4]
+    assert cache.stats()["hits"] == 1
+
+
+def test_byte_cap_counts_container_contents():
+    texts = tuple("ف" * 500 for _ in range(12))  # مثل daily_horoscopes؛ هر متن ۱۰۰۰ بایت
+    cache = LRUCache(max_entries=100, max_bytes=30_000)
+    cache.put("day1", texts)
+    assert cache.bytes >= 12_000
+
+    cache.put("day2", list(texts))
+    cache.put("day3", {"texts": texts})
+    assert cache.bytes <= 30_000
+    assert cache.get("day1") is None
+    assert cache.evictions == 1
+
+    # مقدار بزرگ‌تر از کل سقف ذخیره نمی‌شود
+    cache.put("huge", tuple("x" * 1000 for _ in range(40)))
+    assert cache.get("huge") is None
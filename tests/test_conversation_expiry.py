@@ -0,0 +1,92 @@
+"""
+منقضی شدن user_states وسط گفتگو: مرحله آخر باید «دوباره شروع کنید» بفرستد و END برگرداند
+"""
+import asyncio
+import importlib.util
+import os
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from telegram.ext import ConversationHandler
+
+from utils.state import STATE_TTL, user_states
+
+ROOT = Path(__file__).resolve().parent.parent
+USER_ID = 4242
+
+
+def load_bot(filename: str):
+    os.environ.setdefault("BOT_TOKEN", "123456:TEST")
+    os.environ.setdefault("TELEGRAM_TOKEN", "123456:TEST")
+    os.environ.setdefault("WEBHOOK_URL", "https://example.invalid")
+    spec = importlib.util.spec_from_file_location(f"_bot_{abs(hash(filename))}", ROOT / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def fake_update(text: str):
+    replies = []
+
+    async def reply_text(text, **kwargs):
+        replies.append(text)
+
+    user = SimpleNamespace(id=USER_ID)
+    message = SimpleNamespace(text=text, from_user=user, reply_text=reply_text)
+    return SimpleNamespace(message=message, effective_message=message, effective_user=user), replies
+
+
+def expire(user_id: int):
+    user_states.peek(user_id).touched = time.monotonic() - STATE_TTL - 1
+
+
+# فایل، مراحل پیش از مرحله آخر (تابع، متن)، مرحله آخر و متن آن
+CONVERSATIONS = [
+    ("bot✔️_app.py", [("enter_year", "1990"), ("enter_month", "5")], "enter_day", "12"),
+    ("bot✔️✔️✔️✔️✔️_app.py", [("horoscope_day", "12"), ("horoscope_month", "5")], "horoscope_year", "1990"),
+    ("bot✔️✔️✔️✔️✔️✔️_app.py", [("calendar_choice", "میلادی"), ("year_choice", "1990"), ("month_choice", "5")],
+     "day_choice", "12"),
+    ("bot✔️✔️✔️✔️✔️✔️✔️_app.py", [("select_calendar", "میلادی"), ("select_year", "1990"), ("select_month", "5")],
+     "select_day", "12"),
+]
+
+
+@pytest.mark.parametrize("filename, steps, final, text", CONVERSATIONS, ids=[c[3] for c in CONVERSATIONS])
+def test_state_expired_mid_conversation(filename, steps, final, text):
+    bot = load_bot(filename)
+
+    async def run():
+        for name, step_text in steps:
+            update, _ = fake_update(step_text)
+            await getattr(bot, name)(update, None)
+        expire(USER_ID)
+        update, replies = fake_update(text)
+        return await getattr(bot, final)(update, None), replies
+
+    try:
+        result, replies = asyncio.run(run())
+    finally:
+        user_states.pop(USER_ID)
+    assert result == ConversationHandler.END
+    assert len(replies) == 1
+    assert "⌛️" in replies[0]
+    assert USER_ID not in user_states
+
+
+@pytest.mark.parametrize("filename", ["bot✔️_app.py", "bot✔️✔️✔️_app.py", "bot✔️✔️✔️✔️✔️_app.py",
+                                      "bot✔️✔️✔️✔️✔️✔️_app.py", "bot✔️✔️✔️✔️✔️✔️✔️_app.py"])
+def test_conversation_timeout_matches_state_ttl(filename, monkeypatch):
+    bot = load_bot(filename)
+    application = getattr(bot, "application", None)
+    if application is None:
+        # bot✔️_app هندلرها را داخل main() ثبت می‌کند
+        started = []
+        monkeypatch.setattr(bot.webhook, "run", lambda app, *args, **kwargs: started.append(app))
+        bot.main()
+        application, = started
+    conversations = [h for group in application.handlers.values() for h in group
+                     if isinstance(h, ConversationHandler)]
+    assert conversations
+    assert all(h.conversation_timeout == STATE_TTL for h in conversations)
@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from utils import astro
+
+
+@pytest.mark.parametrize("longitude, expected", [
+    (0.0, "0° Aries"),
+    (29.6, "29° Aries"),
+    (29.9999, "29° Aries"),
+    (30.0, "0° Taurus"),
+    (359.7, "29° Pisces"),
+])
+def test_degree_is_floored_within_sign(longitude, expected):
+    assert astro._degree(longitude, astro.SIGNS_EN) == expected
+
+
+def test_format_houses_never_shows_30_degrees():
+    cusps = np.arange(12) * 30 + 29.7
+    text = astro.format_houses(cusps, (29.5, 119.99), lang="en")
+    assert "30°" not in text
+    assert text.splitlines()[0] == "🌄 **Ascendant:** 29° Aries"
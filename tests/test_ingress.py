@@ -0,0 +1,137 @@
+import asyncio
+import itertools
+
+from telegram import Update
+
+from utils.ingress import UpdateIngress
+
+_ids = itertools.count(1)
+
+
+def message(chat_id: int, text: str, update_id: int = None) -> Update:
+    update_id = update_id or next(_ids)
+    data = {
+        "message_id": update_id,
+        "date": 0,
+        "chat": {"id": chat_id, "type": "private"},
+        "from": {"id": chat_id, "is_bot": False, "first_name": "test"},
+        "text": text,
+    }
+    if text.startswith("/"):
+        data["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+    return Update.de_json({"update_id": update_id, "message": data}, None)
+
+
+def callback(chat_id: int, data: str) -> Update:
+    update_id = next(_ids)
+    return Update.de_json({
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "chat_instance": str(chat_id),
+            "data": data,
+            "from": {"id": chat_id, "is_bot": False, "first_name": "test"},
+            "message": {"message_id": 1, "date": 0, "chat": {"id": chat_id, "type": "private"}},
+        },
+    }, None)
+
+
+class RecordingApplication:
+    """
+    جای Application: ترتیب پردازش را ثبت می‌کند؛ blocked[chat] هندلر آن چت را نگه می‌دارد
+    """
+
+    def __init__(self):
+        self.processed = []
+        self.blocked = {}
+
+    async def process_update(self, update):
+        gate = self.blocked.get(update.effective_chat.id)
+        if gate is not None:
+            await gate.wait()
+        self.processed.append((update.effective_chat.id, update.update_id))
+
+
+async def _drain(ingress: UpdateIngress, count: int, timeout: float = 2.0):
+    async def wait():
+        while len(ingress.application.processed) < count:
+            await asyncio.sleep(0.001)
+    await asyncio.wait_for(wait(), timeout)
+
+
+def test_duplicate_update_id_is_dropped():
+    ingress = UpdateIngress(RecordingApplication())
+    update = message(1, "/start")
+    assert ingress.submit(update) == "accepted"
+    assert ingress.submit(message(1, "/start", update_id=update.update_id)) == "duplicate"
+    assert (ingress.accepted, ingress.duplicates, ingress.depth) == (1, 1, 1)
+
+
+def test_lower_priority_is_shed_when_full():
+    ingress = UpdateIngress(RecordingApplication(), max_depth=2)
+    old_echo = message(10, "hello")  # بدون دستور قبلی: اولویت low
+    assert ingress.submit(old_echo) == "accepted"
+    assert ingress.submit(message(11, "hello")) == "accepted"
+
+    # صف پر است: دستور جای قدیمی‌ترین low را می‌گیرد
+    assert ingress.submit(message(12, "/start")) == "accepted"
+    assert ingress.dropped == [0, 0, 1]
+    assert ingress.depth == 2
+    assert all(entry.update is not old_echo for entry in ingress._chats[11])
+    assert 10 not in [key for key, queue in ingress._chats.items() if queue]
+
+    # low تازه وقتی چیزی کم‌اهمیت‌تر از خودش نیست کنار گذاشته می‌شود
+    assert ingress.submit(message(13, "hello")) == "dropped"
+    assert ingress.dropped == [0, 0, 2]
+
+
+def test_chat_order_is_fifo_even_for_commands():
+    async def run():
+        app = RecordingApplication()
+        ingress = UpdateIngress(app, concurrency=4)
+        updates = [message(1, "/start"), message(1, "1375"), callback(1, "fa"), message(1, "/cancel")]
+        for update in updates:
+            ingress.submit(update)
+        ingress.start()
+        await _drain(ingress, len(updates))
+        await ingress.stop()
+        return app.processed, [u.update_id for u in updates]
+
+    processed, expected = asyncio.run(run())
+    assert [update_id for _, update_id in processed] == expected
+
+
+def test_blocked_chat_does_not_stall_other_chats():
+    async def run():
+        app = RecordingApplication()
+        gate = app.blocked[1] = asyncio.Event()
+        ingress = UpdateIngress(app, concurrency=2)
+        ingress.submit(message(1, "/start"))
+        ingress.submit(message(1, "next"))
+        ingress.submit(message(2, "/start"))
+        ingress.start()
+        await _drain(ingress, 1)
+        first = list(app.processed)
+        gate.set()
+        await _drain(ingress, 3)
+        await ingress.stop()
+        return first, app.processed
+
+    first, processed = asyncio.run(run())
+    assert [chat for chat, _ in first] == [2]
+    assert [chat for chat, _ in processed] == [2, 1, 1]
+
+
+def test_priority_picks_between_chats():
+    async def run():
+        app = RecordingApplication()
+        ingress = UpdateIngress(app, concurrency=1)
+        ingress.submit(message(1, "echo"))     # low
+        ingress.submit(message(2, "/start"))   # high
+        ingress.submit(callback(3, "fa"))      # high
+        ingress.start()
+        await _drain(ingress, 3)
+        await ingress.stop()
+        return [chat for chat, _ in app.processed]
+
+    assert asyncio.run(run()) == [2, 3, 1]
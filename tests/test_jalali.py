@@ -0,0 +1,72 @@
+from datetime import date
+
+import numpy as np
+import pytest
+from persiantools.jdatetime import JalaliDate
+
+from utils import jalali
+
+# مرزهای جدول و اطراف آن (مسیر persiantools)
+EDGE_YEARS = [jalali.FIRST_YEAR - 1, jalali.FIRST_YEAR, jalali.FIRST_YEAR + 1,
+              jalali.LAST_YEAR - 1, jalali.LAST_YEAR, jalali.LAST_YEAR + 1]
+LEAP_YEARS = [y for y in range(jalali.FIRST_YEAR, jalali.LAST_YEAR + 1) if JalaliDate.is_leap(y)]
+
+
+def _boundary_dates(year: int):
+    # اول و آخر هر نیمه سال و دو روز آخر اسفند (۳۰ اسفند فقط در سال کبیسه)
+    yield year, 1, 1
+    yield year, 6, 31
+    yield year, 7, 1
+    yield year, 12, 29
+    if JalaliDate.is_leap(year):
+        yield year, 12, 30
+
+
+@pytest.mark.parametrize("year", EDGE_YEARS + LEAP_YEARS[:3] + LEAP_YEARS[-3:] + [1399, 1403, 1404])
+def test_matches_persiantools(year):
+    for y, m, d in _boundary_dates(year):
+        expected = JalaliDate(y, m, d).to_gregorian()
+        assert jalali.to_gregorian(y, m, d) == expected
+        assert jalali.from_gregorian(expected) == (y, m, d)
+
+
+def test_leap_years_match_persiantools():
+    for year in range(jalali.FIRST_YEAR, jalali.LAST_YEAR + 1):
+        assert jalali.is_leap(year) == JalaliDate.is_leap(year), year
+
+
+def test_esfand_30_only_in_leap_years():
+    leap, common = LEAP_YEARS[0], LEAP_YEARS[0] + 1
+    assert jalali.is_valid(leap, 12, 30)
+    assert not jalali.is_valid(common, 12, 30)
+    # روز بعد از آخرین روز سال = ۱ فروردین سال بعد
+    assert jalali.to_ordinal(leap, 12, 30) + 1 == jalali.to_ordinal(leap + 1, 1, 1)
+    assert jalali.to_ordinal(common, 12, 29) + 1 == jalali.to_ordinal(common + 1, 1, 1)
+    with pytest.raises(ValueError):
+        jalali.to_gregorian(common, 12, 30)
+
+
+def test_round_trip_over_whole_table():
+    # هر روز از ۱ فروردین ۱۲۰۰ تا آخر ۱۵۰۰ (هر ۷ روز برای سرعت)
+    for ordinal in range(jalali.FIRST_ORDINAL, jalali.LAST_ORDINAL + 1, 7):
+        y, m, d = jalali.from_ordinal(ordinal)
+        assert jalali.to_ordinal(y, m, d) == ordinal
+
+
+def test_array_conversion_matches_scalar():
+    years = np.array([1200, 1375, 1403, 1500, 1403, 1404])
+    months = np.array([1, 12, 12, 12, 13, 12])
+    days = np.array([1, 30, 30, 29, 1, 30])
+    out = jalali.to_gregorian_array(years, months, days)
+    for value, y, m, d in zip(out, years.tolist(), months.tolist(), days.tolist()):
+        if jalali.is_valid(y, m, d):
+            assert value == np.datetime64(jalali.to_gregorian(y, m, d))
+        else:
+            assert np.isnat(value)
+
+
+def test_invalid_inputs():
+    assert not jalali.is_valid(None, 1, 1)
+    assert not jalali.is_valid(1400, 0, 1)
+    assert not jalali.is_valid(1400, 7, 31)
+    assert jalali.to_jdn(1400, 1, 1) - jalali.JDN_OFFSET == date(2021, 3, 21).toordinal()
@@ -0,0 +1,100 @@
+import asyncio
+import sqlite3
+
+from utils.media import FileIdCache
+
+
+def last_used(path, key):
+    conn = sqlite3.connect(path)
+    try:
+        row = conn.execute("SELECT last_used FROM file_ids WHERE hash = ?", (key,)).fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def test_hit_does_not_wait_for_disk(tmp_path):
+    db = str(tmp_path / "state.sqlite3")
+
+    async def run():
+        cache = FileIdCache(flush_interval=3600)
+        cache.open(db)
+        await cache.put("a", "file-a", 10)
+        written = last_used(db, "a")
+        async with cache._lock:
+            # حتی با قفل نوشتن گرفته شده، hit فوراً جواب می‌دهد
+            assert cache.get("a") == "file-a"
+        assert last_used(db, "a") == written
+        assert "a" in cache._touched
+        await cache.flush()
+        return written
+
+    written = asyncio.run(run())
+    assert last_used(db, "a") > written
+
+
+def test_touches_are_written_with_next_put(tmp_path):
+    db = str(tmp_path / "state.sqlite3")
+
+    async def run():
+        cache = FileIdCache(flush_interval=3600)
+        cache.open(db)
+        await cache.put("a", "file-a", 10)
+        written = last_used(db, "a")
+        cache.get("a")
+        await cache.put("b", "file-b", 20)
+        assert not cache._touched
+        assert last_used(db, "a") > written
+        await cache.flush()
+
+    asyncio.run(run())
+
+
+def test_touches_are_flushed_periodically(tmp_path):
+    db = str(tmp_path / "state.sqlite3")
+
+    async def run():
+        cache = FileIdCache(flush_interval=0.01)
+        cache.open(db)
+        await cache.put("a", "file-a", 10)
+        written = last_used(db, "a")
+        cache.get("a")
+        await asyncio.sleep(0.1)
+        assert not cache._touched
+        return written
+
+    written = asyncio.run(run())
+    assert last_used(db, "a") > written
+
+
+def test_eviction_keeps_lru_order_and_drops_touches(tmp_path):
+    async def run():
+        cache = FileIdCache(max_entries=2, flush_interval=3600)
+        cache.open(str(tmp_path / "state.sqlite3"))
+        await cache.put("a", "file-a", 1)
+        await cache.put("b", "file-b", 1)
+        cache.get("a")
+        await cache.put("c", "file-c", 1)
+        await cache.flush()
+        return cache
+
+    cache = asyncio.run(run())
+    assert list(cache._entries) == ["a", "c"]
+    assert cache.evictions == 1
+    reopened = FileIdCache(max_entries=2)
+    reopened.open(str(tmp_path / "state.sqlite3"))
+    assert set(reopened._entries) == {"a", "c"}
+
+
+def test_path_hashes_are_capped(tmp_path):
+    cache = FileIdCache(max_entries=3)
+    paths = []
+    for i in range(5):
+        path = tmp_path / f"{i}.png"
+        path.write_bytes(bytes([i]) * 16)
+        paths.append(str(path))
+        cache._read(str(path))
+    cache._read(paths[2])
+    assert list(cache._path_hashes) == [paths[3], paths[4], paths[2]]
+    data, key, size = cache._read(paths[2])
+    assert data is None and size == 16
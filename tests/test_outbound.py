@@ -0,0 +1,149 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from telegram.error import RetryAfter
+
+from utils import outbound
+from utils.outbound import TokenBucket, TokenBucketRateLimiter
+
+
+def bucket(rate: float, capacity: float, now: float = 0.0) -> TokenBucket:
+    b = TokenBucket(rate, capacity)
+    b.updated = now
+    return b
+
+
+def test_reserve_waits_for_next_token():
+    b = bucket(rate=2, capacity=1)
+    assert b.reserve(0.0) == 0.0
+    assert b.reserve(0.0) == pytest.approx(0.5)
+    assert b.reserve(0.0) == pytest.approx(1.0)
+    # سه رزرو تا 1.5 ثانیه پس داده شده و یکی جا دارد
+    assert b.reserve(1.5) == 0.0
+
+
+def test_refill_is_capped_by_capacity():
+    b = bucket(rate=1, capacity=3)
+    for _ in range(3):
+        assert b.reserve(0.0) == 0.0
+    assert b.reserve(0.0) == pytest.approx(1.0)
+    # بعد از مدت طولانی فقط capacity توکن جمع می‌شود
+    for _ in range(3):
+        assert b.reserve(100.0) == 0.0
+    assert b.reserve(100.0) == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("rate", [1.0, 1 / 3, 30.0])
+def test_block_delays_next_request_by_retry_after(rate):
+    b = bucket(rate=rate, capacity=1)
+    b.block(0.0, 3.0)
+    assert b.reserve(0.0) == pytest.approx(3.0)
+
+
+def test_block_does_not_shorten_existing_debt():
+    b = bucket(rate=1, capacity=1)
+    for _ in range(6):
+        b.reserve(0.0)
+    b.block(0.0, 1.0)
+    assert b.reserve(0.0) > 1.0
+
+
+class Clock:
+    """
+    ساعت ساختگی: sleep فقط زمان را جلو می‌برد و مدت‌ها را ثبت می‌کند
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(outbound, "time", SimpleNamespace(monotonic=clock.monotonic, perf_counter=time.perf_counter))
+    monkeypatch.setattr(outbound, "asyncio", SimpleNamespace(sleep=clock.sleep))
+    return clock
+
+
+def limiter(**kwargs) -> TokenBucketRateLimiter:
+    kwargs.setdefault("global_rate", 1000)
+    kwargs.setdefault("global_burst", 1000)
+    rate_limiter = TokenBucketRateLimiter(**kwargs)
+    rate_limiter.global_bucket.updated = 0.0
+    return rate_limiter
+
+
+def failing(*retry_afters):
+    calls = []
+    pending = list(retry_afters)
+
+    async def callback():
+        calls.append(None)
+        if pending:
+            raise RetryAfter(pending.pop(0))
+        return "ok"
+
+    return callback, calls
+
+
+def test_retry_after_waits_then_retries(clock):
+    rate_limiter = limiter()
+    callback, calls = failing(2)
+    result = asyncio.run(rate_limiter.process_request(callback, (), {}, "sendMessage", {"chat_id": 5}, None))
+    assert result == "ok"
+    assert len(calls) == 2
+    assert clock.sleeps == [2.0]
+    assert rate_limiter.retries == 1 and rate_limiter.errors == 0
+
+    # چت بعدی منتظر 429 این چت نمی‌ماند
+    callback, _ = failing()
+    asyncio.run(rate_limiter.process_request(callback, (), {}, "sendMessage", {"chat_id": 6}, None))
+    assert clock.sleeps == [2.0]
+
+
+def test_long_retry_after_is_raised(clock):
+    rate_limiter = limiter(max_retry_wait=5)
+    callback, calls = failing(30)
+    with pytest.raises(RetryAfter):
+        asyncio.run(rate_limiter.process_request(callback, (), {}, "sendMessage", {"chat_id": 5}, None))
+    assert len(calls) == 1
+    assert clock.sleeps == []
+    assert rate_limiter.errors == 1
+    # bucket چت بسته ماند: پیام بعدی همین چت تا پایان مهلت صبر می‌کند
+    callback, _ = failing()
+    asyncio.run(rate_limiter.process_request(callback, (), {}, "sendMessage", {"chat_id": 5}, None))
+    assert clock.sleeps == [30.0]
+
+
+def test_retries_are_bounded(clock):
+    rate_limiter = limiter(max_retries=2)
+    callback, calls = failing(1, 1, 1)
+    with pytest.raises(RetryAfter):
+        asyncio.run(rate_limiter.process_request(callback, (), {}, "sendMessage", {"chat_id": 5}, None))
+    assert len(calls) == 3
+    assert rate_limiter.retries == 2 and rate_limiter.errors == 1
+
+
+def test_chatless_retry_after_blocks_only_that_method(clock):
+    rate_limiter = limiter()
+    callback, calls = failing(2)
+    asyncio.run(rate_limiter.process_request(callback, (), {}, "answerCallbackQuery", {}, None))
+    assert len(calls) == 2
+    assert clock.sleeps == [2.0]
+    assert rate_limiter.stats()["blocked_methods"] == 1
+
+    # مهلت گذشته و متدهای دیگر هم منتظر نمی‌مانند
+    callback, _ = failing()
+    asyncio.run(rate_limiter.process_request(callback, (), {}, "answerCallbackQuery", {}, None))
+    asyncio.run(rate_limiter.process_request(callback, (), {}, "getMe", {}, None))
+    assert clock.sleeps == [2.0]
@@ -0,0 +1,92 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from utils import persistence
+from utils.persistence import SQLitePersistence
+
+
+@pytest.fixture(autouse=True)
+def fast_retry(monkeypatch):
+    monkeypatch.setattr(persistence, "RETRY_DELAY", 0.01)
+    monkeypatch.setattr(persistence, "RETRY_MAX_DELAY", 0.02)
+
+
+def failing_writes(store: SQLitePersistence, failures: int, on_failure=None):
+    """
+    _write_batch که failures بار اول sqlite3.OperationalError می‌دهد
+    """
+    write = store._write_batch
+    calls = []
+
+    def wrapped(pending):
+        calls.append(dict(pending))
+        if len(calls) <= failures:
+            if on_failure is not None:
+                on_failure()
+            raise sqlite3.OperationalError("database is locked")
+        write(pending)
+
+    store._write_batch = wrapped
+    return calls
+
+
+async def saved_user_data(path) -> dict:
+    reader = SQLitePersistence(path, state_store=None)
+    try:
+        return await reader.get_user_data()
+    finally:
+        reader._conn.close()
+
+
+def test_failed_batch_is_retried_and_keeps_newer_values(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+
+    async def run():
+        store = SQLitePersistence(path, state_store=None)
+        # وسط نوشتن ناموفق، مقدار جدیدتری برای کاربر ۱ می‌رسد
+        calls = failing_writes(store, 2, lambda: store._pending.setdefault(
+            ("user_data", 1), persistence.pickle.dumps({"v": "new"})))
+        await store.update_user_data(1, {"v": "old"})
+        await store.update_user_data(2, {"v": "two"})
+        await store._flush_task
+        await store.flush()
+        return store, calls
+
+    store, calls = asyncio.run(run())
+    assert len(calls) == 3
+    assert store.failures == 2
+    assert asyncio.run(saved_user_data(path)) == {1: {"v": "new"}, 2: {"v": "two"}}
+
+
+def test_flush_cancels_backoff_and_writes(tmp_path, monkeypatch):
+    path = str(tmp_path / "state.sqlite3")
+    monkeypatch.setattr(persistence, "RETRY_DELAY", 60)
+
+    async def run():
+        store = SQLitePersistence(path, state_store=None)
+        failing_writes(store, 1)
+        await store.update_user_data(1, {"v": 1})
+        await asyncio.sleep(0.05)  # نوشتن اول شکست خورده و task در انتظار ۶۰ ثانیه است
+        assert not store._flush_task.done()
+        await asyncio.wait_for(store.flush(), 5)
+
+    asyncio.run(run())
+    assert asyncio.run(saved_user_data(path)) == {1: {"v": 1}}
+
+
+def test_flush_gives_up_after_shutdown_attempts(tmp_path, monkeypatch):
+    path = str(tmp_path / "state.sqlite3")
+    monkeypatch.setattr(persistence, "SHUTDOWN_ATTEMPTS", 2)
+
+    async def run():
+        store = SQLitePersistence(path, state_store=None)
+        calls = failing_writes(store, 100)
+        store._pending[("user_data", 1)] = persistence.pickle.dumps({"v": 1})
+        await store.flush()
+        return store, calls
+
+    store, calls = asyncio.run(run())
+    assert len(calls) == 2
+    assert ("user_data", 1) in store._pending
@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils import state as state_module
+from utils.state import UserStateStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(state_module, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def test_state_expires_after_ttl(clock):
+    store = UserStateStore(ttl=60, max_entries=10)
+    store.get(1).year = 1375
+    clock.value += 59
+    assert store.peek(1).year == 1375
+
+    clock.value += 1
+    assert store.peek(1) is None
+    assert 1 not in store
+    assert store.expired == 1
+    # رکورد تازه بعد از انقضا خالی است
+    assert store.get(1).year is None
+
+
+def test_get_refreshes_ttl(clock):
+    store = UserStateStore(ttl=60, max_entries=10)
+    store.get(1)
+    store.get(2)
+    clock.value += 40
+    store.get(1)
+    clock.value += 30
+    # ۲ هفتاد ثانیه دست نخورده و ۱ سی ثانیه پیش تازه شده
+    assert store.peek(2) is None
+    assert store.peek(1) is not None
+    assert store.expired == 1
+
+
+def test_peek_does_not_create_or_refresh(clock):
+    store = UserStateStore(ttl=60, max_entries=10)
+    assert store.peek(1) is None
+    assert len(store) == 0
+    store.get(1)
+    clock.value += 50
+    store.peek(1)
+    clock.value += 10
+    assert store.peek(1) is None
+
+
+def test_max_entries_evicts_least_recently_used(clock):
+    store = UserStateStore(ttl=60, max_entries=3)
+    for user_id in (1, 2, 3):
+        store.get(user_id)
+    store.get(1)
+    store.get(4)
+    assert len(store) == 3
+    assert 2 not in store
+    assert all(user_id in store for user_id in (1, 3, 4))
+    assert store.evicted == 1
+    assert store.stats()["entries"] == 3
+
+
+def test_pop_removes_state(clock):
+    store = UserStateStore(ttl=60, max_entries=3)
+    store.get(1).lang = "fa"
+    assert store.pop(1).lang == "fa"
+    assert store.pop(1) is None
+    assert len(store) == 0
+
+
+def test_pop_ignores_expired_state(clock):
+    store = UserStateStore(ttl=60, max_entries=3)
+    store.get(1).year = 1375
+    clock.value += 60
+    assert store.pop(1) is None
+    assert store.expired == 1
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from utils import synastry
+from utils.synastry import SynastryIndex, pair_score, percent
+
+
+def brute_score(a, b) -> float:
+    """
+    تعریف مستقیم امتیاز: جمع وزن‌دار cos(h·(a_i - b_j)) روی جفت‌سیاره‌ها و هارمونیک‌ها
+    """
+    a, b = np.radians(a), np.radians(b)
+    return sum(pair_weight * weight * np.cos(h * (a[mine] - b[theirs]))
+               for (mine, theirs), pair_weight in synastry.SYNASTRY_PAIRS.items()
+               for h, weight in synastry.HARMONICS.items())
+
+
+def brute_top_k(query, profiles: dict, k: int, exclude=None) -> list:
+    scored = [(brute_score(query, lons), user_id) for user_id, lons in profiles.items() if user_id != exclude]
+    scored.sort(reverse=True)
+    return scored[:k]
+
+
+def assert_matches_brute(result, query, profiles, k, exclude=None):
+    expected = brute_top_k(query, profiles, k, exclude)
+    assert len(result) == len(expected)
+    # float32 ممکن است جای دو امتیاز تقریباً برابر را عوض کند؛ امتیاز هر رتبه باید یکی باشد
+    got = [brute_score(query, profiles[user_id]) for user_id, _ in result]
+    assert got == pytest.approx([score for score, _ in expected], abs=1e-3)
+    for (user_id, shown), score in zip(result, got):
+        assert shown == pytest.approx(float(percent(score)), abs=0.11)
+
+
+@pytest.fixture
+def profiles():
+    rng = np.random.default_rng(7)
+    return {user_id: rng.uniform(0, 360, 10) for user_id in range(1000, 1500)}
+
+
+@pytest.fixture
+def index(profiles):
+    index = SynastryIndex(capacity=16)  # چند بار _grow اجرا می‌شود
+    index.upsert_many(profiles.keys(), np.array(list(profiles.values())))
+    return index
+
+
+@pytest.mark.parametrize("k", [1, 10, 50])
+def test_top_k_matches_brute_force(index, profiles, k):
+    rng = np.random.default_rng(k)
+    for _ in range(5):
+        query = rng.uniform(0, 360, 10)
+        assert_matches_brute(index.top_k(query, k), query, profiles, k)
+
+
+def test_top_k_excludes_self(index, profiles):
+    query = profiles[1200]
+    result = index.top_k(query, 10, exclude=1200)
+    assert 1200 not in [user_id for user_id, _ in result]
+    assert_matches_brute(result, query, profiles, 10, exclude=1200)
+
+
+def test_k_larger_than_index():
+    index = SynastryIndex()
+    assert index.top_k(np.zeros(10), 5) == []
+    index.upsert_many([1, 2], np.array([np.zeros(10), np.full(10, 90.0)]))
+    assert len(index.top_k(np.zeros(10), 5)) == 2
+    assert [user_id for user_id, _ in index.top_k(np.zeros(10), 5, exclude=1)] == [2]
+
+
+def test_remove_and_update_keep_ranking_correct(index, profiles):
+    rng = np.random.default_rng(1)
+    for user_id in list(profiles)[::3]:
+        index.remove(user_id)
+        del profiles[user_id]
+    updated = list(profiles)[::5]
+    new_lons = rng.uniform(0, 360, (len(updated), 10))
+    index.upsert_many(updated, new_lons)
+    profiles.update(zip(updated, new_lons))
+    assert len(index) == len(profiles)
+
+    query = rng.uniform(0, 360, 10)
+    assert_matches_brute(index.top_k(query, 20), query, profiles, 20)
+
+
+def test_pair_score_matches_definition(profiles):
+    a, b = profiles[1000], profiles[1001]
+    assert pair_score(a, b) == pytest.approx(float(percent(brute_score(a, b))), abs=0.11)
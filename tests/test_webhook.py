@@ -0,0 +1,56 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from utils.webhook import create_webhook_app
+
+SECRET = "s3cret"
+
+
+def post(body, secret: str = SECRET):
+    """
+    POST بدنه (شیء JSON یا bytes خام) به /webhook؛ خروجی (status، تعداد آپدیت‌های صف شده)
+    """
+    raw = body if isinstance(body, bytes) else json.dumps(body).encode()
+
+    async def run():
+        application = SimpleNamespace(bot=None, update_queue=asyncio.Queue())
+        async with TestClient(TestServer(create_webhook_app(application, secret_token=SECRET))) as client:
+            response = await client.post("/webhook", data=raw, headers={
+                "X-Telegram-Bot-Api-Secret-Token": secret, "Content-Type": "application/json"})
+            return response.status, application.update_queue.qsize()
+
+    return asyncio.run(run())
+
+
+def test_valid_update_is_queued():
+    update = {"update_id": 1, "message": {"message_id": 1, "date": 0, "chat": {"id": 1, "type": "private"},
+                                          "text": "/start"}}
+    assert post(update) == (200, 1)
+
+
+def test_wrong_secret_is_forbidden():
+    assert post({"update_id": 1}, secret="nope") == (403, 0)
+
+
+def test_invalid_json_is_rejected():
+    assert post(b"{") == (400, 0)
+
+
+@pytest.mark.parametrize("body", [[{"update_id": 1}], [], 5, "update", None, True])
+def test_non_object_json_is_rejected(body):
+    assert post(body) == (400, 0)
+
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"message": {}},
+    {"update_id": 1, "message": 5},
+    {"update_id": 1, "message": {"chat": 1}},
+])
+def test_update_rejected_by_de_json_is_acknowledged(body):
+    # 200 تا تلگرام آپدیت خراب را دوباره نفرستد؛ چیزی به صف نمی‌رود
+    assert post(body) == (200, 0)
@@ -1,37 +1,699 @@
+import os
+import functools
+import numpy as np
+import pytz
 import swisseph as swe
-from datetime import datetime
+from datetime import date, datetime, time, timedelta
+from time import perf_counter
+from typing import NamedTuple
 
-def get_horoscope(birth_date: datetime) -> str:
+from utils import metrics
+from utils.cache import cached, horoscope_cache
+
+# ترتیب این دیکشنری ترتیب محور دوم خروجی get_positions_batch است
+planets = {
+    "خورشید": swe.SUN,
+    "ماه": swe.MOON,
+    "عطارد": swe.MERCURY,
+    "ناهید": swe.VENUS,
+    "مریخ": swe.MARS,
+    "مشتری": swe.JUPITER,
+    "زحل": swe.SATURN,
+    "اورانوس": swe.URANUS,
+    "نپتون": swe.NEPTUNE,
+    "پلوتو": swe.PLUTO
+}
+
+PLANET_NAMES = tuple(planets.keys())
+PLANET_NAMES_EN = ("Sun", "Moon", "Mercury", "Venus", "Mars", "Jupiter", "Saturn", "Uranus", "Neptune", "Pluto")
+PLANET_CODES = tuple(planets.values())
+
+SIGNS = ("حمل", "ثور", "جوزا", "سرطان", "اسد", "سنبله", "میزان", "عقرب", "قوس", "جدی", "دلو", "حوت")
+SIGNS_EN = ("Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
+            "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces")
+
+# swe.julday(y, m, d) بدون ساعت، ظهر (12:00) را در نظر می‌گیرد
+_NOON_JD_1970 = swe.julday(1970, 1, 1)
+
+# ---------- جدول روزانه پیش‌محاسبه‌شده (python -m utils.ephemeris) ----------
+TABLE_FIRST_JD = swe.julday(1900, 1, 1)
+TABLE_LAST_JD = swe.julday(2100, 12, 31)
+TABLE_PATH = os.environ.get(
+    "EPHEMERIS_TABLE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "ephemeris_1900_2100.npy")
+)
+
+_table = None
+_table_loaded = False
+
+
+def _as_date(value) -> date:
     """
-    تولید متن هوروسکوپ بر اساس موقعیت سیارات
+    تبدیل ورودی‌های رایج ربات‌ها (datetime / date / تاپل / رشته YYYY-MM-DD) به date
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, (tuple, list)):
+        return date(*(int(v) for v in value[:3]))
+    if isinstance(value, str):
+        parts = value.strip().replace("/", "-").split("-")
+        return date(*(int(p) for p in parts[:3]))
+    raise TypeError(f"نوع تاریخ پشتیبانی نمی‌شود: {type(value).__name__}")
+
+
+def sign_of(longitude):
+    """
+    شماره برج (۰ = حمل) برای طول دایره‌البروجی؛ روی آرایه هم کار می‌کند
+    """
+    return (np.asarray(longitude) // 30).astype(int) % 12
+
+
+def birth_date_from(user_data: dict) -> date:
+    """
+    استخراج تاریخ تولد از user_data (کلید birth_date یا year/month/day)
+    """
+    if user_data.get("birth_date") is not None:
+        return _as_date(user_data["birth_date"])
+    return _as_date((user_data["year"], user_data["month"], user_data["day"]))
+
+
+def julian_day(birth_date) -> float:
+    """
+    روز ژولینی یک تاریخ (معادل swe.julday بدون ساعت)
+    """
+    return float(np.datetime64(_as_date(birth_date), "D").astype(np.int64) + _NOON_JD_1970)
+
+
+def julian_days(dates) -> np.ndarray:
+    """
+    روز ژولینی (ظهر، مثل swe.julday) برای آرایه‌ای از تاریخ‌ها به صورت برداری
     """
+    days = np.array([_as_date(d) for d in dates], dtype="datetime64[D]")
+    return days.astype(np.int64) + _NOON_JD_1970
+
+
+def load_ephemeris_table():
+    """
+    جدول روزانه را به صورت memory-map باز می‌کند (فقط یک بار در هر پروسه)
+
+    اگر فایل ساخته نشده باشد None برمی‌گرداند و محاسبه با swisseph انجام می‌شود.
+    """
+    global _table, _table_loaded
+    if not _table_loaded:
+        _table_loaded = True
+        expected = (int(TABLE_LAST_JD - TABLE_FIRST_JD) + 1, len(PLANET_CODES), 3)
+        try:
+            table = np.load(TABLE_PATH, mmap_mode="r")
+        except (OSError, ValueError):
+            table = None
+        if table is not None and table.shape == expected:
+            _table = table
+    return _table
+
+
+# زمان هر فراخوانی swisseph؛ در حلقه‌ها میانگین دسته ثبت می‌شود (observe با count)
+swe_seconds = metrics.Histogram("bot_swe_seconds", "Time per swisseph call", ("function",))
+_calc_seconds = swe_seconds.labels("calc")
+_houses_seconds = swe_seconds.labels("houses")
+
+
+def _calc(jd: float, code: int):
+    start = perf_counter()
+    result = swe.calc(jd, code)
+    _calc_seconds.observe(perf_counter() - start)
+    return result
+
+
+def calc_positions(jds) -> np.ndarray:
+    """
+    محاسبه مستقیم با swisseph برای آرایه‌ای از روزهای ژولینی؛ خروجی (N, 10, 3)
+    """
+    positions = np.empty((len(jds), len(PLANET_CODES), 3))
+    calc = swe.calc
+    start = perf_counter()
+    for i, jd in enumerate(np.asarray(jds, dtype=float).tolist()):
+        row = positions[i]
+        for j, code in enumerate(PLANET_CODES):
+            row[j] = calc(jd, code)[0][:3]
+    calls = len(positions) * len(PLANET_CODES)
+    if calls:
+        _calc_seconds.observe((perf_counter() - start) / calls, calls)
+    return positions
+
+
+def get_positions_batch(dates) -> np.ndarray:
+    """
+    موقعیت ده سیاره برای چند تاریخ به صورت یکجا
+
+    خروجی آرایه‌ای با شکل (N, 10, 3) است: طول، عرض و فاصله هر سیاره.
+    تاریخ‌های تکراری (تولدهای مشترک) فقط یک بار محاسبه می‌شوند و
+    تاریخ‌های ۱۹۰۰ تا ۲۱۰۰ در صورت وجود جدول مستقیماً از آن خوانده می‌شوند.
+    """
+    jds = julian_days(dates)
+    unique_jds, inverse = np.unique(jds, return_inverse=True)
+
+    positions = np.empty((len(unique_jds), len(PLANET_CODES), 3))
+    in_table = np.zeros(len(unique_jds), dtype=bool)
+
+    table = load_ephemeris_table()
+    if table is not None:
+        in_table = (unique_jds >= TABLE_FIRST_JD) & (unique_jds <= TABLE_LAST_JD)
+        rows = (unique_jds[in_table] - TABLE_FIRST_JD).astype(np.intp)
+        positions[in_table] = table[rows]
+
+    missing = ~in_table
+    if missing.any():
+        positions[missing] = calc_positions(unique_jds[missing])
+
+    return positions[inverse]
+
+
+# ---------- زاویه‌ها (aspects) ----------
 
-    jd = swe.julday(
-        birth_date.year,
-        birth_date.month,
-        birth_date.day
+ASPECT_ANGLES = np.array([0.0, 60.0, 90.0, 120.0, 180.0])
+ASPECT_NAMES = ("مقارنه", "تسدیس", "تربیع", "تثلیث", "مقابله")
+ASPECT_NAMES_EN = ("Conjunction", "Sextile", "Square", "Trine", "Opposition")
+# orb مجاز هر زاویه (درجه) به همان ترتیب ASPECT_ANGLES
+ASPECT_ORBS = np.array([float(v) for v in os.environ.get("ASPECT_ORBS", "8,6,7,8,8").split(",")])
+_ASPECT_MIDPOINTS = (ASPECT_ANGLES[1:] + ASPECT_ANGLES[:-1]) / 2
+
+
+def check_orbs(orbs) -> np.ndarray:
+    """
+    هر orb باید از نصف فاصله تا زاویه‌های مجاور کمتر باشد؛ aspect_matrix فقط نزدیک‌ترین زاویه را می‌سنجد
+    """
+    orbs = np.asarray(orbs, dtype=float)
+    if orbs.shape != ASPECT_ANGLES.shape:
+        raise ValueError(f"ASPECT_ORBS باید {len(ASPECT_ANGLES)} عدد باشد، نه {orbs.size}")
+    half_gaps = np.diff(ASPECT_ANGLES) / 2
+    too_wide = (orbs[:-1] >= half_gaps) | (orbs[1:] >= half_gaps)
+    if (orbs < 0).any() or too_wide.any():
+        raise ValueError(f"ASPECT_ORBS={orbs.tolist()}: هر orb باید نامنفی و کمتر از نصف فاصله تا "
+                         f"زاویه مجاور باشد (حداکثر {half_gaps.tolist()} بین زاویه‌های {ASPECT_ANGLES.tolist()})")
+    return orbs
+
+
+check_orbs(ASPECT_ORBS)
+# تعداد زاویه‌های دقیق‌تر که در متن هوروسکوپ آورده می‌شوند
+MAX_ASPECTS_IN_TEXT = 6
+
+
+def aspect_matrix(longitudes, other=None, orbs=ASPECT_ORBS):
+    """
+    زاویه‌های اصلی بین سیارات، برای همه جفت‌ها در یک محاسبه برداری
+
+    longitudes با شکل (..., n) و other با شکل (..., m) (قابل broadcast):
+    - یک نقشه: aspect_matrix(lon) با شکل (n,)؛ فقط جفت‌های i < j پر می‌شوند
+    - نقشه با نقشه (ترانزیت یا سیناستری): aspect_matrix(lon_a, lon_b)
+    - N نقشه یکجا: ورودی (N, n) و در صورت نیاز other با شکل (N, m) یا (m,)
+
+    خروجی (kinds, deviations) هر دو با شکل (..., n, m): شماره زاویه در
+    ASPECT_ANGLES (یا -1 اگر در orb هیچ زاویه‌ای نباشد) و فاصله از زاویه دقیق.
+    """
+    longitudes = np.asarray(longitudes, dtype=float)
+    same_chart = other is None
+    other = longitudes if same_chart else np.asarray(other, dtype=float)
+
+    distance = np.abs(longitudes[..., :, None] - other[..., None, :]) % 360.0
+    distance = np.minimum(distance, 360.0 - distance)
+    # orb ها از نصف فاصله دو زاویه متوالی کمترند، پس فقط نزدیک‌ترین زاویه ممکن است در orb باشد
+    kinds = np.searchsorted(_ASPECT_MIDPOINTS, distance)
+    deviations = np.abs(distance - ASPECT_ANGLES[kinds])
+    found = deviations <= np.asarray(orbs)[kinds]
+    if same_chart:
+        n = longitudes.shape[-1]
+        found &= np.triu(np.ones((n, n), dtype=bool), k=1)
+    return np.where(found, kinds, -1), np.where(found, deviations, np.nan)
+
+
+def aspect_list(kinds, deviations, limit: int = None) -> list:
+    """
+    (i، j، شماره زاویه، فاصله از زاویه دقیق) برای یک ماتریس (n, m)، دقیق‌ترین‌ها اول
+    """
+    rows, cols = np.nonzero(kinds >= 0)
+    order = np.argsort(deviations[rows, cols], kind="stable")[:limit]
+    return [(int(rows[k]), int(cols[k]), int(kinds[rows[k], cols[k]]), float(deviations[rows[k], cols[k]]))
+            for k in order]
+
+
+def format_aspects(kinds, deviations, names_a, names_b, lang: str = "fa", limit: int = MAX_ASPECTS_IN_TEXT) -> list:
+    aspect_names = ASPECT_NAMES_EN if lang == "en" else ASPECT_NAMES
+    return [f"{names_a[i]} {aspect_names[kind]} {names_b[j]} ({orb:.1f}°)"
+            for i, j, kind, orb in aspect_list(kinds, deviations, limit)]
+
+
+def format_horoscope(positions: np.ndarray, lang: str = "fa") -> str:
+    """
+    ساخت متن هوروسکوپ از یک سطر (10, 3) خروجی get_positions_batch
+    """
+    kinds, deviations = aspect_matrix(positions[:, 0])
+    if lang == "en":
+        lines = ["🔮 **Astrological analysis of your birth day**\n"]
+        for name, (lon, lat, _dist) in zip(PLANET_NAMES_EN, positions.tolist()):
+            lines.append(f"{name}: longitude = {lon:.2f}°  | latitude = {lat:.2f}°")
+        aspects = format_aspects(kinds, deviations, PLANET_NAMES_EN, PLANET_NAMES_EN, lang)
+        if aspects:
+            lines.append("\n📐 **Main aspects:**")
+            lines.extend(aspects)
+        lines.append(
+            "\n✨ **General advice:**\n"
+            "Positive energy is flowing around you today. Listen to your inner feelings and make important decisions calmly."
+        )
+        return "\n".join(lines)
+
+    lines = ["🔮 **تحلیل ستاره‌شناسی روز تولد شما**\n"]
+    for name, (lon, lat, _dist) in zip(PLANET_NAMES, positions.tolist()):
+        lines.append(f"{name}: طول = {lon:.2f}°  | عرض = {lat:.2f}°")
+    aspects = format_aspects(kinds, deviations, PLANET_NAMES, PLANET_NAMES, lang)
+    if aspects:
+        lines.append("\n📐 **زاویه‌های اصلی:**")
+        lines.extend(aspects)
+
+    lines.append(
+        "\n✨ **توصیه کلی:**\n"
+        "امروز انرژی‌های مثبتی پیرامون شما جریان دارد. به احساسات درونی خود توجه کنید و تصمیم‌های مهم را با آرامش بگیرید."
     )
+    return "\n".join(lines)
+
+
+@cached(horoscope_cache, lambda birth_date, lang="fa": (julian_day(birth_date), lang, "horoscope"))
+def get_horoscope(birth_date: datetime, lang: str = "fa") -> str:
+    """
+    تولید متن هوروسکوپ بر اساس موقعیت سیارات
+    """
+    return format_horoscope(get_positions_batch([birth_date])[0], lang)
+
+
+def get_prediction(user_data: dict, lang: str = None) -> str:
+    """
+    پیشگویی بر اساس user_data گفتگو (همان خروجی get_horoscope و همان کش)
+    """
+    return get_horoscope(birth_date_from(user_data), lang or user_data.get("lang", "fa"))
+
+
+# ---------- خانه‌ها و طالع (ساعت و محل تولد) ----------
+
+# سیستم خانه‌بندی swe.houses (P = Placidus، W = Whole Sign، ...)
+HOUSE_SYSTEM = os.environ.get("HOUSE_SYSTEM", "P").encode()
+
+
+@functools.lru_cache(maxsize=8192)
+def _day_offset(zone: str, day: date):
+    """
+    اختلاف ثابت منطقه زمانی با UT در یک روز محلی؛ None اگر در همان روز ساعت
+    رسمی عوض شده باشد (مثل تغییر ساعت تابستانی ایران در نیمه‌شب)
+    """
+    tz = pytz.timezone(zone)
+    first = tz.localize(datetime.combine(day, time(0, 0)), is_dst=False).utcoffset()
+    last = tz.localize(datetime.combine(day, time(23, 59)), is_dst=False).utcoffset()
+    return first if first == last else None
+
+
+def utc_offset(zone: str, local: datetime) -> timedelta:
+    """
+    اختلاف ساعت محلی با UT با احتساب تغییرات تاریخی ساعت تابستانی (از pytz)
+    """
+    offset = _day_offset(zone, local.date())
+    if offset is None:
+        # روز تغییر ساعت: محاسبه برای همان لحظه (ساعت ناموجود/تکراری با ساعت زمستانی)
+        offset = pytz.timezone(zone).localize(local, is_dst=False).utcoffset()
+    return offset
+
+
+def julian_day_ut(birth_date, hour: int, minute: int, zone: str) -> float:
+    """
+    روز ژولینی (UT) برای تاریخ و ساعت محلی تولد در منطقه زمانی zone
+    """
+    day = _as_date(birth_date)
+    offset = utc_offset(zone, datetime.combine(day, time(hour, minute)))
+    # julian_day ظهر است؛ نیمه‌شب محلی = ۰٫۵ روز قبل
+    return julian_day(day) - 0.5 + (hour * 60 + minute - offset.total_seconds() / 60) / 1440
+
+
+def houses(jd_ut: float, latitude: float, longitude: float, system: bytes = HOUSE_SYSTEM):
+    """
+    سر خانه‌های ۱ تا ۱۲ (آرایه 12) و (طالع، وسط‌السماء) با swe.houses
+    """
+    start = perf_counter()
+    cusps, ascmc = swe.houses(jd_ut, latitude, longitude, system)
+    _houses_seconds.observe(perf_counter() - start)
+    return np.array(cusps[:12]), (ascmc[0], ascmc[1])
+
+
+def houses_batch(records, system: bytes = HOUSE_SYSTEM):
+    """
+    خانه‌ها برای چند رکورد (birth_date, hour, minute, latitude, longitude, zone) به صورت یکجا
+
+    خروجی: سر خانه‌ها با شکل (N, 12) و طالع/وسط‌السماء با شکل (N, 2). روز ژولینی
+    به صورت برداری ساخته می‌شود، اختلاف ساعت هر (منطقه، روز) از کش _day_offset
+    می‌آید و رکوردهای تکراری (همان لحظه و همان مختصات) فقط یک بار محاسبه می‌شوند.
+    """
+    dates, hours, minutes, latitudes, longitudes, zones = zip(*records)
+    days = [_as_date(d) for d in dates]
+    offsets = np.array([
+        utc_offset(zone, datetime.combine(day, time(h, m))).total_seconds() / 60
+        for day, h, m, zone in zip(days, hours, minutes, zones)
+    ])
+    minutes_ut = np.asarray(hours) * 60 + np.asarray(minutes) - offsets
+    jds = julian_days(days) - 0.5 + minutes_ut / 1440
+
+    keys = np.column_stack((jds, np.asarray(latitudes, dtype=float), np.asarray(longitudes, dtype=float)))
+    unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+
+    cusps = np.empty((len(unique), 12))
+    angles = np.empty((len(unique), 2))
+    calc = swe.houses
+    start = perf_counter()
+    for i, (jd, lat, lon) in enumerate(unique.tolist()):
+        row, ascmc = calc(jd, lat, lon, system)
+        cusps[i] = row[:12]
+        angles[i] = ascmc[:2]
+    if len(unique):
+        _houses_seconds.observe((perf_counter() - start) / len(unique), len(unique))
+    inverse = inverse.reshape(-1)
+    return cusps[inverse], angles[inverse]
+
+
+def _degree(longitude: float, sign_names) -> str:
+    # درجه کامل داخل برج (۰ تا ۲۹)؛ گرد کردن 29.6 را 30 نشان می‌دهد
+    return f"{int(longitude % 30)}° {sign_names[int(sign_of(longitude))]}"
+
+
+def format_houses(cusps, angles, lang: str = "fa") -> str:
+    """
+    متن طالع، وسط‌السماء و سر خانه‌ها
+    """
+    ascendant, midheaven = angles
+    if lang == "en":
+        lines = [f"🌄 **Ascendant:** {_degree(ascendant, SIGNS_EN)}", f"Midheaven: {_degree(midheaven, SIGNS_EN)}"]
+        lines += [f"House {i}: {_degree(cusp, SIGNS_EN)}" for i, cusp in enumerate(cusps, 1)]
+    else:
+        lines = [f"🌄 **طالع:** {_degree(ascendant, SIGNS)}", f"وسط‌السماء: {_degree(midheaven, SIGNS)}"]
+        lines += [f"خانه {i}: {_degree(cusp, SIGNS)}" for i, cusp in enumerate(cusps, 1)]
+    return "\n".join(lines)
+
+
+@cached(horoscope_cache, lambda birth_date, hour, minute, latitude, longitude, zone, lang="fa": (
+    julian_day_ut(birth_date, hour, minute, zone), latitude, longitude, lang, "houses"))
+def get_houses(birth_date, hour: int, minute: int, latitude: float, longitude: float, zone: str,
+               lang: str = "fa") -> str:
+    """
+    متن طالع و خانه‌ها برای ساعت و محل تولد
+    """
+    cusps, angles = houses(julian_day_ut(birth_date, hour, minute, zone), latitude, longitude)
+    return format_houses(cusps.tolist(), angles, lang)
+
+
+# ---------- جستجوی رویدادها (ورود به برج، ایستگاه، زاویه دقیق، بازگشت) ----------
+
+EVENT_INGRESS = "ingress"
+EVENT_STATION = "station"
+EVENT_ASPECT = "aspect"
+EVENT_RETURN = "return"
+# دقت پالایش زمان رویداد (روز): یک دقیقه
+EVENT_PRECISION = 1 / 1440
 
-    planets = {
-        "خورشید": swe.SUN,
-        "ماه": swe.MOON,
-        "عطارد": swe.MERCURY,
-        "ناهید": swe.VENUS,
-        "مریخ": swe.MARS,
-        "مشتری": swe.JUPITER,
-        "زحل": swe.SATURN,
-        "اورانوس": swe.URANUS,
-        "نپتون": swe.NEPTUNE,
-        "پلوتو": swe.PLUTO
-    }
-
-    text = "🔮 **تحلیل ستاره‌شناسی روز تولد شما**\n\n"
-
-    for name, code in planets.items():
-        lon, lat, dist = swe.calc(jd, code)[:3]
-        text += f"{name}: طول = {lon:.2f}°  | عرض = {lat:.2f}°\n"
-
-    text += "\n✨ **توصیه کلی:**\n" \
-            "امروز انرژی‌های مثبتی پیرامون شما جریان دارد. به احساسات درونی خود توجه کنید و تصمیم‌های مهم را با آرامش بگیرید."
-
-    return text
+
+class Event(NamedTuple):
+    kind: str
+    body: int          # اندیس در PLANET_CODES
+    jd: float          # روز ژولینی UT
+    longitude: float   # طول سیاره در لحظه رویداد
+    # ingress: شماره برج جدید؛ station: ۱ = مستقیم شدن، -۱ = رجعت؛ aspect/return: شماره زاویه در ASPECT_ANGLES
+    detail: int
+
+    @property
+    def utc(self) -> datetime:
+        year, month, day, hours = swe.revjul(self.jd)
+        return datetime(year, month, day) + timedelta(hours=hours)
+
+
+def _wrap(degrees):
+    # به بازه [-180, 180)
+    return (np.asarray(degrees) + 180.0) % 360.0 - 180.0
+
+
+@functools.lru_cache(maxsize=256)
+def _year_longitudes(body: int, year: int):
+    """
+    طول روزانه یک سیاره (ظهر هر روز) از ظهر آخرین روز سال قبل تا ظهر اول سال بعد؛
+    برای همه کاربران یکسان است و از جدول ephemeris خوانده می‌شود
+    """
+    jds = np.arange(swe.julday(year - 1, 12, 31), swe.julday(year + 1, 1, 1) + 1)
+    table = load_ephemeris_table()
+    if table is not None and jds[0] >= TABLE_FIRST_JD and jds[-1] <= TABLE_LAST_JD:
+        longitudes = np.array(table[(jds - TABLE_FIRST_JD).astype(np.intp), body, 0])
+    else:
+        calc, code = swe.calc, PLANET_CODES[body]
+        start = perf_counter()
+        longitudes = np.array([calc(jd, code)[0][0] for jd in jds.tolist()])
+        _calc_seconds.observe((perf_counter() - start) / len(jds), len(jds))
+    return jds, longitudes
+
+
+def _brackets(values) -> np.ndarray:
+    """
+    اندیس‌های i که تابع پیوسته (بعد از wrap) بین i و i+1 از صفر می‌گذرد؛ پرش ±۱۸۰ حساب نمی‌شود
+    """
+    values = _wrap(values)
+    crossing = (np.sign(values[:-1]) != np.sign(values[1:])) & (np.abs(values[1:] - values[:-1]) < 180.0)
+    return np.flatnonzero(crossing)
+
+
+def _refine(func, lo: float, hi: float) -> float:
+    """
+    ریشه func در [lo, hi] (تغییر علامت) تا دقت EVENT_PRECISION
+
+    روش secant محدود به بازه (regula falsi، نسخه Illinois)؛ توابع این‌جا در یک
+    روز تقریباً خطی‌اند و معمولاً سه چهار فراخوانی swe.calc کافی است.
+    """
+    f_lo, f_hi = func(lo), func(hi)
+    kept = 0
+    while hi - lo > EVENT_PRECISION:
+        slope = (f_hi - f_lo) / (hi - lo)
+        mid = hi - f_hi / slope
+        f_mid = func(mid)
+        # خطای زمانی تخمینی کمتر از نصف دقت: کافی است
+        if abs(f_mid) < abs(slope) * EVENT_PRECISION / 2:
+            return mid
+        if (f_mid < 0) == (f_lo < 0):
+            lo, f_lo = mid, f_mid
+            if kept == 1:
+                f_hi /= 2
+            kept = 1
+        else:
+            hi, f_hi = mid, f_mid
+            if kept == -1:
+                f_lo /= 2
+            kept = -1
+    return (lo + hi) / 2
+
+
+def _event(kind: str, body: int, jd_tt: float, detail: int) -> Event:
+    longitude = _calc(jd_tt, PLANET_CODES[body])[0][0] % 360.0
+    return Event(kind, body, jd_tt - swe.deltat(jd_tt), longitude, detail)
+
+
+def _in_year(jd_tt: float, year: int) -> bool:
+    return swe.julday(year, 1, 1, 0.0) <= jd_tt < swe.julday(year + 1, 1, 1, 0.0)
+
+
+def _crossings(kind: str, body: int, year: int, targets, details) -> list:
+    """
+    لحظه‌هایی که طول سیاره به هر یک از targets می‌رسد: جستجوی درشت برداری روی
+    طول‌های روزانه و سپس پالایش با swe.calc (_refine)
+    """
+    jds, longitudes = _year_longitudes(body, year)
+    code = PLANET_CODES[body]
+    events = []
+    for target, detail in zip(targets, details):
+        def offset(jd, target=target):
+            return float(_wrap(_calc(jd, code)[0][0] - target))
+
+        for i in _brackets(longitudes - target).tolist():
+            jd = _refine(offset, float(jds[i]), float(jds[i + 1]))
+            if _in_year(jd, year):
+                events.append(_event(kind, body, jd, detail))
+    return events
+
+
+@functools.lru_cache(maxsize=1024)
+def ingresses(body: int, year: int) -> tuple:
+    """
+    ورود سیاره به برج‌ها در یک سال (با ورودهای رفت و برگشتی دوره رجعت)
+    """
+    jds, longitudes = _year_longitudes(body, year)
+    signs = sign_of(longitudes)
+    code = PLANET_CODES[body]
+    events = []
+    for i in np.flatnonzero(signs[:-1] != signs[1:]).tolist():
+        forward = _wrap(longitudes[i + 1] - longitudes[i]) > 0
+        boundary = float(signs[i + 1] if forward else signs[i]) * 30.0
+
+        def offset(jd):
+            return float(_wrap(_calc(jd, code)[0][0] - boundary))
+
+        jd = _refine(offset, float(jds[i]), float(jds[i + 1]))
+        if _in_year(jd, year):
+            events.append(_event(EVENT_INGRESS, body, jd, int(signs[i + 1])))
+    return tuple(events)
+
+
+@functools.lru_cache(maxsize=1024)
+def stations(body: int, year: int) -> tuple:
+    """
+    ایستگاه‌های رجعت (-1) و مستقیم شدن (1) یک سیاره در یک سال
+    """
+    jds, longitudes = _year_longitudes(body, year)
+    steps = _wrap(np.diff(longitudes))
+    code = PLANET_CODES[body]
+
+    def speed(jd):
+        return _calc(jd, code)[0][3]
+
+    events = []
+    for i in np.flatnonzero(np.sign(steps[:-1]) != np.sign(steps[1:])).tolist():
+        # تغییر جهت بین میانگین سرعت روز i و روز i+1؛ بازه دو روزه
+        lo, hi = float(jds[i]), float(jds[i + 2])
+        if (speed(lo) < 0) == (speed(hi) < 0):
+            continue
+        jd = _refine(speed, lo, hi)
+        if _in_year(jd, year):
+            events.append(_event(EVENT_STATION, body, jd, 1 if steps[i + 1] > 0 else -1))
+    return tuple(events)
+
+
+@functools.lru_cache(maxsize=4096)
+def aspect_events(body: int, target: float, year: int, aspects: tuple = tuple(range(len(ASPECT_ANGLES)))) -> tuple:
+    """
+    لحظه‌های زاویه دقیق سیاره گذرا با یک نقطه ثابت (مثلاً طول سیاره در نقشه تولد)
+    """
+    targets = {}
+    for aspect in aspects:
+        angle = float(ASPECT_ANGLES[aspect])
+        # هر زاویه در دو طرف نقطه (مقارنه و مقابله فقط یک نقطه)
+        for point in {(target + angle) % 360.0, (target - angle) % 360.0}:
+            targets[point] = aspect
+    events = _crossings(EVENT_ASPECT, body, year, targets.keys(), targets.values())
+    return tuple(sorted(events, key=lambda event: event.jd))
+
+
+def returns(body: int, natal_longitude: float, year: int) -> tuple:
+    """
+    بازگشت سیاره به طول خودش در نقشه تولد (مثل بازگشت مشتری یا زحل)
+    """
+    return tuple(event._replace(kind=EVENT_RETURN) for event in aspect_events(body, natal_longitude, year, (0,)))
+
+
+def next_events(search, after_jd: float, limit: int = 1, max_years: int = 30, **kwargs) -> list:
+    """
+    اولین رویدادهای search (ingresses، stations، aspect_events یا returns) بعد از after_jd (UT)
+
+    مثال: next_events(returns, jd, body=5, natal_longitude=lon) برای بازگشت بعدی مشتری.
+    """
+    year = swe.revjul(after_jd)[0]
+    found = []
+    for year in range(year, year + max_years):
+        found.extend(event for event in search(year=year, **kwargs) if event.jd > after_jd)
+        if len(found) >= limit:
+            break
+    return found[:limit]
+
+
+@cached(horoscope_cache, lambda birth_date, day, lang="fa": (julian_day(birth_date), julian_day(day), lang, "events"))
+def upcoming_events(birth_date, day, lang: str = "fa") -> str:
+    """
+    متن رویدادهای پیش رو بعد از روز day: ورود سیارات به برج بعدی، ایستگاه بعدی
+    عطارد و بازگشت بعدی مشتری و زحل برای نقشه تولد
+    """
+    after = julian_day(day) - 0.5
+    natal = get_positions_batch([birth_date])[0]
+    en = lang == "en"
+    names = PLANET_NAMES_EN if en else PLANET_NAMES
+    sign_names = SIGNS_EN if en else SIGNS
+
+    lines = ["🗓 **Upcoming events**\n" if en else "🗓 **رویدادهای پیش رو**\n"]
+    for body in range(2, 7):
+        for event in next_events(ingresses, after, body=body):
+            when = event.utc.strftime("%Y-%m-%d %H:%M")
+            lines.append(f"{names[body]} → {sign_names[event.detail]}: {when} UTC" if en
+                         else f"ورود {names[body]} به {sign_names[event.detail]}: {when} UTC")
+    for event in next_events(stations, after, body=2):
+        when = event.utc.strftime("%Y-%m-%d %H:%M")
+        if en:
+            lines.append(f"Mercury {'retrograde' if event.detail < 0 else 'direct'}: {when} UTC")
+        else:
+            lines.append(f"{'رجعت' if event.detail < 0 else 'مستقیم شدن'} عطارد: {when} UTC")
+    for body in (5, 6):
+        for event in next_events(returns, after, body=body, natal_longitude=float(natal[body, 0])):
+            when = event.utc.strftime("%Y-%m-%d")
+            lines.append(f"{names[body]} return: {when}" if en else f"بازگشت {names[body]}: {when}")
+    return "\n".join(lines)
+
+
+def sun_sign(birth_date) -> int:
+    """
+    شماره برج خورشید (۰ = حمل) در یک تاریخ
+    """
+    return int(sign_of(get_positions_batch([birth_date])[0, 0, 0]))
+
+
+# ---------- فال روزانه برای هر برج (یک بار در روز برای همه مشترکین) ----------
+
+# فاصله برج ماه از برج کاربر → (متن فارسی، متن انگلیسی)
+_MOON_ADVICE = {
+    0: ("ماه در برج شماست؛ احساسات پررنگ‌ترند، به خودتان وقت بدهید.",
+        "The Moon is in your sign; feelings run high, give yourself time."),
+    4: ("ماه با برج شما هماهنگ است؛ روز خوبی برای شروع کارهای تازه است.",
+        "The Moon is in harmony with your sign; a good day to start something new."),
+    3: ("ماه با برج شما زاویه چالشی دارد؛ در تصمیم‌ها عجله نکنید.",
+        "The Moon squares your sign; avoid rushing decisions."),
+    6: ("ماه روبه‌روی برج شماست؛ به رابطه‌ها و نظر دیگران توجه کنید.",
+        "The Moon opposes your sign; pay attention to relationships and others' views."),
+}
+_MOON_ADVICE[8] = _MOON_ADVICE[4]
+_MOON_ADVICE[9] = _MOON_ADVICE[3]
+_DEFAULT_ADVICE = ("روزی آرام است؛ کارهای روزمره را با حوصله پیش ببرید.",
+                   "A calm day; move through routine tasks patiently.")
+
+
+def format_daily(positions: np.ndarray, sign: int, lang: str = "fa", aspects=()) -> str:
+    """
+    متن فال روزانه یک برج از سطر (10, 3) آسمان همان روز (و خروجی format_aspects آن)
+    """
+    signs = sign_of(positions[:, 0]).tolist()
+    en = lang == "en"
+    names = PLANET_NAMES_EN if en else PLANET_NAMES
+    sign_names = SIGNS_EN if en else SIGNS
+    visitors = [name for name, s in zip(names, signs) if s == sign]
+    advice = _MOON_ADVICE.get((signs[1] - sign) % 12, _DEFAULT_ADVICE)[1 if en else 0]
+
+    if en:
+        lines = [f"🌅 **Daily horoscope for {sign_names[sign]}**\n",
+                 f"Sun in {sign_names[signs[0]]} | Moon in {sign_names[signs[1]]}"]
+        if visitors:
+            lines.append(f"Planets in your sign today: {', '.join(visitors)}")
+        if aspects:
+            lines.append(f"Today's sky: {', '.join(aspects)}")
+    else:
+        lines = [f"🌅 **فال روزانه {sign_names[sign]}**\n",
+                 f"خورشید در {sign_names[signs[0]]} | ماه در {sign_names[signs[1]]}"]
+        if visitors:
+            lines.append(f"سیارات در برج شما امروز: {'، '.join(visitors)}")
+        if aspects:
+            lines.append(f"آسمان امروز: {'، '.join(aspects)}")
+    lines.append(f"\n✨ {advice}")
+    return "\n".join(lines)
+
+
+@cached(horoscope_cache, lambda day, lang="fa": (julian_day(day), lang, "daily"))
+def daily_horoscopes(day, lang: str = "fa") -> tuple:
+    """
+    متن فال روزانه هر دوازده برج؛ آسمان روز فقط یک بار محاسبه می‌شود
+    """
+    positions = get_positions_batch([day])[0]
+    names = PLANET_NAMES_EN if lang == "en" else PLANET_NAMES
+    aspects = format_aspects(*aspect_matrix(positions[:, 0]), names, names, lang, limit=3)
+    return tuple(format_daily(positions, sign, lang, aspects) for sign in range(len(SIGNS)))
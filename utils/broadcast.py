@@ -0,0 +1,220 @@
+"""
+ارسال فال روزانه به همه مشترکین (JobQueue، نیمه‌شب تهران)
+
+متن هر برج و هر زبان یک بار ساخته می‌شود (astro.daily_horoscopes)، مشترکین
+به صورت تکه‌های CHUNK_SIZE تایی به ترتیب user_id از SQLite خوانده و همزمان
+(زیر محدودکننده نرخ utils.outbound) فرستاده می‌شوند. بعد از هر تکه آخرین
+user_id در جدول broadcast_runs ثبت می‌شود تا اگر پروسه وسط کار ری‌استارت شد،
+ارسال از همان‌جا ادامه پیدا کند.
+"""
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, time as dtime
+
+import pytz
+from telegram.error import Forbidden, TelegramError
+
+from utils import executor, lazy
+from utils.persistence import PERSISTENCE_PATH, open_db
+
+logger = logging.getLogger(__name__)
+
+astro = lazy.module("utils.astro")
+
+TEHRAN = pytz.timezone("Asia/Tehran")
+CHUNK_SIZE = int(os.environ.get("BROADCAST_CHUNK", 500))
+CONCURRENCY = int(os.environ.get("BROADCAST_CONCURRENCY", 32))
+LANGS = ("fa", "en")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscribers (
+    user_id INTEGER PRIMARY KEY, chat_id INTEGER NOT NULL, sign INTEGER NOT NULL,
+    lang TEXT NOT NULL, active INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS broadcast_runs (
+    day TEXT PRIMARY KEY, last_user_id INTEGER NOT NULL, sent INTEGER NOT NULL,
+    failed INTEGER NOT NULL, started REAL NOT NULL, finished REAL
+);
+"""
+
+
+class SubscriberStore:
+    """
+    مشترکین فال روزانه و وضعیت ارسال هر روز (همان فایل SQLite persistence)
+    """
+
+    def __init__(self, path: str = PERSISTENCE_PATH):
+        self._conn = open_db(path)
+        self._conn.executescript(_SCHEMA)
+        self._lock = asyncio.Lock()
+
+    async def _execute(self, sql: str, params=(), fetch: bool = False):
+        # SQLite در thread جداگانه؛ قفل async ترتیب دسترسی به اتصال را نگه می‌دارد
+        def call():
+            with self._conn:
+                cursor = self._conn.execute(sql, params)
+                return cursor.fetchall() if fetch else None
+
+        async with self._lock:
+            return await asyncio.to_thread(call)
+
+    async def subscribe(self, user_id: int, chat_id: int, sign: int, lang: str):
+        await self._execute(
+            "INSERT OR REPLACE INTO subscribers (user_id, chat_id, sign, lang, active) VALUES (?, ?, ?, ?, 1)",
+            (user_id, chat_id, sign, lang),
+        )
+
+    async def unsubscribe(self, user_id: int):
+        await self._execute("UPDATE subscribers SET active = 0 WHERE user_id = ?", (user_id,))
+
+    async def count(self) -> int:
+        return (await self._execute("SELECT COUNT(*) FROM subscribers WHERE active = 1", fetch=True))[0][0]
+
+    async def chunk(self, after_user_id: int, size: int = CHUNK_SIZE) -> list:
+        """
+        تکه بعدی مشترکین فعال با user_id بزرگ‌تر از after_user_id (صفحه‌بندی keyset)
+        """
+        return await self._execute(
+            "SELECT user_id, chat_id, sign, lang FROM subscribers "
+            "WHERE active = 1 AND user_id > ? ORDER BY user_id LIMIT ?",
+            (after_user_id, size), fetch=True,
+        )
+
+    async def run_state(self, day: str):
+        rows = await self._execute(
+            "SELECT last_user_id, sent, failed, finished FROM broadcast_runs WHERE day = ?", (day,), fetch=True
+        )
+        return rows[0] if rows else None
+
+    async def checkpoint(self, day: str, last_user_id: int, sent: int, failed: int, finished: bool = False):
+        await self._execute(
+            "INSERT INTO broadcast_runs (day, last_user_id, sent, failed, started, finished) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(day) DO UPDATE SET last_user_id = excluded.last_user_id, sent = excluded.sent, "
+            "failed = excluded.failed, finished = excluded.finished",
+            (day, last_user_id, sent, failed, time.time(), time.time() if finished else None),
+        )
+
+    def close(self):
+        self._conn.close()
+
+
+class DailyBroadcast:
+    """
+    اجرای ارسال روزانه؛ هم با JobQueue زمان‌بندی می‌شود و هم مستقیم قابل فراخوانی است
+    """
+
+    def __init__(self, store: SubscriberStore = None, chunk_size: int = CHUNK_SIZE,
+                 concurrency: int = CONCURRENCY):
+        # store با attach وصل می‌شود (همان فایل SQLitePersistence اپلیکیشن)؛ بدون آن اشتراک ثبت نمی‌شود
+        self.store = store
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self._running = False
+        self.progress = {}
+
+    def attach(self, store: SubscriberStore):
+        self.store = store
+
+    async def subscribe(self, user_id: int, chat_id: int, birth_date, lang: str):
+        """
+        ثبت یا به‌روزرسانی اشتراک با برج خورشید تاریخ تولد
+        """
+        if self.store is None:
+            return
+        sign = await executor.run(astro.sun_sign, birth_date)
+        await self.store.subscribe(user_id, chat_id, sign, lang)
+
+    async def unsubscribe(self, user_id: int):
+        if self.store is not None:
+            await self.store.unsubscribe(user_id)
+
+    async def _send(self, bot, semaphore, user_id: int, chat_id: int, text: str) -> bool:
+        async with semaphore:
+            try:
+                await bot.send_message(chat_id=chat_id, text=text)
+                return True
+            except Forbidden:
+                # کاربر ربات را بلاک کرده؛ از فهرست ارسال خارج می‌شود
+                await self.unsubscribe(user_id)
+            except TelegramError as e:
+                logger.warning("ارسال فال روزانه به %s ناموفق بود: %s", chat_id, e)
+            return False
+
+    async def run(self, bot, day=None) -> dict:
+        """
+        ارسال فال روز day (پیش‌فرض: امروز به وقت تهران)؛ اگر قبلاً نیمه‌کاره مانده ادامه می‌دهد
+        """
+        if self._running:
+            return self.progress
+        self._running = True
+        try:
+            return await self._run(bot, day or datetime.now(TEHRAN).date())
+        finally:
+            self._running = False
+
+    async def _run(self, bot, day) -> dict:
+        store = self.store
+        key = day.isoformat()
+        state = await store.run_state(key)
+        if state is not None and state[3] is not None:
+            logger.info("فال روزانه %s قبلاً ارسال شده است", key)
+            return self.progress
+        last_user_id, sent, failed = state[:3] if state is not None else (0, 0, 0)
+        if state is not None:
+            logger.info("ادامه ارسال فال روزانه %s از user_id=%s", key, last_user_id)
+
+        # متن هر برج برای هر زبان فقط یک بار
+        texts = {lang: await executor.run(astro.daily_horoscopes, day, lang) for lang in LANGS}
+        total = await store.count()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = time.monotonic()
+        done_at_start = sent + failed
+        self.progress = {"day": key, "total": total, "sent": sent, "failed": failed, "rate": 0.0}
+
+        while True:
+            rows = await store.chunk(last_user_id, self.chunk_size)
+            if not rows:
+                break
+            results = await asyncio.gather(*(
+                self._send(bot, semaphore, user_id, chat_id, texts.get(lang, texts["fa"])[sign])
+                for user_id, chat_id, sign, lang in rows
+            ))
+            sent += sum(results)
+            failed += len(results) - sum(results)
+            last_user_id = rows[-1][0]
+            await store.checkpoint(key, last_user_id, sent, failed)
+
+            elapsed = time.monotonic() - start
+            rate = (sent + failed - done_at_start) / elapsed if elapsed else 0.0
+            self.progress.update(sent=sent, failed=failed, rate=rate)
+            logger.info("فال روزانه %s: %d/%d ارسال، %d ناموفق، %.1f پیام در ثانیه",
+                        key, sent, total, failed, rate)
+
+        await store.checkpoint(key, last_user_id, sent, failed, finished=True)
+        logger.info("ارسال فال روزانه %s تمام شد: %d ارسال، %d ناموفق در %.1f ثانیه",
+                    key, sent, failed, time.monotonic() - start)
+        return self.progress
+
+    async def job(self, context):
+        await self.run(context.bot)
+
+    def schedule(self, job_queue):
+        """
+        زمان‌بندی روزانه در نیمه‌شب تهران و ادامه ارسال نیمه‌کاره امروز (اگر باشد) پس از راه‌اندازی
+        """
+        job_queue.run_daily(self.job, time=dtime(0, 0, tzinfo=TEHRAN), name="daily_broadcast")
+        job_queue.run_once(self._resume, when=0, name="daily_broadcast_resume")
+
+    async def _resume(self, context):
+        state = await self.store.run_state(datetime.now(TEHRAN).date().isoformat())
+        if state is not None and state[3] is None:
+            await self.run(context.bot)
+
+    def stats(self) -> dict:
+        return dict(self.progress, running=self._running)
+
+
+# نمونه مشترک هر پروسه
+daily_broadcast = DailyBroadcast()
@@ -0,0 +1,177 @@
+"""
+کش LRU محدود (بر اساس تعداد و حجم) برای نتایج هوروسکوپ و sigil، و کش فایل‌های
+تولیدشده (تصاویر) روی دیسک
+"""
+import os
+import sys
+import time
+import asyncio
+import threading
+import functools
+from collections import OrderedDict
+
+from utils import metrics
+
+_MISSING = object()
+
+
+def _sizeof(value) -> int:
+    """
+    حجم تقریبی مقدار برای max_bytes؛ محتوای tuple/list/dict (مثل دوازده متن daily_horoscopes) هم شمرده می‌شود
+    """
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, (tuple, list, set, frozenset)):
+        return sys.getsizeof(value) + sum(_sizeof(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    nbytes = getattr(value, "nbytes", None)  # آرایه numpy
+    if isinstance(nbytes, int):
+        return sys.getsizeof(value) + nbytes
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """
+    کش LRU با سقف تعداد ورودی و سقف بایت، به همراه آمار hit/miss/eviction
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value):
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._data[key] = (value, size)
+            self.bytes += size
+            while len(self._data) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def cached(cache: LRUCache, key_func):
+    """
+    دکوریتور: نتیجه تابع را با کلید key_func(*args, **kwargs) در cache نگه می‌دارد
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = key_func(*args, **kwargs)
+            value = cache.get(key, _MISSING)
+            if value is _MISSING:
+                value = func(*args, **kwargs)
+                cache.put(key, value)
+            return value
+
+        wrapper.cache = cache
+        wrapper.cache_key = key_func
+        return wrapper
+
+    return decorator
+
+
+class DiskCache:
+    """
+    فایل‌های تولیدشده با نام hash ورودی‌ها در یک پوشه؛ درخواست تکراری فقط مسیر موجود را می‌گیرد
+
+    تولیدهای همزمان برای یک کلید منتظر همان یک تولید می‌مانند.
+    """
+
+    def __init__(self, directory: str, suffix: str = ".png"):
+        self.directory = directory
+        self.suffix = suffix
+        self._in_flight = {}
+        self.hits = 0
+        self.misses = 0
+        self.renders = 0
+        self.render_seconds = 0.0
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    async def get_or_create(self, key: str, create, *args) -> str:
+        """
+        مسیر فایل key؛ در صورت نبود، await create(path, *args) آن را می‌سازد
+        """
+        path = self.path(key)
+        if os.path.exists(path):
+            self.hits += 1
+            return path
+
+        self.misses += 1
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        os.makedirs(self.directory, exist_ok=True)
+        start = time.perf_counter()
+        task = self._in_flight[key] = asyncio.ensure_future(create(path, *args))
+        try:
+            await asyncio.shield(task)
+        finally:
+            del self._in_flight[key]
+        self.renders += 1
+        self.render_seconds += time.perf_counter() - start
+        return path
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "renders": self.renders,
+            "render_seconds": self.render_seconds,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# کش مشترک خروجی‌های متنی؛ کلید: (روز ژولینی، زبان، نوع خروجی)
+horoscope_cache = LRUCache(
+    max_entries=int(os.environ.get("HOROSCOPE_CACHE_ENTRIES", 10000)),
+    max_bytes=int(os.environ.get("HOROSCOPE_CACHE_BYTES", 16 * 1024 * 1024)),
+)
+metrics.register_cache("horoscope", horoscope_cache)
@@ -0,0 +1,246 @@
+"""
+رسم چرخ نقشه تولد (zodiac wheel) با Pillow
+
+لایه ثابت (حلقه برج‌ها، نام برج‌ها و درجه‌ها) برای هر اندازه و تم یک بار رسم
+و در حافظه نگه داشته می‌شود؛ برای هر درخواست فقط لایه سیاره‌ها روی کپی آن
+قرار می‌گیرد. مختصات glyph ها و جابه‌جایی سیاره‌های نزدیک به هم با numpy و
+بدون حلقه روی سیاره‌ها محاسبه می‌شود. خروجی مثل utils.sigil در pool
+utils.executor ساخته و با hash ورودی‌ها روی دیسک کش می‌شود.
+"""
+import io
+import os
+import hashlib
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from utils import astro, executor, metrics
+from utils.cache import DiskCache
+
+SIZE = int(os.environ.get("CHART_SIZE", 800))
+THEME = os.environ.get("CHART_THEME", "dark")
+CACHE_DIR = os.environ.get(
+    "CHART_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "charts")
+)
+# با تغییر ظاهر تصویر افزایش دهید تا فایل‌های قدیمی کش استفاده نشوند
+RENDER_VERSION = 1
+
+THEMES = {
+    "dark": {
+        "background": (16, 18, 36), "ring": (222, 210, 170), "tick": (150, 145, 130),
+        "label": (240, 232, 200), "shade": (28, 32, 60), "planet": (255, 255, 255), "glyph_text": (16, 18, 36),
+    },
+    "light": {
+        "background": (250, 248, 240), "ring": (60, 60, 80), "tick": (140, 140, 150),
+        "label": (40, 40, 60), "shade": (236, 232, 218), "planet": (40, 40, 70), "glyph_text": (250, 248, 240),
+    },
+}
+# رنگ عنصر هر برج (آتش، خاک، باد، آب) برای نام برج‌ها
+_ELEMENT_TINTS = ((214, 96, 28), (96, 150, 60), (120, 150, 210), (40, 130, 180))
+_SIGN_LABELS = tuple(name[:3] for name in astro.SIGNS_EN)
+_GLYPH_LABELS = ("Su", "Mo", "Me", "Ve", "Ma", "Ju", "Sa", "Ur", "Ne", "Pl")
+
+# نسبت شعاع‌ها به نصف اندازه تصویر
+_R_OUTER, _R_SIGNS, _R_TICKS, _R_PLANETS, _R_INNER = 0.96, 0.84, 0.80, 0.68, 0.40
+# حداقل فاصله زاویه‌ای دو glyph روی یک حلقه (درجه) و فاصله حلقه‌های جابه‌جایی
+MIN_SEPARATION = 8.0
+_LEVEL_STEP = 0.07
+# بین حلقه سیاره‌ها و دایره داخلی جای چهار حلقه هست؛ خوشه‌های بزرگ‌تر دوباره از حلقه اصلی
+_MAX_LEVELS = 4
+
+_wheels = {}
+_glyphs = {}
+_palettes = {}
+disk_cache = DiskCache(CACHE_DIR)
+metrics.register_cache("chart", disk_cache)
+
+
+def _polar(longitudes, radius, size: int):
+    """
+    مختصات تصویر برای طول‌های دایره‌البروجی؛ حمل در سمت چپ و جهت خلاف عقربه‌ها
+    """
+    angles = np.radians(180.0 + np.asarray(longitudes, dtype=float))
+    center = size / 2
+    return center + radius * np.cos(angles), center - radius * np.sin(angles)
+
+
+def wheel(size: int = SIZE, theme: str = THEME) -> Image.Image:
+    """
+    لایه ثابت چرخ برای یک اندازه و تم (فقط یک بار رسم می‌شود)
+    """
+    image = _wheels.get((size, theme))
+    if image is not None:
+        return image
+
+    colors = THEMES[theme]
+    half = size / 2
+    image = Image.new("RGB", (size, size), colors["background"])
+    draw = ImageDraw.Draw(image)
+
+    def circle(ratio, **kwargs):
+        r = half * ratio
+        draw.ellipse((half - r, half - r, half + r, half + r), **kwargs)
+
+    circle(_R_OUTER, fill=colors["shade"], outline=colors["ring"], width=max(2, size // 300))
+    circle(_R_TICKS, fill=colors["background"], outline=colors["ring"], width=max(1, size // 400))
+    circle(_R_INNER, outline=colors["ring"], width=max(1, size // 400))
+
+    # خطوط مرز برج‌ها
+    bounds = np.arange(12) * 30.0
+    x0, y0 = _polar(bounds, half * _R_INNER, size)
+    x1, y1 = _polar(bounds, half * _R_OUTER, size)
+    for line in zip(x0.tolist(), y0.tolist(), x1.tolist(), y1.tolist()):
+        draw.line(line, fill=colors["ring"], width=max(1, size // 400))
+
+    # درجه‌ها: هر درجه کوتاه، هر ۵ درجه متوسط، هر ۱۰ درجه بلند
+    degrees = np.arange(360)
+    lengths = np.where(degrees % 10 == 0, 0.045, np.where(degrees % 5 == 0, 0.03, 0.015))
+    x0, y0 = _polar(degrees, half * _R_TICKS, size)
+    x1, y1 = _polar(degrees, half * (_R_TICKS + lengths), size)
+    for line in zip(x0.tolist(), y0.tolist(), x1.tolist(), y1.tolist()):
+        draw.line(line, fill=colors["tick"], width=1)
+
+    # نام برج‌ها وسط هر بخش
+    font = ImageFont.load_default(size=size * 0.032)
+    xs, ys = _polar(bounds + 15.0, half * (_R_SIGNS + _R_OUTER) / 2, size)
+    for sign, (x, y) in enumerate(zip(xs.tolist(), ys.tolist())):
+        draw.text((x, y), _SIGN_LABELS[sign], fill=_ELEMENT_TINTS[sign % 4], font=font, anchor="mm")
+
+    _wheels[(size, theme)] = image
+    return image
+
+
+def _glyph(planet: int, size: int, theme: str) -> Image.Image:
+    glyph = _glyphs.get((planet, size, theme))
+    if glyph is None:
+        colors = THEMES[theme]
+        side = max(16, size // 22)
+        glyph = Image.new("RGBA", (side, side), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(glyph)
+        draw.ellipse((0, 0, side - 1, side - 1), fill=colors["planet"] + (255,))
+        font = ImageFont.load_default(size=side * 0.5)
+        draw.text((side / 2, side / 2), _GLYPH_LABELS[planet], fill=colors["glyph_text"] + (255,), font=font, anchor="mm")
+        _glyphs[(planet, size, theme)] = glyph
+    return glyph
+
+
+def _palette(size: int, theme: str) -> Image.Image:
+    # پالت ۶۴ رنگی ثابت از یک چرخ نمونه؛ تبدیل به حالت P با پالت آماده چند برابر
+    # سریع‌تر از فشرده‌سازی PNG تمام‌رنگ است و فایل هم کوچک‌تر می‌شود
+    palette = _palettes.get((size, theme))
+    if palette is None:
+        sample = np.zeros((len(_GLYPH_LABELS), 3))
+        sample[:, 0] = np.arange(len(_GLYPH_LABELS)) * 36.0
+        palette = _palettes[(size, theme)] = render(sample, size, theme).quantize(64)
+    return palette
+
+
+def prepare(size: int = SIZE, theme: str = THEME):
+    """
+    رسم از قبل چرخ، glyph ها و پالت برای یک اندازه و تم
+    """
+    wheel(size, theme)
+    for planet in range(len(_GLYPH_LABELS)):
+        _glyph(planet, size, theme)
+    _palette(size, theme)
+
+
+def collision_levels(longitudes, min_separation: float = MIN_SEPARATION) -> np.ndarray:
+    """
+    شماره حلقه (۰ = حلقه اصلی) هر سیاره تا glyph های نزدیک به هم روی هم نیفتند
+
+    سیاره‌ها بر اساس طول مرتب می‌شوند؛ هر سیاره که کمتر از min_separation با قبلی
+    فاصله دارد در همان خوشه یک حلقه داخلی‌تر می‌رود. خوشه‌ای که از ۳۶۰ درجه
+    می‌گذرد هم پیوسته حساب می‌شود.
+    """
+    longitudes = np.asarray(longitudes, dtype=float) % 360.0
+    order = np.argsort(longitudes)
+    ordered = longitudes[order]
+
+    # شروع از بزرگ‌ترین فاصله تا خوشه‌ها از مرز ۳۶۰ → ۰ نشکنند
+    gaps = np.diff(np.append(ordered, ordered[0] + 360.0))
+    first = (int(np.argmax(gaps)) + 1) % len(ordered)
+    order = np.roll(order, -first)
+    ordered = np.roll(ordered, -first)
+
+    gaps = np.diff(ordered) % 360.0
+    starts = np.concatenate(([True], gaps >= min_separation))
+    index = np.arange(len(ordered))
+    cluster_start = np.maximum.accumulate(np.where(starts, index, 0))
+
+    levels = np.empty(len(ordered), dtype=int)
+    levels[order] = (index - cluster_start) % _MAX_LEVELS
+    return levels
+
+
+def render(positions: np.ndarray, size: int = SIZE, theme: str = THEME) -> Image.Image:
+    """
+    چرخ کامل از یک سطر (10, 3) خروجی astro.get_positions_batch
+    """
+    colors = THEMES[theme]
+    half = size / 2
+    image = wheel(size, theme).copy()
+    draw = ImageDraw.Draw(image)
+
+    longitudes = positions[:, 0]
+    levels = collision_levels(longitudes)
+    radii = half * (_R_PLANETS - _LEVEL_STEP * levels)
+
+    # نشانه موقعیت دقیق روی حلقه درجه‌ها و خط راهنما تا glyph
+    x0, y0 = _polar(longitudes, half * _R_TICKS, size)
+    x1, y1 = _polar(longitudes, half * (_R_TICKS - 0.04), size)
+    gx, gy = _polar(longitudes, radii, size)
+    width = max(1, size // 400)
+    for line in zip(x0.tolist(), y0.tolist(), x1.tolist(), y1.tolist()):
+        draw.line(line, fill=colors["planet"], width=width * 2)
+    for line in zip(x1.tolist(), y1.tolist(), gx.tolist(), gy.tolist()):
+        draw.line(line, fill=colors["tick"], width=width)
+
+    for planet, (x, y) in enumerate(zip(gx.tolist(), gy.tolist())):
+        glyph = _glyph(planet, size, theme)
+        image.paste(glyph, (int(x - glyph.width / 2), int(y - glyph.height / 2)), glyph)
+    return image
+
+
+def to_png(positions: np.ndarray, size: int = SIZE, theme: str = THEME) -> bytes:
+    """
+    رندر و تبدیل به PNG پالتی
+    """
+    image = render(positions, size, theme).quantize(palette=_palette(size, theme), dither=Image.Dither.NONE)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+def cache_key(birth_date, size: int = SIZE, theme: str = THEME) -> str:
+    return hashlib.sha256(
+        f"chart:{RENDER_VERSION}:{astro.julian_day(birth_date)}:{size}:{theme}".encode()
+    ).hexdigest()
+
+
+def render_to_file(path: str, birth_date, size: int = SIZE, theme: str = THEME) -> str:
+    """
+    رندر و ذخیره روی دیسک (در worker اجرا می‌شود)
+    """
+    positions = astro.get_positions_batch([birth_date])[0]
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(to_png(positions, size, theme))
+    os.replace(tmp, path)
+    return path
+
+
+async def _create(path: str, birth_date, size: int, theme: str):
+    return await executor.run(render_to_file, path, birth_date, size, theme)
+
+
+async def chart_image(birth_date, size: int = SIZE, theme: str = THEME) -> str:
+    """
+    مسیر PNG چرخ نقشه تولد؛ اگر قبلاً ساخته شده فقط از دیسک خوانده می‌شود
+    """
+    return await disk_cache.get_or_create(cache_key(birth_date, size, theme), _create, birth_date, size, theme)
+
+
+def stats() -> dict:
+    return disk_cache.stats()
@@ -0,0 +1,37 @@
+"""
+ساخت جدول روزانه موقعیت سیارات (۱۹۰۰ تا ۲۱۰۰) برای utils.astro
+
+اجرا در مرحله build:
+    python -m utils.ephemeris [مسیر خروجی]
+"""
+import os
+import sys
+import numpy as np
+
+from utils import astro
+
+
+def build_table(path: str = astro.TABLE_PATH, chunk_days: int = 4096) -> str:
+    """
+    محاسبه طول، عرض و فاصله ده سیاره برای هر روز و ذخیره در فایل .npy
+    """
+    jds = np.arange(astro.TABLE_FIRST_JD, astro.TABLE_LAST_JD + 1)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    # ابتدا در فایل موقت نوشته می‌شود تا پروسه‌هایی که جدول را map کرده‌اند فایل نیمه‌کاره نبینند
+    tmp_path = path + ".tmp"
+    table = np.lib.format.open_memmap(
+        tmp_path, mode="w+", dtype=np.float64, shape=(len(jds), len(astro.PLANET_CODES), 3)
+    )
+    for start in range(0, len(jds), chunk_days):
+        table[start:start + chunk_days] = astro.calc_positions(jds[start:start + chunk_days])
+    table.flush()
+    del table
+
+    os.replace(tmp_path, path)
+    return path
+
+
+if __name__ == "__main__":
+    out = build_table(*sys.argv[1:2])
+    print(f"جدول ephemeris ساخته شد: {out}")
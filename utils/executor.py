@@ -0,0 +1,144 @@
+"""
+اجرای محاسبات سنگین astro/healing خارج از event loop
+
+هندلرها به جای صدا زدن مستقیم، از `await executor.run(astro.get_horoscope, ...)`
+استفاده می‌کنند. نوع pool با ASTRO_EXECUTOR (process یا thread)، تعداد
+worker ها با ASTRO_WORKERS و مهلت هر کار با ASTRO_TIMEOUT (ثانیه) تنظیم می‌شود.
+"""
+import os
+import time
+import asyncio
+import logging
+import functools
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from utils import metrics
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_KIND = os.environ.get("ASTRO_EXECUTOR", "process")
+WORKERS = int(os.environ.get("ASTRO_WORKERS", os.cpu_count() or 2))
+TASK_TIMEOUT = float(os.environ.get("ASTRO_TIMEOUT", 10))
+
+_executor = None
+_warming = None
+_MISSING = object()
+
+task_seconds = metrics.Histogram("bot_executor_task_seconds", "Executor task time including queueing", ("task",))
+
+
+def _warm_up():
+    """
+    initializer هر worker: بارگذاری swisseph، map کردن جدول ephemeris و پیش‌رندر لایه‌های ثابت تصاویر
+    """
+    from utils import astro, chart, sigil
+    if EXECUTOR_KIND == "process":
+        # متریک‌های کپی شده از پروسه والد هنگام fork دوباره شمرده نشوند
+        metrics.reset()
+    astro.load_ephemeris_table()
+    astro.calc_positions([astro.TABLE_FIRST_JD])
+    sigil.prepare()
+    chart.prepare()
+
+
+def _noop():
+    return None
+
+
+def _call_uncached(func, args, kwargs):
+    # func به صورت مرجع (نام ماژول) pickle می‌شود؛ در worker نسخه بدون کش اجرا می‌شود
+    return func.__wrapped__(*args, **kwargs)
+
+
+def _call_in_worker(func, uncached, args, kwargs):
+    # در worker پروسه‌ای: نتیجه به همراه متریک‌های ثبت شده در همین کار (swe.calc، ...)
+    value = func.__wrapped__(*args, **kwargs) if uncached else func(*args, **kwargs)
+    return value, metrics.drain()
+
+
+async def _submit(func, uncached: bool, args, kwargs, timeout: float):
+    loop = asyncio.get_running_loop()
+    if EXECUTOR_KIND == "process":
+        call = functools.partial(_call_in_worker, func, uncached, args, kwargs)
+    elif uncached:
+        call = functools.partial(_call_uncached, func, args, kwargs)
+    else:
+        call = functools.partial(func, *args, **kwargs)
+    name = getattr(func, "__name__", "task")
+    start = time.perf_counter()
+    with span(f"executor {name}"):
+        value = await asyncio.wait_for(loop.run_in_executor(get_executor(), call), timeout or TASK_TIMEOUT)
+    task_seconds.labels(name).observe(time.perf_counter() - start)
+    if EXECUTOR_KIND == "process":
+        value, delta = value
+        metrics.merge(delta)
+    return value
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        if EXECUTOR_KIND == "thread":
+            _executor = ThreadPoolExecutor(max_workers=WORKERS, initializer=_warm_up)
+        else:
+            _executor = ProcessPoolExecutor(max_workers=WORKERS, initializer=_warm_up)
+        logger.info("astro executor: %s x %d", EXECUTOR_KIND, WORKERS)
+    return _executor
+
+
+async def start(application=None):
+    """
+    ساخت همه worker ها از قبل تا اولین کاربر منتظر راه‌اندازی swisseph نماند
+    (قابل استفاده به عنوان post_init در ApplicationBuilder)
+
+    worker ها همین‌جا ساخته (fork) می‌شوند ولی منتظر پایان warm-up آن‌ها
+    نمی‌ماند تا شروع پردازش آپدیت‌ها بعد از cold start عقب نیفتد؛ کارهایی که
+    زودتر برسند در صف همان pool منتظر می‌مانند.
+    """
+    global _warming
+    loop = asyncio.get_running_loop()
+    pool = get_executor()
+    _warming = asyncio.gather(*(loop.run_in_executor(pool, _noop) for _ in range(WORKERS)))
+    _warming.add_done_callback(_warmed_up)
+
+
+def _warmed_up(future):
+    if future.cancelled():
+        return
+    if future.exception() is not None:
+        logger.error("astro executor warm-up failed: %r", future.exception())
+    else:
+        logger.info("astro executor ready")
+
+
+async def shutdown(application=None):
+    global _executor, _warming
+    if _warming is not None:
+        _warming.cancel()
+        _warming = None
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def run(func, *args, timeout: float = None, **kwargs):
+    """
+    اجرای func در pool و انتظار برای نتیجه با مهلت مشخص
+
+    توابعی که با utils.cache.cached پوشانده شده‌اند ابتدا در کش همین پروسه
+    بررسی می‌شوند و فقط در صورت miss به pool فرستاده می‌شوند.
+    در صورت پایان مهلت asyncio.TimeoutError بالا می‌رود؛ کار در worker ادامه
+    پیدا می‌کند ولی نتیجه‌اش کنار گذاشته می‌شود.
+    """
+    cache = getattr(func, "cache", None)
+
+    if cache is None:
+        return await _submit(func, False, args, kwargs, timeout)
+
+    key = func.cache_key(*args, **kwargs)
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = await _submit(func, True, args, kwargs, timeout)
+        cache.put(key, value)
+    return value
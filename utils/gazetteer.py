@@ -0,0 +1,260 @@
+"""
+جستجوی آفلاین محل تولد (مختصات و منطقه زمانی) بدون geocoding شبکه‌ای
+
+منبع: data/cities.tsv (GeoNames). ایندکس با `python -m utils.gazetteer` یک بار
+به صورت چند فایل .npy در GAZETTEER_DIR ساخته و هنگام اجرا با mmap باز می‌شود:
+آرایه مرتب نام‌های نرمال‌شده (بایت‌های UTF-8 با طول ثابت) برای جستجوی
+پیشوندی با searchsorted، آرایه مرتب «اسکلت» نام‌ها (بدون حروف صدادار، برای
+نوشتارهای مختلف مثل Mashad/Mashhad یا تبرز/تبریز) و جدول شهرها. برای غلط‌های
+تایپی کوچک، نام‌های هم‌حرف اول با فاصله ویرایشی محدود مقایسه می‌شوند.
+"""
+import os
+import sys
+import logging
+import unicodedata
+from typing import NamedTuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+SOURCE_PATH = os.environ.get("GAZETTEER_SOURCE", os.path.join(_DATA_DIR, "cities.tsv"))
+INDEX_DIR = os.environ.get("GAZETTEER_DIR", os.path.join(_DATA_DIR, "gazetteer"))
+
+_CITY_DTYPE = np.dtype([
+    ("latitude", "f4"), ("longitude", "f4"), ("population", "i4"), ("timezone", "i2"), ("country", "S2"),
+])
+
+# یکسان‌سازی حروف عربی/فارسی و حذف فاصله و نشانه‌ها
+_TRANSLATE = str.maketrans({
+    "ي": "ی", "ى": "ی", "ئ": "ی", "ك": "ک", "ة": "ه", "ۀ": "ه", "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ؤ": "و",
+    " ": None, "-": None, "'": None, "’": None, ".": None, ",": None, "‌": None, "ـ": None,
+})
+
+
+_VOWELS = str.maketrans({ch: None for ch in "aeiouyاویه"})
+
+
+class Place(NamedTuple):
+    id: int
+    name: str
+    name_fa: str
+    country: str
+    latitude: float
+    longitude: float
+    timezone: str
+    population: int
+
+
+def normalize(text: str) -> str:
+    """
+    نرمال‌سازی نام برای مقایسه: حروف کوچک، بدون اعراب و علائم، حروف عربی به فارسی
+    """
+    text = unicodedata.normalize("NFKD", text.strip().lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return text.translate(_TRANSLATE)
+
+
+def skeleton(key: str) -> str:
+    """
+    نام نرمال‌شده بدون حروف صدادار و حروف تکراری پشت سر هم (Esfahan/Isfahan → sfhn)
+    """
+    stripped = key.translate(_VOWELS) or key
+    return "".join(ch for i, ch in enumerate(stripped) if i == 0 or ch != stripped[i - 1])
+
+
+# ---------- ساخت ایندکس ----------
+
+def _read_source(path: str = SOURCE_PATH):
+    with open(path, encoding="utf-8") as f:
+        lines = [line.rstrip("\n") for line in f if not line.startswith("#")]
+    header = lines[0].split("\t")
+    return [dict(zip(header, line.split("\t"))) for line in lines[1:] if line]
+
+
+def build_arrays(rows) -> dict:
+    """
+    آرایه‌های ایندکس از سطرهای cities.tsv
+    """
+    timezones = sorted({row["timezone"] for row in rows})
+    tz_index = {tz: i for i, tz in enumerate(timezones)}
+
+    cities = np.zeros(len(rows), dtype=_CITY_DTYPE)
+    keys, key_city, skeletons, skeleton_city = [], [], [], []
+    for i, row in enumerate(rows):
+        cities[i] = (float(row["latitude"]), float(row["longitude"]), int(row["population"]),
+                     tz_index[row["timezone"]], row["country"].encode())
+        aliases = [row["name"]] + (row["aliases"].split("|") + row["names_fa"].split("|"))
+        for key in dict.fromkeys(normalize(name) for name in aliases if name):
+            if key:
+                keys.append(key.encode("utf-8"))
+                key_city.append(i)
+        for key in dict.fromkeys(skeleton(normalize(name)) for name in aliases if name):
+            if key:
+                skeletons.append(key.encode("utf-8"))
+                skeleton_city.append(i)
+
+    keys, skeletons = np.array(keys), np.array(skeletons)
+    order = np.argsort(keys, kind="stable")
+    skeleton_order = np.argsort(skeletons, kind="stable")
+    return {
+        "keys": keys[order],
+        "key_city": np.array(key_city, dtype=np.int32)[order],
+        "skeletons": skeletons[skeleton_order],
+        "skeleton_city": np.array(skeleton_city, dtype=np.int32)[skeleton_order],
+        "cities": cities,
+        "names": np.array([row["name"].encode("utf-8") for row in rows]),
+        "names_fa": np.array([row["names_fa"].split("|")[0].encode("utf-8") for row in rows]),
+        "timezones": np.array([tz.encode() for tz in timezones]),
+    }
+
+
+def build_index(source: str = SOURCE_PATH, directory: str = INDEX_DIR) -> str:
+    os.makedirs(directory, exist_ok=True)
+    for name, array in build_arrays(_read_source(source)).items():
+        tmp = os.path.join(directory, f"{name}.tmp.npy")
+        np.save(tmp, array)
+        os.replace(tmp, os.path.join(directory, f"{name}.npy"))
+    return directory
+
+
+# ---------- جستجو ----------
+
+_ARRAYS = ("keys", "key_city", "skeletons", "skeleton_city", "cities", "names", "names_fa", "timezones")
+
+
+class Gazetteer:
+    def __init__(self, arrays: dict):
+        self.keys = arrays["keys"]
+        self.key_city = arrays["key_city"]
+        self.skeletons = arrays["skeletons"]
+        self.skeleton_city = arrays["skeleton_city"]
+        self.cities = arrays["cities"]
+        self.names = arrays["names"]
+        self.names_fa = arrays["names_fa"]
+        self.timezones = [tz.decode() for tz in arrays["timezones"]]
+
+    @classmethod
+    def load(cls, directory: str = INDEX_DIR, source: str = SOURCE_PATH) -> "Gazetteer":
+        """
+        باز کردن ایندکس با mmap؛ اگر ساخته نشده باشد از cities.tsv در حافظه ساخته می‌شود
+        """
+        try:
+            arrays = {
+                name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+                for name in _ARRAYS
+            }
+        except (OSError, ValueError):
+            logger.warning("ایندکس gazetteer در %s نیست؛ ساخت در حافظه از %s", directory, source)
+            arrays = build_arrays(_read_source(source))
+        return cls(arrays)
+
+    def __len__(self):
+        return len(self.cities)
+
+    def place(self, city: int) -> Place:
+        row = self.cities[city]
+        return Place(
+            id=city,
+            name=self.names[city].decode("utf-8"),
+            name_fa=self.names_fa[city].decode("utf-8"),
+            country=row["country"].decode(),
+            latitude=float(row["latitude"]),
+            longitude=float(row["longitude"]),
+            timezone=self.timezones[int(row["timezone"])],
+            population=int(row["population"]),
+        )
+
+    @staticmethod
+    def _prefix_range(keys, prefix: bytes):
+        if len(prefix) > keys.dtype.itemsize:
+            return 0, 0
+        lo = int(np.searchsorted(keys, prefix, side="left"))
+        hi = int(np.searchsorted(keys, prefix + b"\xff", side="left"))
+        return lo, hi
+
+    def _fuzzy(self, key: str, max_distance: int) -> dict:
+        # نام‌هایی با همان حرف اول و طول نزدیک (فیلتر برداری روی طول بایتی)؛
+        # فاصله ویرایشی با توقف زودهنگام فقط روی همین‌ها
+        lo, hi = self._prefix_range(self.keys, key[0].encode("utf-8"))
+        candidates = self.keys[lo:hi]
+        byte_len = len(key.encode("utf-8"))
+        close = np.flatnonzero(np.abs(np.char.str_len(candidates) - byte_len) <= 2 * max_distance)
+        found = {}
+        for i in close.tolist():
+            distance = _edit_distance(key, candidates[i].decode("utf-8"), max_distance)
+            if distance <= max_distance:
+                city = int(self.key_city[lo + i])
+                found[city] = min(distance, found.get(city, distance))
+        return found
+
+    def search(self, query: str, limit: int = 5, max_distance: int = None) -> list:
+        """
+        شهرهای منطبق با query (فارسی یا لاتین)؛ به ترتیب: تطبیق کامل، پیشوندی، تقریبی و جمعیت
+        """
+        key = normalize(query)
+        if not key:
+            return []
+        encoded = key.encode("utf-8")
+
+        lo, hi = self._prefix_range(self.keys, encoded)
+        cities = self.key_city[lo:hi]
+        exact = {int(c) for c, k in zip(cities, self.keys[lo:hi]) if k == encoded}
+        ranked = {int(c): (0 if int(c) in exact else 1, 0) for c in cities}
+
+        bones = skeleton(key).encode("utf-8")
+        # اسکلت‌های خیلی کوتاه (مثل rm) شهرهای بی‌ربط را هم می‌گیرند
+        if not exact and len(bones) >= 3:
+            lo, hi = self._prefix_range(self.skeletons, bones)
+            for c, k in zip(self.skeleton_city[lo:hi], self.skeletons[lo:hi]):
+                if k == bones:
+                    ranked.setdefault(int(c), (2, 0))
+
+        if not ranked:
+            if max_distance is None:
+                max_distance = 1 if len(key) <= 5 else 2
+            for city, distance in self._fuzzy(key, max_distance).items():
+                ranked.setdefault(city, (3, distance))
+
+        population = self.cities["population"]
+        best = sorted(ranked, key=lambda c: (ranked[c], -int(population[c])))[:limit]
+        return [self.place(city) for city in best]
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+_gazetteer = None
+
+
+def get_gazetteer() -> Gazetteer:
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = Gazetteer.load()
+    return _gazetteer
+
+
+def search(query: str, limit: int = 5) -> list:
+    return get_gazetteer().search(query, limit)
+
+
+def place(city: int) -> Place:
+    return get_gazetteer().place(city)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        for place in search(" ".join(sys.argv[1:])):
+            print(place)
+    else:
+        print(build_index())
@@ -1,3 +1,9 @@
+from utils import lazy
+from utils.cache import cached, horoscope_cache
+
+astro = lazy.module("utils.astro")
+
+
 def get_healing_tips():
     """
     نکات ساده و عمومی برای آرامش و حس خوب
@@ -9,3 +15,37 @@ def get_healing_tips():
         "- حداقل ۱۰ دقیقه در طبیعت یا کنار پنجره قدم بزن.\n"
         "- به افکار مثبت توجه کن.\n"
     )
+
+
+# sigil پیشنهادی بر اساس عنصر برج خورشید (آتش، خاک، باد، آب)
+_ELEMENT_SIGILS = {
+    "fa": (
+        "🔥 sigil شجاعت: یک مثلث رو به بالا را هنگام طلوع خورشید رسم کن.",
+        "🌱 sigil ثبات: یک مربع ساده را روی کاغذ سبز بکش و همراه داشته باش.",
+        "🌬 sigil شفافیت ذهن: یک دایره با خطی افقی در میانه آن رسم کن.",
+        "🌊 sigil آرامش: یک مثلث رو به پایین را کنار آب یا هنگام شب رسم کن.",
+    ),
+    "en": (
+        "🔥 Courage sigil: draw an upward triangle at sunrise.",
+        "🌱 Stability sigil: draw a simple square on green paper and keep it with you.",
+        "🌬 Clarity sigil: draw a circle with a horizontal line through its middle.",
+        "🌊 Calm sigil: draw a downward triangle near water or at night.",
+    ),
+}
+
+
+def _sigil_key(user_data: dict, lang: str = None):
+    lang = lang or user_data.get("lang", "fa")
+    return astro.julian_day(astro.birth_date_from(user_data)), lang, "sigil"
+
+
+@cached(horoscope_cache, _sigil_key)
+def suggest_sigil(user_data: dict, lang: str = None) -> str:
+    """
+    پیشنهاد sigil بر اساس برج خورشید روز تولد
+    """
+    lang = lang or user_data.get("lang", "fa")
+    positions = astro.get_positions_batch([astro.birth_date_from(user_data)])[0]
+    sign = int(astro.sign_of(positions[0, 0]))
+    sigils = _ELEMENT_SIGILS.get(lang, _ELEMENT_SIGILS["fa"])
+    return sigils[sign % 4]
@@ -0,0 +1,285 @@
+"""
+صف محدود آپدیت‌ها با حذف تکراری (update_id) و کنار گذاشتن بار بر اساس اولویت
+
+تلگرام وقتی پاسخ وبهوک دیر برسد آن را دوباره می‌فرستد؛ این مرحله بین سرور
+وبهوک و Application قرار می‌گیرد تا تکراری‌ها حذف شوند و در زمان شلوغی
+پیام‌های کم‌اهمیت (مثل echo) زودتر از مراحل گفتگو کنار گذاشته شوند.
+
+هر چت صف FIFO خودش را دارد و در هر لحظه حداکثر یک آپدیت از آن پردازش می‌شود،
+پس ترتیب پیام‌های هر کاربر برای ConversationHandler حفظ می‌شود. چت‌های مختلف
+با INGRESS_CONCURRENCY worker همزمان پیش می‌روند؛ اگر یک هندلر منتظر ارسال
+(محدودیت هر چت)، executor یا دیتابیس باشد، فقط همان چت منتظر می‌ماند. اولویت
+فقط بین چت‌ها اثر دارد: worker بعدی چتی را برمی‌دارد که آپدیت سر صفش مهم‌تر
+است. داخل یک چت، /cancel یا دکمه هیچ‌وقت از متن قبلی همان کاربر جلو نمی‌زند.
+"""
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+
+from utils import metrics
+from utils.tracing import span, tracer
+
+logger = logging.getLogger(__name__)
+
+# اولویت‌ها: عدد کمتر = مهم‌تر
+PRIORITY_HIGH = 0    # دستورها و CallbackQuery
+PRIORITY_NORMAL = 1  # متن در گفتگوی فعال
+PRIORITY_LOW = 2     # بقیه (echo، ویرایش پیام، ...)
+PRIORITY_NAMES = ("high", "normal", "low")
+
+MAX_DEPTH = int(os.environ.get("INGRESS_MAX_DEPTH", 1000))
+DEDUP_WINDOW = int(os.environ.get("INGRESS_DEDUP_WINDOW", 10000))
+CONVERSATION_TTL = float(os.environ.get("INGRESS_CONVERSATION_TTL", 600))
+CONCURRENCY = int(os.environ.get("INGRESS_CONCURRENCY", 32))
+
+update_seconds = metrics.Histogram("bot_update_seconds", "Time to process one update", ("priority",))
+# صف‌های در حال کار (بین start و stop) برای gauge ها
+_running = []
+
+
+class _Entry:
+    """
+    یک آپدیت در صف؛ update=None یعنی کنار گذاشته یا برداشته شده (حذف تنبل از _order)
+    """
+    __slots__ = ("priority", "update", "key")
+
+    def __init__(self, priority: int, update, key):
+        self.priority = priority
+        self.update = update
+        self.key = key
+
+
+def chat_key(update):
+    """
+    کلید ترتیب: چت، در نبود آن کاربر و در نبود هر دو خود آپدیت (بدون ترتیب)
+    """
+    chat = update.effective_chat
+    if chat is not None:
+        return chat.id
+    user = update.effective_user
+    if user is not None:
+        return "user", user.id
+    return "update", update.update_id
+
+
+class UpdateIngress:
+    """
+    صف FIFO برای هر چت با سقف عمق کلی؛ آپدیت‌ها با application.process_update پردازش می‌شوند
+    """
+
+    def __init__(self, application, max_depth: int = MAX_DEPTH, dedup_window: int = DEDUP_WINDOW,
+                 conversation_ttl: float = CONVERSATION_TTL, concurrency: int = CONCURRENCY):
+        self.application = application
+        self.max_depth = max_depth
+        self.dedup_window = dedup_window
+        self.conversation_ttl = conversation_ttl
+        self.concurrency = concurrency
+
+        # کلید چت → صف FIFO آپدیت‌ها؛ هر کلید موجود یا در یکی از _ready ها هست یا در _busy
+        self._chats = {}
+        self._busy = set()
+        # چت‌های آماده پردازش بر اساس اولویت آپدیت سر صفشان
+        self._ready_chats = tuple(deque() for _ in PRIORITY_NAMES)
+        # همه آپدیت‌های در صف به ترتیب رسیدن برای هر اولویت (برای کنار گذاشتن قدیمی‌ترین)
+        self._order = tuple(deque() for _ in PRIORITY_NAMES)
+        self._depths = [0] * len(PRIORITY_NAMES)
+        self._seen = set()
+        self._seen_order = deque()
+        # چت‌هایی که اخیراً دستور فرستاده‌اند، یعنی احتمالاً وسط گفتگو هستند
+        self._active_chats = OrderedDict()
+        self._ready = asyncio.Event()
+        self._workers = []
+
+        self.accepted = 0
+        self.duplicates = 0
+        self.processed = 0
+        self.dropped = [0] * len(PRIORITY_NAMES)
+
+    @property
+    def depth(self) -> int:
+        return sum(self._depths)
+
+    # ---------- طبقه‌بندی ----------
+
+    def classify(self, update) -> int:
+        if update.callback_query is not None:
+            return PRIORITY_HIGH
+
+        message = update.message
+        if message is None:
+            return PRIORITY_LOW
+
+        chat_id = message.chat_id
+        now = time.monotonic()
+        if message.text and message.text.startswith("/"):
+            self._active_chats[chat_id] = now
+            self._active_chats.move_to_end(chat_id)
+            while len(self._active_chats) > self.dedup_window:
+                self._active_chats.popitem(last=False)
+            return PRIORITY_HIGH
+
+        started = self._active_chats.get(chat_id)
+        if started is not None and now - started < self.conversation_ttl:
+            return PRIORITY_NORMAL
+        return PRIORITY_LOW
+
+    # ---------- ورودی ----------
+
+    def _is_duplicate(self, update_id: int) -> bool:
+        if update_id in self._seen:
+            return True
+        self._seen.add(update_id)
+        self._seen_order.append(update_id)
+        if len(self._seen_order) > self.dedup_window:
+            self._seen.discard(self._seen_order.popleft())
+        return False
+
+    def submit(self, update) -> str:
+        """
+        قرار دادن آپدیت در صف چتش؛ خروجی: "accepted"، "duplicate" یا "dropped"
+        (در هر سه حالت وبهوک 200 برمی‌گرداند تا تلگرام دوباره نفرستد)
+        """
+        if self._is_duplicate(update.update_id):
+            self.duplicates += 1
+            return "duplicate"
+
+        priority = self.classify(update)
+        if self.depth >= self.max_depth and not self._shed(priority):
+            self.dropped[priority] += 1
+            return "dropped"
+
+        key = chat_key(update)
+        entry = _Entry(priority, update, key)
+        queue = self._chats.get(key)
+        if queue is None:
+            queue = self._chats[key] = deque()
+            self._schedule(key, priority)
+        queue.append(entry)
+        self._order[priority].append(entry)
+        self._depths[priority] += 1
+        self.accepted += 1
+        return "accepted"
+
+    def _shed(self, priority: int) -> bool:
+        """
+        کنار گذاشتن قدیمی‌ترین آپدیت از کم‌اهمیت‌ترین اولویتی که از priority کم‌اهمیت‌تر است
+        """
+        for victim in range(len(PRIORITY_NAMES) - 1, priority, -1):
+            order = self._order[victim]
+            while order:
+                entry = order.popleft()
+                if entry.update is None:
+                    continue
+                self._chats[entry.key].remove(entry)
+                entry.update = None
+                self._depths[victim] -= 1
+                self.dropped[victim] += 1
+                return True
+        return False
+
+    # ---------- پردازش ----------
+
+    def _schedule(self, key, priority: int):
+        self._ready_chats[priority].append(key)
+        self._ready.set()
+
+    def _pop(self):
+        """
+        آپدیت سر صف مهم‌ترین چت آماده؛ (None، None) اگر چیزی آماده نیست
+        """
+        for ready in self._ready_chats:
+            while ready:
+                key = ready.popleft()
+                queue = self._chats[key]
+                if not queue:
+                    # همه آپدیت‌های این چت کنار گذاشته شده‌اند
+                    del self._chats[key]
+                    continue
+                entry = queue.popleft()
+                self._busy.add(key)
+                update, entry.update = entry.update, None
+                self._depths[entry.priority] -= 1
+                self._trim(entry.priority)
+                return entry, update
+        return None, None
+
+    def _trim(self, priority: int):
+        # آپدیت‌های پردازش شده از _order؛ اگر یک چت کند جلوی صف مانده باشد، فشرده‌سازی کامل
+        order = self._order[priority]
+        while order and order[0].update is None:
+            order.popleft()
+        if len(order) > 2 * self.max_depth:
+            self._order = tuple(
+                deque(e for e in o if e.update is not None) if p == priority else o
+                for p, o in enumerate(self._order)
+            )
+
+    def _release(self, key):
+        self._busy.discard(key)
+        queue = self._chats[key]
+        if queue:
+            self._schedule(key, queue[0].priority)
+        else:
+            del self._chats[key]
+
+    async def _worker(self):
+        while True:
+            entry, update = self._pop()
+            if update is None:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            start = time.perf_counter()
+            trace, token = tracer.resume(update.update_id)
+            try:
+                with span("process_update"):
+                    await self.application.process_update(update)
+            except Exception:
+                logger.exception("خطا در پردازش آپدیت %s", update.update_id)
+            finally:
+                if trace is not None:
+                    tracer.finish(trace, token)
+                self._release(entry.key)
+            update_seconds.labels(PRIORITY_NAMES[entry.priority]).observe(time.perf_counter() - start)
+            self.processed += 1
+
+    def start(self):
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        _running.append(self)
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self in _running:
+            _running.remove(self)
+
+    def stats(self) -> dict:
+        stats = {
+            "depth": self.depth,
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+            "processed": self.processed,
+            "dropped": sum(self.dropped),
+            "chats": len(self._chats),
+            "busy_chats": len(self._busy),
+        }
+        for name, depth, dropped in zip(PRIORITY_NAMES, self._depths, self.dropped):
+            stats[f"depth_{name}"] = depth
+            stats[f"dropped_{name}"] = dropped
+        return stats
+
+
+def _totals(attr: str):
+    return lambda: sum(getattr(ingress, attr) for ingress in _running)
+
+
+metrics.Gauge("bot_ingress_depth", "Updates waiting in the ingress queue", ("priority",),
+              func=lambda: {name: sum(i._depths[p] for i in _running) for p, name in enumerate(PRIORITY_NAMES)})
+metrics.Counter("bot_ingress_accepted_total", "Updates accepted into the queue", func=_totals("accepted"))
+metrics.Counter("bot_ingress_duplicates_total", "Duplicate updates ignored", func=_totals("duplicates"))
+metrics.Counter("bot_ingress_dropped_total", "Updates dropped under load", ("priority",),
+                func=lambda: {name: sum(i.dropped[p] for i in _running) for p, name in enumerate(PRIORITY_NAMES)})
@@ -0,0 +1,179 @@
+"""
+تبدیل سریع تاریخ شمسی ↔ میلادی با جدول پیش‌محاسبه‌شده (سال‌های ۱۲۰۰ تا ۱۵۰۰)
+
+روز اول هر سال شمسی یک بار به شماره روز (ordinal میلادی) تبدیل و در جدول
+نگه داشته می‌شود؛ بعد از آن هر تبدیل چند عمل حسابی و یک خواندن از جدول است.
+خارج از این بازه از persiantools استفاده می‌شود.
+"""
+from datetime import date
+
+import numpy as np
+
+FIRST_YEAR = 1200
+LAST_YEAR = 1500
+
+# ۳۳ سال شمسی = ۱۲۰۵۳ روز
+_CYCLE_YEARS = 33
+_CYCLE_DAYS = 12053
+
+# اختلاف ordinal میلادی و شماره روز ژولینی (ظهر، مثل swe.julday)
+JDN_OFFSET = 1721425
+
+# ۱ فروردین ۱۴۰۰ = ۲۱ مارس ۲۰۲۱
+_ANCHOR_YEAR = 1400
+_ANCHOR_ORDINAL = date(2021, 3, 21).toordinal()
+
+
+def _is_leap_rule(year: int) -> bool:
+    # قاعده ۳۳ ساله؛ در بازه ۱۲۰۰ تا ۱۵۰۰ استثنایی ندارد (مثل persiantools)
+    return (25 * year + 11) % 33 < 8
+
+
+def _build_year_starts() -> np.ndarray:
+    lengths = np.array([366 if _is_leap_rule(y) else 365 for y in range(FIRST_YEAR, LAST_YEAR + 1)], dtype=np.int64)
+    starts = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=starts[1:])
+    return starts + _ANCHOR_ORDINAL - starts[_ANCHOR_YEAR - FIRST_YEAR]
+
+
+# YEAR_STARTS[i]: ordinal روز ۱ فروردین سال FIRST_YEAR + i (آخرین عضو: ۱ فروردین LAST_YEAR + 1)
+YEAR_STARTS = _build_year_starts()
+_YEAR_STARTS = YEAR_STARTS.tolist()
+
+# روزهای گذشته از ابتدای سال تا ابتدای هر ماه (اندیس ۱ تا ۱۲)
+MONTH_OFFSETS = np.array([0] + [31 * (m - 1) if m <= 7 else 186 + 30 * (m - 7) for m in range(1, 13)], dtype=np.int64)
+_MONTH_OFFSETS = MONTH_OFFSETS.tolist()
+
+FIRST_ORDINAL = _YEAR_STARTS[0]
+LAST_ORDINAL = _YEAR_STARTS[-1] - 1
+
+
+def is_leap(year: int) -> bool:
+    if FIRST_YEAR <= year <= LAST_YEAR:
+        i = year - FIRST_YEAR
+        return _YEAR_STARTS[i + 1] - _YEAR_STARTS[i] == 366
+    from persiantools.jdatetime import JalaliDate
+    return JalaliDate.is_leap(year)
+
+
+def month_length(year: int, month: int) -> int:
+    if month <= 6:
+        return 31
+    if month <= 11:
+        return 30
+    return 30 if is_leap(year) else 29
+
+
+def is_valid(year, month, day) -> bool:
+    """
+    بررسی معتبر بودن تاریخ شمسی بدون استفاده از exception
+    """
+    if not (isinstance(year, int) and isinstance(month, int) and isinstance(day, int)):
+        return False
+    if FIRST_YEAR <= year <= LAST_YEAR:
+        return 1 <= month <= 12 and 1 <= day <= month_length(year, month)
+
+    # خارج از جدول: مسیر کند persiantools
+    from persiantools.jdatetime import JalaliDate
+    try:
+        JalaliDate(year, month, day)
+    except ValueError:
+        return False
+    return True
+
+
+def to_ordinal(year: int, month: int, day: int) -> int:
+    """
+    شماره روز میلادی (date.toordinal) برای یک تاریخ شمسی معتبر
+    """
+    if FIRST_YEAR <= year <= LAST_YEAR:
+        return _YEAR_STARTS[year - FIRST_YEAR] + _MONTH_OFFSETS[month] + day - 1
+    from persiantools.jdatetime import JalaliDate
+    return JalaliDate(year, month, day).to_gregorian().toordinal()
+
+
+def to_gregorian(year: int, month: int, day: int) -> date:
+    """
+    تبدیل شمسی به میلادی؛ برای تاریخ نامعتبر ValueError
+    """
+    if not is_valid(year, month, day):
+        raise ValueError(f"تاریخ شمسی نامعتبر: {year}-{month}-{day}")
+    return date.fromordinal(to_ordinal(year, month, day))
+
+
+def to_jdn(year: int, month: int, day: int) -> int:
+    """
+    شماره روز ژولینی (همان مقدار swe.julday برای تاریخ میلادی معادل)
+    """
+    if not is_valid(year, month, day):
+        raise ValueError(f"تاریخ شمسی نامعتبر: {year}-{month}-{day}")
+    return to_ordinal(year, month, day) + JDN_OFFSET
+
+
+def from_ordinal(ordinal: int):
+    """
+    تبدیل شماره روز میلادی به (سال، ماه، روز) شمسی
+    """
+    if not FIRST_ORDINAL <= ordinal <= LAST_ORDINAL:
+        from persiantools.jdatetime import JalaliDate
+        j = JalaliDate.to_jalali(date.fromordinal(ordinal))
+        return j.year, j.month, j.day
+
+    # تخمین سال از طول چرخه ۳۳ ساله و اصلاح حداکثر یک سال
+    i = (ordinal - FIRST_ORDINAL) * _CYCLE_YEARS // _CYCLE_DAYS
+    if _YEAR_STARTS[i] > ordinal:
+        i -= 1
+    elif _YEAR_STARTS[i + 1] <= ordinal:
+        i += 1
+
+    doy = ordinal - _YEAR_STARTS[i]
+    if doy < 186:
+        month, day = doy // 31 + 1, doy % 31 + 1
+    else:
+        month, day = (doy - 186) // 30 + 7, (doy - 186) % 30 + 1
+    return FIRST_YEAR + i, month, day
+
+
+def from_gregorian(value: date):
+    return from_ordinal(value.toordinal())
+
+
+# ---------- نسخه برداری برای کارهای دسته‌ای ----------
+
+def valid_array(years, months, days) -> np.ndarray:
+    """
+    ماسک معتبر بودن برای آرایه‌ای از تاریخ‌های شمسی (فقط بازه جدول)
+    """
+    years, months, days = (np.asarray(a, dtype=np.int64) for a in (years, months, days))
+    in_range = (years >= FIRST_YEAR) & (years <= LAST_YEAR) & (months >= 1) & (months <= 12) & (days >= 1)
+    i = np.clip(years - FIRST_YEAR, 0, len(YEAR_STARTS) - 2)
+    leap = (YEAR_STARTS[i + 1] - YEAR_STARTS[i]) == 366
+    lengths = np.where(months <= 6, 31, np.where(months <= 11, 30, np.where(leap, 30, 29)))
+    return in_range & (days <= lengths)
+
+
+def to_ordinal_array(years, months, days) -> np.ndarray:
+    """
+    ordinal میلادی برای آرایه‌ای از تاریخ‌ها؛ تاریخ‌های نامعتبر ‎-1‎ می‌شوند
+    """
+    years, months, days = (np.asarray(a, dtype=np.int64) for a in (years, months, days))
+    valid = valid_array(years, months, days)
+    i = np.clip(years - FIRST_YEAR, 0, len(YEAR_STARTS) - 2)
+    ordinals = YEAR_STARTS[i] + MONTH_OFFSETS[np.clip(months, 1, 12)] + days - 1
+    return np.where(valid, ordinals, -1)
+
+
+def to_jdn_array(years, months, days) -> np.ndarray:
+    ordinals = to_ordinal_array(years, months, days)
+    return np.where(ordinals >= 0, ordinals + JDN_OFFSET, -1)
+
+
+def to_gregorian_array(years, months, days) -> np.ndarray:
+    """
+    خروجی datetime64[D]؛ تاریخ‌های نامعتبر NaT می‌شوند
+    """
+    ordinals = to_ordinal_array(years, months, days)
+    unix_days = ordinals - date(1970, 1, 1).toordinal()
+    out = unix_days.astype("datetime64[D]")
+    out[ordinals < 0] = np.datetime64("NaT")
+    return out
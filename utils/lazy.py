@@ -0,0 +1,103 @@
+"""
+import تأخیری ماژول‌های سنگین (numpy، swisseph، Pillow) برای cold start سریع‌تر
+
+`astro = lazy.module("utils.astro")` بلافاصله برمی‌گردد و import واقعی در اولین
+دسترسی به یک attribute انجام می‌شود؛ پس سرور وبهوک قبل از بارگذاری numpy و
+swisseph به تلگرام جواب می‌دهد. بعد از bind شدن پورت، prewarm() همه ماژول‌های
+ثبت شده را در یک thread جدا import می‌کند تا اولین کاربر منتظر نماند.
+با LAZY_IMPORTS=0 ماژول‌ها مثل قبل همان لحظه import می‌شوند و با PREWARM=0
+پیش‌بارگذاری انجام نمی‌شود.
+"""
+import os
+import time
+import asyncio
+import logging
+import importlib
+
+logger = logging.getLogger(__name__)
+
+LAZY_IMPORTS = os.environ.get("LAZY_IMPORTS", "1") != "0"
+PREWARM = os.environ.get("PREWARM", "1") != "0"
+
+# نام ماژول → LazyModule (به ترتیب ثبت)
+_modules = {}
+
+
+class LazyModule:
+    """
+    جانشین ماژول که در اولین دسترسی به attribute ماژول واقعی را import می‌کند
+    """
+
+    __slots__ = ("_name", "_module", "_seconds")
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._seconds = None
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            start = time.perf_counter()
+            module = importlib.import_module(self._name)
+            self._seconds = time.perf_counter() - start
+            self._module = module
+            logger.debug("lazy import %s: %.0f ms", self._name, self._seconds * 1000)
+        return module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def module(name: str):
+    """
+    ماژول name به صورت تأخیری (یا با LAZY_IMPORTS=0 همان ماژول واقعی)
+    """
+    if not LAZY_IMPORTS:
+        return importlib.import_module(name)
+    proxy = _modules.get(name)
+    if proxy is None:
+        proxy = _modules[name] = LazyModule(name)
+    return proxy
+
+
+def load_all():
+    for proxy in list(_modules.values()):
+        proxy._load()
+
+
+async def prewarm():
+    """
+    import همه ماژول‌های ثبت شده در thread جدا؛ بعد از bind شدن وبهوک صدا زده می‌شود
+    """
+    pending = [name for name, proxy in _modules.items() if not proxy.loaded]
+    if not pending:
+        return
+    start = time.perf_counter()
+    try:
+        await asyncio.to_thread(load_all)
+    except Exception:
+        logger.exception("prewarm failed")
+        return
+    logger.info("prewarmed %d modules in %.0f ms", len(pending), (time.perf_counter() - start) * 1000)
+
+
+def stats() -> dict:
+    return {
+        "lazy": LAZY_IMPORTS,
+        "modules": {
+            name: round(proxy._seconds * 1000, 1) if proxy.loaded else None
+            for name, proxy in _modules.items()
+        },
+    }
@@ -0,0 +1,220 @@
+"""
+ارسال تصویر/فایل با کش file_id تلگرام
+
+بعد از اولین آپلود، file_id برگشتی تلگرام با hash محتوای فایل نگه داشته می‌شود
+و ارسال‌های بعدی همان بایت‌ها فقط file_id را می‌فرستند (بدون آپلود). کش LRU
+است و اگر با open() به فایل SQLite اپلیکیشن وصل شود بعد از ری‌استارت هم می‌ماند.
+hit فقط ترتیب LRU در حافظه را عوض می‌کند؛ last_used هر FILE_ID_FLUSH_INTERVAL
+ثانیه، همراه put بعدی یا در flush() هنگام خاموش شدن یک‌جا نوشته می‌شود تا
+ارسال با file_id هیچ‌وقت منتظر دیسک نماند.
+"""
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from telegram.error import BadRequest
+
+from utils import metrics
+from utils.persistence import open_db
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = int(os.environ.get("FILE_ID_CACHE_MAX", 10000))
+FLUSH_INTERVAL = float(os.environ.get("FILE_ID_FLUSH_INTERVAL", 30))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_ids (
+    hash TEXT PRIMARY KEY, file_id TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL
+);
+"""
+
+
+class FileIdCache:
+    """
+    hash محتوا → (file_id، اندازه) با ترتیب LRU و آمار بایت‌های آپلود شده / صرفه‌جویی شده
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, flush_interval: float = FLUSH_INTERVAL):
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self._entries = OrderedDict()
+        self._conn = None
+        self._lock = asyncio.Lock()
+        # hash → زمان آخرین hit که هنوز در SQLite نوشته نشده
+        self._touched = {}
+        self._flush_task = None
+        # مسیر → (mtime، اندازه، hash) تا فایل‌های تکراری دوباره hash نشوند؛ LRU با همان سقف
+        self._path_hashes = OrderedDict()
+        self._path_lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_uploaded = 0
+        self.bytes_avoided = 0
+
+    def open(self, path: str):
+        """
+        اتصال به SQLite و بارگذاری file_id های ذخیره شده (جدیدترین‌ها تا سقف max_entries)
+        """
+        self._conn = open_db(path)
+        self._conn.executescript(_SCHEMA)
+        rows = self._conn.execute(
+            "SELECT hash, file_id, size FROM file_ids ORDER BY last_used DESC LIMIT ?", (self.max_entries,)
+        ).fetchall()
+        self._entries = OrderedDict((key, (file_id, size)) for key, file_id, size in reversed(rows))
+
+    async def _execute(self, *statements):
+        """
+        اجرای چند (sql، پارامترها) در یک تراکنش؛ last_used های جمع شده هم همراهشان نوشته می‌شوند
+        """
+        if self._conn is None:
+            self._touched.clear()
+            return
+        touched, self._touched = self._touched, {}
+        if touched:
+            statements += (("UPDATE file_ids SET last_used = ? WHERE hash = ?",
+                            [(used, key) for key, used in touched.items()]),)
+
+        def call():
+            with self._conn:
+                for sql, params in statements:
+                    if isinstance(params, list):
+                        self._conn.executemany(sql, params)
+                    else:
+                        self._conn.execute(sql, params)
+
+        try:
+            async with self._lock:
+                await asyncio.to_thread(call)
+        except Exception:
+            # hit های بعدی جدیدترند و نگه داشته می‌شوند
+            for key, used in touched.items():
+                self._touched.setdefault(key, used)
+            raise
+
+    async def _write_touched(self):
+        try:
+            await self._execute()
+        except Exception:
+            logger.exception("خطا در نوشتن last_used کش file_id")
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        # لغو شدن task در flush() نوشتن نیمه‌کاره را قطع نمی‌کند
+        await asyncio.shield(self._write_touched())
+
+    async def flush(self):
+        """
+        نوشتن last_used های مانده (هنگام خاموش شدن اپلیکیشن)
+        """
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self._execute()
+
+    # ---------- کش ----------
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        if self._conn is not None:
+            self._touched[key] = time.time()
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+        return entry[0]
+
+    async def put(self, key: str, file_id: str, size: int):
+        self._entries[key] = (file_id, size)
+        self._entries.move_to_end(key)
+        self._touched.pop(key, None)
+        statements = [("INSERT OR REPLACE INTO file_ids VALUES (?, ?, ?, ?)", (key, file_id, size, time.time()))]
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._touched.pop(evicted, None)
+            self.evictions += 1
+            statements.append(("DELETE FROM file_ids WHERE hash = ?", (evicted,)))
+        await self._execute(*statements)
+
+    async def discard(self, key: str):
+        self._entries.pop(key, None)
+        self._touched.pop(key, None)
+        await self._execute(("DELETE FROM file_ids WHERE hash = ?", (key,)))
+
+    # ---------- محتوا ----------
+
+    def _read(self, path: str):
+        # در thread اجرا می‌شود؛ _path_lock دسترسی همزمان به LRU مسیرها را جدا می‌کند
+        stat = os.stat(path)
+        with self._path_lock:
+            known = self._path_hashes.get(path)
+            if known is not None and known[:2] == (stat.st_mtime_ns, stat.st_size):
+                self._path_hashes.move_to_end(path)
+                return None, known[2], stat.st_size
+        with open(path, "rb") as f:
+            data = f.read()
+        key = hashlib.sha256(data).hexdigest()
+        with self._path_lock:
+            self._path_hashes[path] = (stat.st_mtime_ns, stat.st_size, key)
+            self._path_hashes.move_to_end(path)
+            while len(self._path_hashes) > self.max_entries:
+                self._path_hashes.popitem(last=False)
+        return data, key, stat.st_size
+
+    async def send(self, bot, chat_id: int, path: str, kind: str = "photo", **kwargs):
+        """
+        ارسال فایل path با bot.send_photo / send_document؛ اگر file_id موجود باشد آپلود نمی‌شود
+        """
+        data, key, size = await asyncio.to_thread(self._read, path)
+        send = getattr(bot, f"send_{kind}")
+
+        file_id = self.get(key)
+        if file_id is not None:
+            try:
+                message = await send(chat_id, file_id, **kwargs)
+                self.hits += 1
+                self.bytes_avoided += size
+                return message
+            except BadRequest:
+                # file_id دیگر معتبر نیست (مثلاً توکن ربات عوض شده)؛ دوباره آپلود می‌شود
+                logger.warning("file_id نامعتبر برای %s؛ آپلود مجدد", path)
+                await self.discard(key)
+
+        if data is None:
+            data = await asyncio.to_thread(_read_bytes, path)
+        message = await send(chat_id, data, filename=os.path.basename(path), **kwargs)
+        self.misses += 1
+        self.bytes_uploaded += size
+
+        attachment = message.photo[-1] if kind == "photo" else getattr(message, kind)
+        await self.put(key, attachment.file_id, size)
+        return message
+
+    def stats(self) -> dict:
+        sends = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "paths": len(self._path_hashes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / sends if sends else 0.0,
+            "bytes_uploaded": self.bytes_uploaded,
+            "bytes_avoided": self.bytes_avoided,
+        }
+
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+# نمونه مشترک هر پروسه (بدون open فقط در حافظه)
+file_ids = FileIdCache()
+metrics.register_cache("file_ids", file_ids)
@@ -0,0 +1,375 @@
+"""
+متریک‌های Prometheus (Counter، Gauge، Histogram) بدون وابستگی خارجی
+
+ثبت مقدار بدون قفل است: هر thread شمارنده‌های جدای خودش (shard) را دارد و
+جمع آن‌ها فقط هنگام خواندن /metrics حساب می‌شود؛ روی event loop هر observe
+فقط یک bisect و دو جمع است. worker های ProcessPoolExecutor متریک‌های خودشان
+را با drain() همراه نتیجه هر کار برمی‌گردانند و utils.executor آن‌ها را با
+merge() به پروسه اصلی اضافه می‌کند.
+
+Gauge و Counter می‌توانند به جای set/inc یک func داشته باشند که هنگام خواندن
+مقدار (یا دیکشنری برچسب‌ها → مقدار) را از stats() اجزای دیگر برمی‌گرداند.
+"""
+import os
+import time
+import functools
+import threading
+from bisect import bisect_left
+
+from utils.tracing import span
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+ENABLED = os.environ.get("METRICS", "1") != "0"
+
+# مرزهای پیش‌فرض (ثانیه): از ۱۰ میکروثانیه (swe.calc) تا ۱۰ ثانیه (هندلرها)
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# نام → متریک (به ترتیب ثبت)
+_metrics = {}
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Sharded:
+    """
+    مقدار یک سری زمانی: یک لیست برای هر thread، جمع در زمان خواندن
+    """
+
+    __slots__ = ("_size", "_local", "_shards")
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._shards = []
+
+    def _new_shard(self) -> list:
+        shard = self._local.shard = [0] * self._size
+        self._shards.append(shard)  # append زیر GIL اتمیک است
+        return shard
+
+    def totals(self) -> list:
+        totals = [0] * self._size
+        for shard in list(self._shards):
+            for i, value in enumerate(shard):
+                totals[i] += value
+        return totals
+
+    def drain(self) -> list:
+        # فقط در worker های تک‌thread پروسه‌ای صدا زده می‌شود
+        totals = self.totals()
+        for shard in self._shards:
+            shard[:] = [0] * self._size
+        return totals
+
+    def add(self, totals: list):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        for i, value in enumerate(totals):
+            shard[i] += value
+
+
+class _CounterChild(_Sharded):
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount: float = 1):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[0] += amount
+
+
+class _HistogramChild(_Sharded):
+    # shard: شمار هر bucket (آخری +Inf) و در انتها مجموع مقادیر
+    __slots__ = ("_bounds",)
+
+    def __init__(self, bounds: tuple):
+        super().__init__(len(bounds) + 2)
+        self._bounds = bounds
+
+    def observe(self, value: float, count: int = 1):
+        """
+        ثبت value؛ با count > 1 میانگین یک دسته (مثلاً زمان هر swe.calc در یک حلقه)
+        """
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[bisect_left(self._bounds, value)] += count
+        shard[-1] += value * count
+
+    def time(self):
+        return _Timer(self)
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.perf_counter() - self._start)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), func=None):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.func = func
+        self._children = {}
+        if name in _metrics:
+            raise ValueError(f"metric {name} already registered")
+        _metrics[name] = self
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            # setdefault اتمیک است؛ اگر دو thread همزمان بسازند یکی برنده می‌شود
+            child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _samples(self):
+        if self.func is not None:
+            value = self.func()
+            if isinstance(value, dict):
+                for key, v in value.items():
+                    yield self.name, key if isinstance(key, tuple) else (key,), "", v
+            else:
+                yield self.name, (), "", value
+            return
+        for values, child in list(self._children.items()):
+            yield from self._child_samples(values, child)
+
+    def _child_samples(self, values, child):
+        raise NotImplementedError
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, values, extra, value in self._samples():
+            lines.append(f"{name}{_format_labels(self.label_names, values, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def _child_samples(self, values, child):
+        yield self.name, values, "", child.totals()[0]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def _child_samples(self, values, child):
+        yield self.name, values, "", child.value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labels)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float, count: int = 1):
+        self.labels().observe(value, count)
+
+    def time(self):
+        return self.labels().time()
+
+    def _child_samples(self, values, child):
+        totals = child.totals()
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), totals):
+            cumulative += count
+            yield f"{self.name}_bucket", values, f'le="{_format_value(float(bound))}"', cumulative
+        yield f"{self.name}_sum", values, "", totals[-1]
+        yield f"{self.name}_count", values, "", cumulative
+
+
+def render() -> str:
+    lines = []
+    for metric in list(_metrics.values()):
+        try:
+            lines.extend(metric.render())
+        except Exception as e:  # یک func خراب نباید کل /metrics را از کار بیندازد
+            lines.append(f"# error collecting {metric.name}: {_escape(e)}")
+    return "\n".join(lines) + "\n"
+
+
+# ---------- worker های پروسه‌ای ----------
+
+def _sharded_children():
+    for metric in list(_metrics.values()):
+        if metric.func is None and isinstance(metric, (Counter, Histogram)):
+            for values, child in list(metric._children.items()):
+                yield metric.name, values, child
+
+
+def drain() -> dict:
+    """
+    مقادیر ثبت شده در این پروسه از آخرین drain: {(نام، برچسب‌ها): totals}
+    """
+    delta = {}
+    for name, values, child in _sharded_children():
+        totals = child.drain()
+        if any(totals):
+            delta[name, values] = totals
+    return delta
+
+
+def merge(delta: dict):
+    for (name, values), totals in delta.items():
+        metric = _metrics.get(name)
+        if metric is not None:
+            metric.labels(*values).add(totals)
+
+
+def reset():
+    """
+    صفر کردن متریک‌های به ارث رسیده از پروسه والد (ابتدای worker بعد از fork)
+    """
+    for _, _, child in _sharded_children():
+        child.drain()
+
+
+# ---------- کش‌ها و هندلرها ----------
+
+_caches = {}
+
+
+def register_cache(name: str, cache):
+    """
+    cache هر شیئی با hits و misses است (LRUCache، DiskCache، FileIdCache)
+    """
+    _caches[name] = cache
+
+
+def _cache_values(attr: str):
+    return lambda: {name: getattr(cache, attr) for name, cache in list(_caches.items())}
+
+
+def _cache_ratios() -> dict:
+    ratios = {}
+    for name, cache in list(_caches.items()):
+        lookups = cache.hits + cache.misses
+        ratios[name] = cache.hits / lookups if lookups else 0.0
+    return ratios
+
+
+handler_seconds = Histogram("bot_handler_seconds", "Handler callback latency", ("handler",))
+handler_errors = Counter("bot_handler_errors_total", "Handler callbacks that raised", ("handler",))
+Counter("bot_cache_hits_total", "Cache hits", ("cache",), func=_cache_values("hits"))
+Counter("bot_cache_misses_total", "Cache misses", ("cache",), func=_cache_values("misses"))
+Gauge("bot_cache_hit_ratio", "Cache hit ratio since start", ("cache",), func=_cache_ratios)
+
+_conversation_handlers = []
+Gauge("bot_conversations_active", "Conversations in a non-final state", ("conversation",),
+      func=lambda: {name: len(handler._conversations) for name, handler in _conversation_handlers})
+
+
+def _timed(callback, name: str):
+    histogram = handler_seconds.labels(name)
+    errors = handler_errors.labels(name)
+    span_name = f"handler {name}"
+
+    @functools.wraps(callback)
+    async def timed(update, context):
+        start = time.perf_counter()
+        try:
+            with span(span_name):
+                return await callback(update, context)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            histogram.observe(time.perf_counter() - start)
+    timed.timed = True
+    return timed
+
+
+def instrument_handlers(application):
+    """
+    پوشاندن callback همه هندلرها (و هندلرهای داخل ConversationHandler ها) با هیستوگرام زمان
+    """
+    if not ENABLED:
+        return
+    from telegram.ext import ConversationHandler
+
+    def instrument(handler):
+        if isinstance(handler, ConversationHandler):
+            name = handler.name or f"conversation_{len(_conversation_handlers)}"
+            _conversation_handlers.append((name, handler))
+            for inner in handler.entry_points + [h for hs in handler.states.values() for h in hs] + handler.fallbacks:
+                instrument(inner)
+            return
+        callback = getattr(handler, "callback", None)
+        if callback is None or getattr(callback, "timed", False):
+            return
+        handler.callback = _timed(callback, getattr(callback, "__name__", type(handler).__name__))
+
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            instrument(handler)
@@ -0,0 +1,228 @@
+"""
+لایه ارسال مشترک: pool اتصال httpx و محدودکننده نرخ (token bucket) برای Bot API
+
+همه فایل‌های ربات Application را با application_builder(token) می‌سازند تا
+اندازه pool، keep-alive و محدودیت‌های سراسری و هر چت تلگرام یک‌جا اعمال شود.
+پاسخ 429 با retry_after همان درخواست صبر و دوباره ارسال می‌شود.
+
+انتظار برای توکن یا بعد از 429 داخل همان هندلری است که پیام را می‌فرستد؛ چون
+utils.ingress هر چت را جدا و چت‌ها را همزمان پردازش می‌کند، این انتظار فقط
+همان چت را نگه می‌دارد و به محدودیت سراسری تبدیل نمی‌شود. انتظاری طولانی‌تر از
+OUTBOUND_MAX_RETRY_WAIT به جای خواباندن هندلر به صورت RetryAfter بالا می‌رود.
+"""
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import timedelta
+
+import httpx
+from telegram.error import RetryAfter
+from telegram.ext import ApplicationBuilder, BaseRateLimiter
+from telegram.request import HTTPXRequest
+
+from utils import metrics
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = int(os.environ.get("OUTBOUND_POOL_SIZE", 64))
+KEEPALIVE_EXPIRY = float(os.environ.get("OUTBOUND_KEEPALIVE", 60))
+GLOBAL_RATE = float(os.environ.get("OUTBOUND_GLOBAL_RATE", 30))        # پیام در ثانیه برای کل ربات
+CHAT_RATE = float(os.environ.get("OUTBOUND_CHAT_RATE", 1))             # پیام در ثانیه برای هر چت خصوصی
+GROUP_RATE = float(os.environ.get("OUTBOUND_GROUP_RATE", 20 / 60))     # پیام در ثانیه برای هر گروه
+# تلگرام پخش یکنواخت را توصیه می‌کند؛ burst بزرگ‌تر در پنجره یک ثانیه‌ای به 429 می‌رسد
+GLOBAL_BURST = float(os.environ.get("OUTBOUND_GLOBAL_BURST", 1))
+MAX_RETRIES = int(os.environ.get("OUTBOUND_MAX_RETRIES", 3))
+MAX_RETRY_WAIT = float(os.environ.get("OUTBOUND_MAX_RETRY_WAIT", 5))
+
+# متدهایی که پیام به یک چت می‌فرستند و مشمول محدودیت تلگرام هستند
+LIMITED_ENDPOINTS = frozenset({
+    "sendMessage", "sendPhoto", "sendDocument", "sendAnimation", "sendVideo", "sendAudio",
+    "sendVoice", "sendSticker", "sendMediaGroup", "sendLocation", "sendContact", "sendPoll",
+    "editMessageText", "editMessageCaption", "editMessageMedia", "editMessageReplyMarkup",
+    "copyMessage", "forwardMessage",
+})
+
+send_seconds = metrics.Histogram("bot_outbound_request_seconds", "Bot API request latency", ("method",))
+throttle_seconds = metrics.Histogram("bot_outbound_wait_seconds", "Time spent waiting for a rate limit token")
+
+
+class TokenBucket:
+    """
+    token bucket با رزرو: هر درخواست یک توکن برمی‌دارد (حتی منفی) و مدت انتظارش را می‌گیرد
+    """
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, now: float) -> float:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def block(self, now: float, seconds: float):
+        # بعد از 429: رزرو بعدی دقیقاً retry_after ثانیه صبر می‌کند (نه یک توکن بیشتر)
+        self.reserve(now)
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+
+class TokenBucketRateLimiter(BaseRateLimiter):
+    """
+    محدودکننده نرخ PTB با یک bucket سراسری و یک bucket برای هر چت، به همراه آمار
+    """
+
+    def __init__(self, global_rate: float = GLOBAL_RATE, chat_rate: float = CHAT_RATE,
+                 group_rate: float = GROUP_RATE, global_burst: float = GLOBAL_BURST,
+                 max_retries: int = MAX_RETRIES, max_retry_wait: float = MAX_RETRY_WAIT,
+                 max_chats: int = 100000):
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self.max_retry_wait = max_retry_wait
+        self.max_chats = max_chats
+        self._chats = OrderedDict()
+        # متدهای بدون چت (answerCallbackQuery، getMe، ...) → زمان پایان 429
+        self._blocked_until = {}
+
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self.errors = 0
+        self.wait_seconds = 0.0
+        self.latency_count = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            is_group = isinstance(chat_id, str) or int(chat_id) < 0
+            rate = self.group_rate if is_group else self.chat_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate, 1.0)
+            if len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+        else:
+            self._chats.move_to_end(chat_id)
+        return bucket
+
+    async def _throttle(self, endpoint: str, chat_id) -> float:
+        now = time.monotonic()
+        if chat_id is not None:
+            wait = max(self.global_bucket.reserve(now), self._chat_bucket(chat_id).reserve(now))
+        else:
+            wait = self._blocked_until.get(endpoint, now) - now
+        if wait <= 0:
+            return 0.0
+        self.throttled += 1
+        self.wait_seconds += wait
+        throttle_seconds.observe(wait)
+        with span(f"outbound.wait {endpoint}"):
+            await asyncio.sleep(wait)
+        return wait
+
+    def _block(self, endpoint: str, chat_id, retry_after: float):
+        now = time.monotonic()
+        if chat_id is not None:
+            self._chat_bucket(chat_id).block(now, retry_after)
+        else:
+            # درخواست‌های همزمان همین متد هم تا پایان مهلت صبر می‌کنند
+            self._blocked_until[endpoint] = max(self._blocked_until.get(endpoint, now), now + retry_after)
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        chat_id = data.get("chat_id") if endpoint in LIMITED_ENDPOINTS else None
+        self.requests += 1
+
+        for attempt in range(self.max_retries + 1):
+            await self._throttle(endpoint, chat_id)
+
+            start = time.perf_counter()
+            try:
+                with span(f"outbound {endpoint}"):
+                    result = await callback(*args, **kwargs)
+            except RetryAfter as exc:
+                retry_after = exc.retry_after
+                if isinstance(retry_after, timedelta):
+                    retry_after = retry_after.total_seconds()
+                self._block(endpoint, chat_id, retry_after)
+                if attempt == self.max_retries or retry_after > self.max_retry_wait:
+                    # هندلر بیش از max_retry_wait خوابانده نمی‌شود
+                    self.errors += 1
+                    raise
+                self.retries += 1
+                logger.warning("429 برای %s (chat=%s)؛ %s ثانیه صبر", endpoint, chat_id, retry_after)
+                continue
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                self.latency_count += 1
+                self.latency_sum += elapsed
+                self.latency_max = max(self.latency_max, elapsed)
+                send_seconds.labels(endpoint).observe(elapsed)
+            return result
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "retries_429": self.retries,
+            "errors": self.errors,
+            "wait_seconds": self.wait_seconds,
+            "latency_avg": self.latency_sum / self.latency_count if self.latency_count else 0.0,
+            "latency_max": self.latency_max,
+            "chats_tracked": len(self._chats),
+            "blocked_methods": len(self._blocked_until),
+        }
+
+
+def build_request(pool_size: int = POOL_SIZE) -> HTTPXRequest:
+    """
+    HTTPXRequest با pool اتصال بزرگ‌تر و keep-alive طولانی
+    """
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+    return HTTPXRequest(connection_pool_size=pool_size, pool_timeout=5.0, httpx_kwargs={"limits": limits})
+
+
+# محدودکننده مشترک هر پروسه (آمار آن در /stats و متریک‌ها استفاده می‌شود)
+rate_limiter = TokenBucketRateLimiter()
+metrics.Counter("bot_outbound_requests_total", "Bot API requests", func=lambda: rate_limiter.requests)
+metrics.Counter("bot_outbound_throttled_total", "Requests delayed by the rate limiter", func=lambda: rate_limiter.throttled)
+metrics.Counter("bot_outbound_retries_total", "Requests retried after 429", func=lambda: rate_limiter.retries)
+metrics.Counter("bot_outbound_errors_total", "Requests that failed", func=lambda: rate_limiter.errors)
+
+
+def application_builder(token: str, base_url: str = None) -> ApplicationBuilder:
+    """
+    ApplicationBuilder با pool اتصال و محدودکننده نرخ مشترک
+    (BOT_API_BASE_URL برای اجرا روی Bot API ساختگی در تست بار)
+    """
+    builder = (
+        ApplicationBuilder()
+        .token(token)
+        .request(build_request())
+        .get_updates_request(build_request(pool_size=1))
+        .rate_limiter(rate_limiter)
+    )
+    base_url = base_url or os.environ.get("BOT_API_BASE_URL")
+    if base_url:
+        builder = builder.base_url(base_url)
+    return builder
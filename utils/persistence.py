@@ -0,0 +1,250 @@
+"""
+Persistence تلگرام روی SQLite (حالت WAL) با نوشتن تأخیری و دسته‌ای
+
+PTB هر update_interval ثانیه تغییرات user_data / chat_data / bot_data و
+وضعیت ConversationHandler ها را به متدهای update_* می‌دهد؛ این متدها فقط
+حافظه را به‌روز می‌کنند و نوشتن روی دیسک یک‌جا در یک thread جداگانه انجام
+می‌شود تا event loop هیچ‌وقت منتظر دیسک نماند.
+وضعیت نیمه‌کاره گفتگوها (utils.state.user_states) هم همراه همین دسته ذخیره می‌شود.
+اگر نوشتن دسته خطا بدهد (قفل بودن فایل، پر بودن دیسک، ...) دسته به صف برمی‌گردد
+و با تأخیر رو به افزایش دوباره نوشته می‌شود؛ مقدارهای جدیدتر همان کلیدها حفظ می‌شوند.
+"""
+import os
+import json
+import time
+import pickle
+import sqlite3
+import asyncio
+import logging
+import threading
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from utils.state import user_states
+
+logger = logging.getLogger(__name__)
+
+PERSISTENCE_PATH = os.environ.get(
+    "PERSISTENCE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "bot_state.sqlite3")
+)
+UPDATE_INTERVAL = float(os.environ.get("PERSISTENCE_INTERVAL", 5))
+# تأخیر تلاش دوباره بعد از خطای نوشتن (دو برابر می‌شود تا سقف) و تعداد تلاش هنگام خاموش شدن
+RETRY_DELAY = float(os.environ.get("PERSISTENCE_RETRY_DELAY", 1))
+RETRY_MAX_DELAY = float(os.environ.get("PERSISTENCE_RETRY_MAX_DELAY", 60))
+SHUTDOWN_ATTEMPTS = int(os.environ.get("PERSISTENCE_SHUTDOWN_ATTEMPTS", 3))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_data (user_id INTEGER PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS chat_data (chat_id INTEGER PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS kv (name TEXT PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS conversations (
+    name TEXT NOT NULL, conv_key TEXT NOT NULL, state BLOB NOT NULL,
+    PRIMARY KEY (name, conv_key)
+);
+CREATE TABLE IF NOT EXISTS user_states (user_id INTEGER PRIMARY KEY, state TEXT NOT NULL, updated REAL NOT NULL);
+"""
+
+# مقدار حذف در صف نوشتن
+_DELETE = object()
+
+
+def open_db(path: str = PERSISTENCE_PATH) -> sqlite3.Connection:
+    """
+    اتصال SQLite در حالت WAL (برای استفاده از چند thread با قفل بیرونی)
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+class SQLitePersistence(BasePersistence):
+    """
+    BasePersistence با SQLite؛ تغییرات در حافظه جمع و در یک تراکنش نوشته می‌شوند
+    """
+
+    def __init__(self, path: str = PERSISTENCE_PATH, update_interval: float = UPDATE_INTERVAL,
+                 store_data: PersistenceInput = None, state_store=user_states):
+        super().__init__(store_data=store_data or PersistenceInput(), update_interval=update_interval)
+        self.path = path
+        self.state_store = state_store
+        if state_store is not None:
+            state_store.track_changes()
+        self._conn = open_db(path)
+        self._db_lock = threading.Lock()
+
+        # صف نوشتن: (جدول، کلید) → مقدار یا _DELETE؛ نوشتن‌های پشت سر هم روی یک کلید ادغام می‌شوند
+        self._pending = {}
+        self._flush_task = None
+        # آخرین مقدار نوشته شده bot_data / callback_data؛ PTB آن‌ها را در هر دوره می‌فرستد
+        self._kv_written = {}
+        self.writes = 0
+        self.batches = 0
+        self.failures = 0
+
+    # ---------- خواندن (فقط هنگام راه‌اندازی توسط PTB صدا زده می‌شوند) ----------
+
+    def _load_rows(self, sql: str, params=()):
+        with self._db_lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    async def get_user_data(self) -> dict:
+        self._restore_user_states()
+        return {user_id: pickle.loads(data) for user_id, data in self._load_rows("SELECT user_id, data FROM user_data")}
+
+    async def get_chat_data(self) -> dict:
+        return {chat_id: pickle.loads(data) for chat_id, data in self._load_rows("SELECT chat_id, data FROM chat_data")}
+
+    async def get_bot_data(self) -> dict:
+        rows = self._load_rows("SELECT data FROM kv WHERE name = 'bot_data'")
+        return pickle.loads(rows[0][0]) if rows else {}
+
+    async def get_callback_data(self):
+        rows = self._load_rows("SELECT data FROM kv WHERE name = 'callback_data'")
+        return pickle.loads(rows[0][0]) if rows else None
+
+    async def get_conversations(self, name: str) -> dict:
+        rows = self._load_rows("SELECT conv_key, state FROM conversations WHERE name = ?", (name,))
+        return {tuple(json.loads(key)): pickle.loads(state) for key, state in rows}
+
+    def _restore_user_states(self):
+        if self.state_store is None:
+            return
+        oldest = time.time() - self.state_store.ttl
+        rows = self._load_rows("SELECT user_id, state FROM user_states WHERE updated >= ?", (oldest,))
+        for user_id, state in rows:
+            self.state_store.restore(user_id, json.loads(state))
+
+    # ---------- نوشتن (فقط حافظه؛ دیسک در _write_batch) ----------
+
+    def _queue(self, table: str, key, value):
+        if table == "kv":
+            if self._kv_written.get(key) == value:
+                return
+            self._kv_written[key] = value
+        self._pending[(table, key)] = value
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_soon())
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        self._queue("user_data", user_id, pickle.dumps(data))
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        self._queue("chat_data", chat_id, pickle.dumps(data))
+
+    async def update_bot_data(self, data: dict) -> None:
+        self._queue("kv", "bot_data", pickle.dumps(data))
+
+    async def update_callback_data(self, data) -> None:
+        self._queue("kv", "callback_data", pickle.dumps(data))
+
+    async def update_conversation(self, name: str, key, new_state) -> None:
+        value = _DELETE if new_state is None else pickle.dumps(new_state)
+        self._queue("conversations", (name, json.dumps(list(key))), value)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._queue("user_data", user_id, _DELETE)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._queue("chat_data", chat_id, _DELETE)
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
+
+    # ---------- نوشتن دسته‌ای ----------
+
+    def _drain(self):
+        pending, self._pending = self._pending, {}
+        if self.state_store is not None:
+            now = time.time()
+            for user_id, values in self.state_store.drain_dirty().items():
+                pending[("user_states", user_id)] = _DELETE if values is None else (json.dumps(values), now)
+        return pending
+
+    def _requeue(self, pending: dict):
+        # مقدارهایی که در مدت نوشتن ناموفق به صف آمده‌اند جدیدترند و می‌مانند
+        for key, value in pending.items():
+            self._pending.setdefault(key, value)
+
+    def _write_batch(self, pending: dict):
+        with self._db_lock, self._conn:
+            for (table, key), value in pending.items():
+                if table == "conversations":
+                    name, conv_key = key
+                    if value is _DELETE:
+                        self._conn.execute("DELETE FROM conversations WHERE name = ? AND conv_key = ?", (name, conv_key))
+                    else:
+                        self._conn.execute("INSERT OR REPLACE INTO conversations VALUES (?, ?, ?)", (name, conv_key, value))
+                    continue
+
+                column = {"user_data": "user_id", "chat_data": "chat_id", "kv": "name", "user_states": "user_id"}[table]
+                if value is _DELETE:
+                    self._conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (key,))
+                elif table == "user_states":
+                    self._conn.execute("INSERT OR REPLACE INTO user_states VALUES (?, ?, ?)", (key, *value))
+                else:
+                    self._conn.execute(f"INSERT OR REPLACE INTO {table} VALUES (?, ?)", (key, value))
+        self.writes += len(pending)
+        self.batches += 1
+
+    async def _write_pending(self, attempts: int = None) -> bool:
+        """
+        نوشتن صف تا خالی شدن (شامل چیزهایی که وسط نوشتن اضافه شده‌اند)؛ دسته ناموفق به صف
+        برمی‌گردد و با تأخیر رو به افزایش دوباره نوشته می‌شود. بعد از attempts خطای پشت سر هم False
+        """
+        delay = RETRY_DELAY
+        failures = 0
+        while True:
+            pending = self._drain()
+            if not pending:
+                return True
+            try:
+                await asyncio.to_thread(self._write_batch, pending)
+            except asyncio.CancelledError:
+                # نوشتن تکراری بی‌خطر است (INSERT OR REPLACE / DELETE)
+                self._requeue(pending)
+                raise
+            except Exception:
+                self._requeue(pending)
+                self.failures += 1
+                failures += 1
+                if attempts is not None and failures >= attempts:
+                    logger.exception("نوشتن persistence بعد از %d تلاش ناموفق ماند؛ %d مورد نوشته نشد",
+                                     failures, len(self._pending))
+                    return False
+                logger.exception("خطا در نوشتن persistence روی SQLite؛ تلاش دوباره بعد از %.1f ثانیه", delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RETRY_MAX_DELAY)
+            else:
+                delay = RETRY_DELAY
+                failures = 0
+
+    async def _flush_soon(self):
+        # یک tick صبر تا همه update_* های همین دوره PTB در صف جمع شوند
+        await asyncio.sleep(0)
+        await self._write_pending()
+
+    async def flush(self) -> None:
+        """
+        در خاموش شدن اپلیکیشن صدا زده می‌شود: هر چه مانده (با SHUTDOWN_ATTEMPTS تلاش) نوشته و اتصال بسته می‌شود
+        """
+        task = self._flush_task
+        if task is not None and not task.done():
+            # ممکن است در انتظار تلاش دوباره باشد؛ دسته‌اش به صف برمی‌گردد
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self._write_pending(SHUTDOWN_ATTEMPTS)
+        with self._db_lock:
+            self._conn.close()
@@ -0,0 +1,105 @@
+"""
+پروفایل پروسه در حال اجرا برای /debug/profile
+
+- sample(): یک thread جدا هر interval ثانیه stack های thread event loop (یا همه
+  thread ها) را با sys._current_frames() برمی‌دارد. خروجی به شکل collapsed
+  stacks است، یعنی هر سطر «frame;frame;... تعداد» که flamegraph.pl و speedscope
+  مستقیم می‌خوانند. خود loop متوقف نمی‌شود و هزینه فقط در همان مدت است.
+- cprofile(): cProfile روی thread event loop برای مدت مشخص، با خروجی متنی
+  pstats. cProfile فقط یال‌های caller → callee را دارد و stack کامل ندارد، پس
+  collapsed stack از آن ساخته نمی‌شود.
+در هر لحظه فقط یک پروفایل اجرا می‌شود.
+"""
+import io
+import os
+import sys
+import time
+import asyncio
+import pstats
+import cProfile
+import threading
+from collections import Counter
+
+MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", 60))
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_busy = False
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _short_path(filename: str) -> str:
+    if "site-packages" in filename:
+        return filename.rsplit("site-packages" + os.sep, 1)[-1]
+    if filename.startswith(ROOT):
+        return os.path.relpath(filename, ROOT)
+    return os.path.basename(filename)
+
+
+def _collect(seconds: float, interval: float, thread_id: int = None) -> Counter:
+    labels = {}  # code → برچسب frame
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    own = threading.get_ident()
+    stacks = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == own or (thread_id is not None and ident != thread_id):
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = f"{code.co_qualname} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+                stack.append(label)
+                frame = frame.f_back
+            if thread_id is None:
+                stack.append(f"thread {names.get(ident, ident)}")
+            stacks[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def _acquire(seconds: float) -> float:
+    global _busy
+    if _busy:
+        raise ProfilerBusy("another profile is running")
+    _busy = True
+    return min(max(seconds, 0.1), MAX_SECONDS)
+
+
+async def sample(seconds: float = 10.0, interval: float = 0.005, all_threads: bool = False) -> str:
+    """
+    پروفایل آماری به مدت seconds؛ خروجی collapsed stacks (پرتکرارترین اول)
+    """
+    global _busy
+    seconds = _acquire(seconds)
+    try:
+        thread_id = None if all_threads else threading.get_ident()
+        stacks = await asyncio.to_thread(_collect, seconds, max(interval, 0.001), thread_id)
+    finally:
+        _busy = False
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+async def cprofile(seconds: float = 10.0, sort: str = "cumulative", limit: int = 80) -> str:
+    """
+    cProfile روی event loop به مدت seconds؛ خروجی متن pstats
+    """
+    global _busy
+    seconds = _acquire(seconds)
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+    finally:
+        _busy = False
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats(sort).print_stats(limit)
+    return out.getvalue()
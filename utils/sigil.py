@@ -0,0 +1,138 @@
+"""
+ساخت تصویر sigil (PNG) از نقشه روز تولد با Pillow
+
+موقعیت ده سیاره روی یک دایره قرار می‌گیرد و به ترتیب به هم وصل می‌شود؛ رنگ
+زمینه از عنصر برج خورشید می‌آید. زمینه‌ها و glyph سیاره‌ها یک بار در هر پروسه
+ساخته و فقط کپی/paste می‌شوند. رندر در pool utils.executor انجام می‌شود و
+خروجی با hash ورودی‌ها روی دیسک (SIGIL_CACHE_DIR) می‌ماند؛ درخواست تکراری
+فقط مسیر فایل موجود را برمی‌گرداند.
+"""
+import os
+import hashlib
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from utils import astro, executor, metrics
+from utils.cache import DiskCache
+
+SIZE = int(os.environ.get("SIGIL_SIZE", 512))
+CACHE_DIR = os.environ.get(
+    "SIGIL_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "sigils")
+)
+# با تغییر ظاهر تصویر افزایش دهید تا فایل‌های قدیمی کش استفاده نشوند
+RENDER_VERSION = 1
+
+# رنگ‌های هر عنصر (آتش، خاک، باد، آب): بالای زمینه، پایین زمینه، خطوط
+_ELEMENT_COLORS = (
+    ((92, 18, 10), (214, 96, 28), (255, 224, 150)),
+    ((18, 48, 24), (96, 128, 60), (232, 240, 200)),
+    ((30, 40, 80), (120, 150, 210), (250, 250, 255)),
+    ((6, 20, 60), (24, 96, 140), (190, 240, 255)),
+)
+_GLYPH_LABELS = ("Su", "Mo", "Me", "Ve", "Ma", "Ju", "Sa", "Ur", "Ne", "Pl")
+
+# پیش‌رندر شده‌ها در هر پروسه: (عنصر، اندازه) → زمینه، (سیاره، اندازه) → glyph
+_backgrounds = {}
+_glyphs = {}
+
+disk_cache = DiskCache(CACHE_DIR)
+metrics.register_cache("sigil", disk_cache)
+
+
+def _background(element: int, size: int) -> Image.Image:
+    image = _backgrounds.get((element, size))
+    if image is None:
+        top, bottom, line = _ELEMENT_COLORS[element]
+        mask = Image.linear_gradient("L").resize((size, size))
+        image = Image.composite(Image.new("RGB", (size, size), bottom), Image.new("RGB", (size, size), top), mask)
+
+        draw = ImageDraw.Draw(image)
+        center, radius = size / 2, size * 0.42
+        draw.ellipse((center - radius, center - radius, center + radius, center + radius),
+                     outline=line, width=max(2, size // 128))
+        # دوازده خط کوتاه برای مرز برج‌ها
+        angles = np.radians(np.arange(12) * 30.0)
+        inner, outer = radius * 0.94, radius * 1.06
+        for cos, sin in zip(np.cos(angles).tolist(), np.sin(angles).tolist()):
+            draw.line((center + inner * cos, center - inner * sin, center + outer * cos, center - outer * sin),
+                      fill=line, width=max(1, size // 256))
+        _backgrounds[(element, size)] = image
+    return image
+
+
+def _glyph(planet: int, size: int) -> Image.Image:
+    glyph = _glyphs.get((planet, size))
+    if glyph is None:
+        side = max(16, size // 12)
+        glyph = Image.new("RGBA", (side, side), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(glyph)
+        draw.ellipse((1, 1, side - 2, side - 2), fill=(255, 255, 255, 230), outline=(20, 20, 20, 255))
+        font = ImageFont.load_default(size=side * 0.45)
+        draw.text((side / 2, side / 2), _GLYPH_LABELS[planet], fill=(20, 20, 20, 255), font=font, anchor="mm")
+        _glyphs[(planet, size)] = glyph
+    return glyph
+
+
+def prepare(size: int = SIZE):
+    """
+    ساخت از قبل همه زمینه‌ها و glyph ها برای یک اندازه (initializer هر worker)
+    """
+    for element in range(len(_ELEMENT_COLORS)):
+        _background(element, size)
+    for planet in range(len(_GLYPH_LABELS)):
+        _glyph(planet, size)
+
+
+def render(positions: np.ndarray, size: int = SIZE) -> Image.Image:
+    """
+    تصویر sigil از یک سطر (10, 3) خروجی astro.get_positions_batch
+    """
+    element = int(astro.sign_of(positions[0, 0])) % 4
+    image = _background(element, size).copy()
+    line = _ELEMENT_COLORS[element][2]
+
+    # حمل در سمت چپ (مثل نقشه‌های آسمان)؛ طول بیشتر خلاف جهت عقربه‌ها
+    angles = np.radians(180.0 + positions[:, 0])
+    radius = size * 0.34
+    xs = size / 2 + radius * np.cos(angles)
+    ys = size / 2 - radius * np.sin(angles)
+    points = list(zip(xs.tolist(), ys.tolist()))
+
+    draw = ImageDraw.Draw(image)
+    draw.line(points, fill=line, width=max(2, size // 170), joint="curve")
+    for planet, (x, y) in enumerate(points):
+        glyph = _glyph(planet, size)
+        image.paste(glyph, (int(x - glyph.width / 2), int(y - glyph.height / 2)), glyph)
+    return image
+
+
+def cache_key(birth_date, size: int = SIZE) -> str:
+    return hashlib.sha256(f"sigil:{RENDER_VERSION}:{astro.julian_day(birth_date)}:{size}".encode()).hexdigest()
+
+
+def render_to_file(path: str, birth_date, size: int = SIZE) -> str:
+    """
+    رندر و ذخیره روی دیسک (در worker اجرا می‌شود)
+    """
+    positions = astro.get_positions_batch([birth_date])[0]
+    tmp = f"{path}.{os.getpid()}.tmp"
+    render(positions, size).save(tmp, format="PNG", optimize=True)
+    os.replace(tmp, path)
+    return path
+
+
+async def _create(path: str, birth_date, size: int):
+    return await executor.run(render_to_file, path, birth_date, size)
+
+
+async def sigil_image(birth_date, size: int = SIZE) -> str:
+    """
+    مسیر PNG sigil؛ اگر قبلاً ساخته شده فقط از دیسک خوانده می‌شود
+    """
+    return await disk_cache.get_or_create(cache_key(birth_date, size), _create, birth_date, size)
+
+
+def stats() -> dict:
+    return disk_cache.stats()
@@ -0,0 +1,165 @@
+"""
+نگهداری وضعیت گفتگوی کاربران با سقف حافظه و حذف خودکار گفتگوهای رها شده
+
+به جای dict های سراسری یا context.user_data برای مقادیر نیمه‌کاره گفتگو
+(زبان، نوع تقویم، سال، ماه، روز، ساعت) استفاده می‌شود.
+"""
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+STATE_TTL = float(os.environ.get("USER_STATE_TTL", 1800))
+STATE_MAX_ENTRIES = int(os.environ.get("USER_STATE_MAX", 100000))
+
+
+class UserState:
+    __slots__ = ("lang", "calendar", "year", "month", "day", "hour", "minute", "touched")
+
+    def __init__(self):
+        self.lang = None
+        self.calendar = None
+        self.year = None
+        self.month = None
+        self.day = None
+        self.hour = None
+        self.minute = None
+        self.touched = time.monotonic()
+
+    def as_dict(self) -> dict:
+        """
+        خروجی dict برای توابعی مثل astro.get_prediction که user_data می‌گیرند
+        """
+        return {name: getattr(self, name) for name in self.__slots__[:-1] if getattr(self, name) is not None}
+
+    def has_date(self) -> bool:
+        """
+        سال، ماه و روز ثبت شده‌اند؛ برای رکوردی که وسط گفتگو منقضی شده و از نو ساخته شده False است
+        """
+        return None not in (self.year, self.month, self.day)
+
+
+class UserStateStore:
+    """
+    user_id → UserState با ترتیب LRU، حذف بر اساس TTL و سقف تعداد
+    """
+
+    def __init__(self, ttl: float = STATE_TTL, max_entries: int = STATE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+        # کاربرانی که از آخرین drain_dirty تغییر کرده‌اند؛ فقط بعد از track_changes()
+        self._dirty = None
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._states)
+
+    def _mark(self, user_id):
+        if self._dirty is not None:
+            self._dirty.add(user_id)
+
+    def track_changes(self):
+        """
+        فعال کردن ثبت تغییرات برای drain_dirty (توسط utils.persistence)
+        """
+        if self._dirty is None:
+            self._dirty = set()
+
+    def __contains__(self, user_id):
+        return self.peek(user_id) is not None
+
+    def _expire(self, now: float):
+        # قدیمی‌ترین رکوردها ابتدای OrderedDict هستند؛ با اولین رکورد تازه متوقف می‌شود
+        states = self._states
+        while states:
+            user_id, state = next(iter(states.items()))
+            if now - state.touched < self.ttl:
+                break
+            del states[user_id]
+            self._mark(user_id)
+            self.expired += 1
+
+    def get(self, user_id) -> UserState:
+        """
+        وضعیت کاربر (در صورت نبود، یک رکورد خالی ساخته می‌شود)
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            state = self._states.get(user_id)
+            if state is None:
+                state = self._states[user_id] = UserState()
+                if len(self._states) > self.max_entries:
+                    evicted_id, _ = self._states.popitem(last=False)
+                    self._mark(evicted_id)
+                    self.evicted += 1
+            else:
+                self._states.move_to_end(user_id)
+            state.touched = now
+            self._mark(user_id)
+            return state
+
+    def peek(self, user_id):
+        """
+        وضعیت کاربر بدون ساختن رکورد جدید؛ رکورد منقضی None برمی‌گرداند
+        """
+        with self._lock:
+            self._expire(time.monotonic())
+            return self._states.get(user_id)
+
+    def pop(self, user_id):
+        """
+        حذف وضعیت در پایان یا لغو گفتگو؛ مثل peek رکورد منقضی None برمی‌گرداند
+        """
+        with self._lock:
+            self._expire(time.monotonic())
+            self._mark(user_id)
+            return self._states.pop(user_id, None)
+
+    def drain_dirty(self) -> dict:
+        """
+        user_id → as_dict() برای رکوردهای تغییر کرده، یا None برای رکوردهای حذف شده
+        """
+        with self._lock:
+            dirty, self._dirty = self._dirty or set(), set()
+            changes = {}
+            for user_id in dirty:
+                state = self._states.get(user_id)
+                changes[user_id] = state.as_dict() if state is not None else None
+            return changes
+
+    def restore(self, user_id, values: dict):
+        """
+        بازگرداندن رکورد ذخیره شده هنگام راه‌اندازی مجدد
+        """
+        state = UserState()
+        for name, value in values.items():
+            if name in UserState.__slots__ and name != "touched":
+                setattr(state, name, value)
+        with self._lock:
+            self._states[user_id] = state
+
+    def stats(self) -> dict:
+        with self._lock:
+            states = list(self._states.values())
+        size = sys.getsizeof(self._states)
+        for state in states:
+            size += sys.getsizeof(state)
+            for name in UserState.__slots__:
+                value = getattr(state, name)
+                if value is not None and not isinstance(value, (int, float)):
+                    size += sys.getsizeof(value)
+        return {
+            "entries": len(states),
+            "approx_bytes": size,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+# نمونه مشترک هر پروسه
+user_states = UserStateStore()
@@ -0,0 +1,176 @@
+"""
+سازگاری نقشه تولد (synastry) یک کاربر با همه پروفایل‌های ذخیره شده
+
+برای هر کاربر یک بردار ویژگی ثابت نگه داشته می‌شود: cos و sin ضرایب طول هر
+سیاره (k × طول برای هارمونیک‌های HARMONICS). چون cos(k(a - b)) = cos ka·cos kb +
+sin ka·sin kb، امتیاز وزن‌دار همه جفت‌سیاره‌های SYNASTRY_PAIRS و همه زاویه‌ها
+برای همه پروفایل‌ها فقط یک ضرب ماتریس در بردار است و top-k با argpartition
+انتخاب می‌شود. ماتریس با upsert/remove به صورت افزایشی به‌روز می‌شود.
+"""
+import threading
+
+import numpy as np
+
+from utils import astro
+
+# هارمونیک → وزن: ۱ مقارنه (+) و مقابله (−)، ۳ تثلیث، ۴ تربیع و مقابله (تنش)
+HARMONICS = {1: 1.0, 3: 0.8, 4: -0.6}
+# (سیاره نفر اول، سیاره نفر دوم) → وزن؛ اندیس‌ها به ترتیب astro.PLANET_CODES
+SYNASTRY_PAIRS = {
+    (0, 1): 1.0, (1, 0): 1.0,   # خورشید / ماه
+    (3, 4): 1.0, (4, 3): 1.0,   # ناهید / مریخ
+    (0, 0): 0.5, (1, 1): 0.7, (3, 3): 0.5,
+    (0, 3): 0.4, (3, 0): 0.4, (1, 3): 0.4, (3, 1): 0.4,
+    (2, 2): 0.3, (6, 0): -0.3, (6, 1): -0.3,
+}
+# فقط سیاراتی که در جفت‌ها هستند در ماتریس نگه داشته می‌شوند
+BODIES = tuple(sorted({body for pair in SYNASTRY_PAIRS for body in pair}))
+_HARMONICS = np.array(list(HARMONICS))
+_BODY_COLUMN = {body: i for i, body in enumerate(BODIES)}
+FEATURES = len(BODIES) * len(_HARMONICS) * 2
+# بیشترین مقدار ممکن امتیاز خام، برای نمایش درصد
+_MAX_SCORE = sum(abs(w) for w in SYNASTRY_PAIRS.values()) * sum(abs(w) for w in HARMONICS.values())
+
+
+def features(longitudes) -> np.ndarray:
+    """
+    بردار ویژگی از طول سیارات (10,) یا چند نقشه (N, 10)؛ خروجی float32 با شکل (..., FEATURES)
+    """
+    longitudes = np.radians(np.asarray(longitudes, dtype=float)[..., BODIES])
+    angles = longitudes[..., :, None] * _HARMONICS
+    stacked = np.concatenate((np.cos(angles), np.sin(angles)), axis=-1)
+    return stacked.reshape(*stacked.shape[:-2], FEATURES).astype(np.float32)
+
+
+def query_vector(longitudes) -> np.ndarray:
+    """
+    بردار q به طوری که features(B) @ q امتیاز سازگاری نقشه longitudes با نقشه B باشد
+    """
+    longitudes = np.radians(np.asarray(longitudes, dtype=float))
+    q = np.zeros((len(BODIES), len(_HARMONICS), 2))
+    weights = np.array(list(HARMONICS.values()))
+    for (mine, theirs), weight in SYNASTRY_PAIRS.items():
+        angles = longitudes[mine] * _HARMONICS
+        column = _BODY_COLUMN[theirs]
+        q[column, :, 0] += weight * weights * np.cos(angles)
+        q[column, :, 1] += weight * weights * np.sin(angles)
+    # هم‌ترتیب با features: برای هر سیاره اول همه cos ها و بعد همه sin ها
+    return q.transpose(0, 2, 1).reshape(FEATURES).astype(np.float32)
+
+
+def percent(scores) -> np.ndarray:
+    return np.round((np.asarray(scores, dtype=float) / _MAX_SCORE + 1) * 50, 1)
+
+
+class SynastryIndex:
+    """
+    user_id → سطر ماتریس ویژگی (N, FEATURES)؛ حذف با جابه‌جایی آخرین سطر
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._features = np.zeros((capacity, FEATURES), dtype=np.float32)
+        self._user_ids = np.zeros(capacity, dtype=np.int64)
+        self._rows = {}
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.updates = 0
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, user_id):
+        return user_id in self._rows
+
+    def _grow(self, needed: int):
+        capacity = len(self._user_ids)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        features_, user_ids = self._features, self._user_ids
+        self._features = np.zeros((capacity, FEATURES), dtype=np.float32)
+        self._user_ids = np.zeros(capacity, dtype=np.int64)
+        self._features[:len(features_)] = features_
+        self._user_ids[:len(user_ids)] = user_ids
+
+    def upsert_many(self, user_ids, longitudes):
+        """
+        افزودن یا به‌روزرسانی چند پروفایل؛ longitudes با شکل (N, 10)
+        """
+        rows = features(longitudes)
+        user_ids = list(user_ids)
+        indices = np.empty(len(user_ids), dtype=np.intp)
+        with self._lock:
+            self._grow(len(self._rows) + len(user_ids))
+            for n, user_id in enumerate(user_ids):
+                index = self._rows.get(user_id)
+                if index is None:
+                    index = self._rows[user_id] = len(self._rows)
+                indices[n] = index
+            self._user_ids[indices] = user_ids
+            self._features[indices] = rows
+            self.updates += len(user_ids)
+
+    def upsert(self, user_id: int, birth_date):
+        self.upsert_many([user_id], astro.get_positions_batch([birth_date])[:, :, 0])
+
+    def load(self, profiles: dict):
+        """
+        ساخت یکجا از user_id → تاریخ تولد (موقعیت‌ها با get_positions_batch برداری محاسبه می‌شوند)
+        """
+        if profiles:
+            user_ids = list(profiles)
+            self.upsert_many(user_ids, astro.get_positions_batch([profiles[u] for u in user_ids])[:, :, 0])
+
+    def remove(self, user_id: int):
+        with self._lock:
+            index = self._rows.pop(user_id, None)
+            if index is None:
+                return
+            last = len(self._rows)
+            if index != last:
+                moved = int(self._user_ids[last])
+                self._features[index] = self._features[last]
+                self._user_ids[index] = moved
+                self._rows[moved] = index
+            self.updates += 1
+
+    def top_k(self, longitudes, k: int = 10, exclude: int = None) -> list:
+        """
+        k پروفایل با بیشترین سازگاری با نقشه longitudes: [(user_id, درصد), ...] نزولی
+        """
+        q = query_vector(longitudes)
+        with self._lock:
+            size = len(self._rows)
+            scores = self._features[:size] @ q
+            if exclude in self._rows:
+                scores[self._rows[exclude]] = -np.inf
+            k = min(k, size - (exclude in self._rows))
+            if k <= 0:
+                return []
+            best = np.argpartition(scores, size - k)[size - k:]
+            best = best[np.argsort(scores[best])[::-1]]
+            user_ids = self._user_ids[best].tolist()
+        self.queries += 1
+        return list(zip(user_ids, percent(scores[best]).tolist()))
+
+    def matches(self, user_id: int, birth_date, k: int = 10) -> list:
+        return self.top_k(astro.get_positions_batch([birth_date])[0, :, 0], k, exclude=user_id)
+
+    def stats(self) -> dict:
+        return {
+            "profiles": len(self._rows),
+            "bytes": self._features.nbytes + self._user_ids.nbytes,
+            "queries": self.queries,
+            "updates": self.updates,
+        }
+
+
+def pair_score(longitudes_a, longitudes_b) -> float:
+    """
+    امتیاز (درصد) یک جفت نقشه؛ معادل top_k ولی برای دو نفر
+    """
+    return float(percent(features(longitudes_b) @ query_vector(longitudes_a)))
+
+
+# نمونه مشترک هر پروسه (کاربرانی که /match را فعال کرده‌اند)
+synastry_index = SynastryIndex()
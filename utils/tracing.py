@@ -0,0 +1,158 @@
+"""
+ردگیری نمونه‌برداری شده هر آپدیت (span) با ring buffer در حافظه
+
+از هر TRACE_SAMPLE_RATE آپدیت یکی در وبهوک انتخاب می‌شود. زمان هر مرحله‌اش به
+صورت یک span ثبت می‌شود:
+- de_json در وبهوک؛
+- انتظار در صف ingress؛
+- process_update (dispatch هندلرها و ConversationHandler)؛
+- هر هندلر؛
+- کارهای executor (محاسبات astro)؛
+- درخواست‌های Bot API و انتظار محدودکننده نرخ.
+trace فعال در یک ContextVar است، پس span() در هر جای کد بدون پاس دادن
+پارامتر کار می‌کند و برای آپدیت‌های نمونه‌برداری نشده فقط یک ContextVar.get
+هزینه دارد. trace های تمام شده در یک deque با طول TRACE_BUFFER می‌مانند و
+/debug/traces کندترین‌هایشان را برمی‌گرداند.
+"""
+import os
+import time
+import random
+import contextvars
+from collections import OrderedDict, deque
+from contextlib import nullcontext
+
+SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", 0.05))
+BUFFER = int(os.environ.get("TRACE_BUFFER", 200))
+
+_current = contextvars.ContextVar("trace", default=None)
+_NULL = nullcontext()
+
+
+class Trace:
+    """
+    span های یک آپدیت؛ هر span: (نام، شروع نسبت به trace، مدت، عمق)
+    """
+
+    __slots__ = ("update_id", "kind", "wall", "started", "enqueued", "duration", "spans", "_depth")
+
+    def __init__(self, update_id, kind: str, started: float = None):
+        self.update_id = update_id
+        self.kind = kind
+        self.wall = time.time()
+        self.started = time.perf_counter() if started is None else started
+        self.enqueued = None
+        self.duration = None
+        self.spans = []
+        self._depth = 0
+
+    def add(self, name: str, start: float, end: float, depth: int = None):
+        self.spans.append((name, start - self.started, end - start, self._depth if depth is None else depth))
+
+    def span(self, name: str):
+        return _Span(self, name)
+
+    def to_dict(self) -> dict:
+        return {
+            "update_id": self.update_id,
+            "type": self.kind,
+            "at": self.wall,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "spans": [
+                {"name": name, "start_ms": round(start * 1000, 3), "duration_ms": round(duration * 1000, 3),
+                 "depth": depth}
+                for name, start, duration, depth in sorted(self.spans, key=lambda s: (s[1], s[3]))
+            ],
+        }
+
+
+class _Span:
+    __slots__ = ("_trace", "_name", "_start", "_depth")
+
+    def __init__(self, trace: Trace, name: str):
+        self._trace = trace
+        self._name = name
+
+    def __enter__(self):
+        trace = self._trace
+        self._depth = trace._depth
+        trace._depth += 1
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        trace = self._trace
+        trace._depth -= 1
+        trace.add(self._name, self._start, time.perf_counter(), self._depth)
+
+
+def span(name: str):
+    """
+    context manager زمان یک مرحله در trace فعلی (اگر آپدیت نمونه‌برداری نشده باشد کاری نمی‌کند)
+    """
+    trace = _current.get()
+    if trace is None:
+        return _NULL
+    return _Span(trace, name)
+
+
+class Tracer:
+    """
+    انتخاب آپدیت‌ها، نگه‌داری trace بین وبهوک و ingress و ring buffer نتایج
+    """
+
+    def __init__(self, sample_rate: float = SAMPLE_RATE, capacity: int = BUFFER):
+        self.sample_rate = sample_rate
+        self.traces = deque(maxlen=capacity)
+        # update_id → trace آپدیت‌هایی که هنوز در صف ingress هستند
+        self._pending = OrderedDict()
+        self._pending_limit = capacity * 10
+
+        self.seen = 0
+        self.sampled = 0
+
+    def begin(self, update_id, kind: str, started: float = None):
+        """
+        trace جدید برای آپدیت یا None اگر نمونه‌برداری نشود؛ started زمان رسیدن درخواست (perf_counter)
+        """
+        self.seen += 1
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        self.sampled += 1
+        trace = self._pending[update_id] = Trace(update_id, kind, started)
+        while len(self._pending) > self._pending_limit:
+            self._pending.popitem(last=False)  # تکراری یا کنار گذاشته شده در ingress
+        return trace
+
+    def resume(self, update_id):
+        """
+        فعال کردن trace آپدیت در context همین task (ابتدای پردازش در ingress)
+        """
+        trace = self._pending.pop(update_id, None)
+        if trace is None:
+            return None, None
+        if trace.enqueued is not None:
+            trace.add("ingress.queue", trace.enqueued, time.perf_counter())
+        return trace, _current.set(trace)
+
+    def finish(self, trace: Trace, token):
+        _current.reset(token)
+        trace.duration = time.perf_counter() - trace.started
+        self.traces.append(trace)
+
+    def slowest(self, min_ms: float = 0.0, limit: int = 20) -> list:
+        traces = [t for t in list(self.traces) if t.duration * 1000 >= min_ms]
+        traces.sort(key=lambda t: t.duration, reverse=True)
+        return [t.to_dict() for t in traces[:limit]]
+
+    def stats(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "seen": self.seen,
+            "sampled": self.sampled,
+            "buffered": len(self.traces),
+            "pending": len(self._pending),
+        }
+
+
+# نمونه مشترک
+tracer = Tracer()
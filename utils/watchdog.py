@@ -0,0 +1,196 @@
+"""
+پایش تأخیر event loop و پیدا کردن فراخوانی‌های همزمان (blocking) روی آن
+
+یک coroutine هر LOOP_LAG_INTERVAL ثانیه بیدار می‌شود و فاصله بیدار شدن واقعی
+تا زمان مورد انتظار (lag) را در هیستوگرام bot_event_loop_lag_seconds ثبت
+می‌کند. یک thread نگهبان زمان آخرین بیدار شدن را می‌پاید؛ اگر loop بیش از
+LOOP_BLOCK_THRESHOLD ثانیه جواب نداده باشد، stack همان لحظه thread loop را
+برمی‌دارد. این stack همان کد همزمانی را نشان می‌دهد که loop را بسته است (مثلاً
+swe.calc، تبدیل JalaliDate یا رسم Pillow داخل یک هندلر). آن stack همراه نام
+task در حال اجرا لاگ می‌شود، ولی برای هر محل حداکثر یک بار در
+LOOP_BLOCK_LOG_INTERVAL ثانیه.
+با LOOP_MONITOR=0 غیرفعال است.
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import deque
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("LOOP_MONITOR", "1") != "0"
+INTERVAL = float(os.environ.get("LOOP_LAG_INTERVAL", 0.05))
+THRESHOLD = float(os.environ.get("LOOP_BLOCK_THRESHOLD", 0.1))
+LOG_INTERVAL = float(os.environ.get("LOOP_BLOCK_LOG_INTERVAL", 60))
+# تعداد نمونه‌های اخیر lag برای صدک‌های /stats و /metrics
+WINDOW = int(os.environ.get("LOOP_LAG_WINDOW", 1200))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+lag_seconds = metrics.Histogram("bot_event_loop_lag_seconds", "Event loop wake-up delay")
+blocks_total = metrics.Counter("bot_event_loop_blocks_total", "Loop blocked longer than the threshold",
+                               ("location",))
+
+
+def _location(frame) -> str:
+    """
+    درونی‌ترین frame کد خود پروژه (نه کتابخانه‌ها) به شکل file:line function
+    """
+    fallback = None
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename
+        if fallback is None:
+            fallback = f"{os.path.basename(filename)}:{frame.f_lineno} {code.co_name}"
+        if filename.startswith(ROOT) and "site-packages" not in filename:
+            return f"{os.path.relpath(filename, ROOT)}:{frame.f_lineno} {code.co_name}"
+        frame = frame.f_back
+    return fallback or "unknown"
+
+
+class LoopMonitor:
+    """
+    اندازه‌گیری lag با heartbeat روی loop و گرفتن stack با thread نگهبان
+    """
+
+    def __init__(self, interval: float = INTERVAL, threshold: float = THRESHOLD,
+                 log_interval: float = LOG_INTERVAL, window: int = WINDOW):
+        self.interval = interval
+        self.threshold = threshold
+        self.log_interval = log_interval
+
+        self._lags = deque(maxlen=window)
+        self._loop = None
+        self._thread_id = None
+        self._beat = 0.0
+        self._reported = None
+        self._heartbeat = None
+        self._watcher = None
+        self._stopping = threading.Event()
+        # محل → (زمان آخرین لاگ، تعداد لاگ نشده از آن زمان)
+        self._logged = {}
+        self.recent_blocks = deque(maxlen=20)
+        self._last_block = None
+
+        self.blocks = 0
+        self.max_lag = 0.0
+
+    # ---------- heartbeat روی loop ----------
+
+    async def _run(self):
+        observe = lag_seconds.labels().observe
+        lags = self._lags
+        interval = self.interval
+        while True:
+            expected = time.monotonic() + interval
+            self._beat = expected
+            await asyncio.sleep(interval)
+            lag = max(0.0, time.monotonic() - expected)
+            observe(lag)
+            lags.append(lag)
+            if self._reported == expected and self._last_block is not None:
+                # مدت کامل گیر کردنی که نگهبان وسطش stack را برداشته بود
+                self._last_block["blocked_ms"] = round(lag * 1000, 1)
+            if lag > self.max_lag:
+                self.max_lag = lag
+
+    # ---------- thread نگهبان ----------
+
+    def _watch(self):
+        check = self.threshold / 2
+        while not self._stopping.wait(check):
+            beat = self._beat
+            blocked = time.monotonic() - beat
+            # هر گیر کردن فقط یک بار (تا heartbeat بعدی) ثبت می‌شود
+            if blocked < self.threshold or beat == self._reported:
+                continue
+            self._reported = beat
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            try:
+                self._report(frame, blocked)
+            finally:
+                del frame
+
+    def _report(self, frame, blocked: float):
+        location = _location(frame)
+        task = asyncio.current_task(self._loop)
+        task_name = task.get_name() if task is not None else None
+        self.blocks += 1
+        blocks_total.labels(location).inc()
+        self._last_block = {
+            "location": location,
+            "task": task_name,
+            "blocked_ms": round(blocked * 1000, 1),
+            "at": time.time(),
+        }
+        self.recent_blocks.append(self._last_block)
+
+        now = time.monotonic()
+        last, suppressed = self._logged.get(location, (None, 0))
+        if last is not None and now - last < self.log_interval:
+            self._logged[location] = (last, suppressed + 1)
+            return
+        self._logged[location] = (now, 0)
+        stack = "".join(traceback.format_stack(frame))
+        logger.warning("event loop blocked for %.0f ms at %s (task %s, %d similar suppressed)\n%s",
+                       blocked * 1000, location, task_name, suppressed, stack)
+
+    # ---------- چرخه عمر ----------
+
+    def start(self):
+        if not ENABLED or self._heartbeat is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopping.clear()
+        self._heartbeat = self._loop.create_task(self._run(), name="loop-monitor")
+        self._watcher = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watcher.start()
+
+    async def stop(self):
+        if self._heartbeat is None:
+            return
+        self._stopping.set()
+        self._heartbeat.cancel()
+        try:
+            await self._heartbeat
+        except asyncio.CancelledError:
+            pass
+        self._heartbeat = None
+        self._watcher.join()
+        self._watcher = None
+
+    # ---------- گزارش ----------
+
+    def quantiles(self) -> dict:
+        lags = sorted(self._lags)
+        if not lags:
+            return {}
+        return {q: lags[min(len(lags) - 1, int(q * len(lags)))] for q in QUANTILES}
+
+    def stats(self) -> dict:
+        return {
+            "running": self._heartbeat is not None,
+            "threshold_ms": self.threshold * 1000,
+            "lag_ms": {f"p{round(q * 100)}": round(v * 1000, 2) for q, v in self.quantiles().items()},
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "blocks": self.blocks,
+            "recent_blocks": list(self.recent_blocks),
+        }
+
+
+# نمونه مشترک
+loop_monitor = LoopMonitor()
+
+metrics.Gauge("bot_event_loop_lag_recent_seconds", "Event loop lag quantiles over the recent window", ("quantile",),
+              func=lambda: {str(q): v for q, v in loop_monitor.quantiles().items()})
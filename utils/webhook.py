@@ -0,0 +1,248 @@
+"""
+ورودی وبهوک asyncio (aiohttp) روی همان event loop اپلیکیشن تلگرام
+
+جایگزین مسیر Flask → update_queue: هدر X-Telegram-Bot-Api-Secret-Token بررسی،
+آپدیت در صف محدود utils.ingress قرار داده و پاسخ بلافاصله برگردانده می‌شود.
+متریک‌های utils.metrics روی GET /metrics همین سرور (با METRICS_TOKEN اختیاری)
+در قالب Prometheus در دسترس‌اند. utils.watchdog در طول اجرا تأخیر event loop و
+فراخوانی‌های blocking روی آن را می‌پاید. با DEBUG_TOKEN مسیرهای /debug/traces
+(کندترین trace های utils.tracing) و /debug/profile (پروفایل زنده با
+utils.profiler) فعال می‌شوند.
+"""
+import os
+import hmac
+import signal
+import asyncio
+import hashlib
+import logging
+import time
+from urllib.parse import urlparse
+
+from aiohttp import web
+from telegram import Update
+
+from utils import lazy, metrics, profiler
+from utils.broadcast import daily_broadcast
+from utils.ingress import UpdateIngress
+from utils.media import file_ids
+from utils.outbound import rate_limiter
+from utils.state import user_states
+from utils.tracing import tracer
+from utils.watchdog import loop_monitor
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+# بدون DEBUG_TOKEN مسیرهای /debug/* وجود ندارند (404)
+DEBUG_TOKEN = os.environ.get("DEBUG_TOKEN")
+
+request_seconds = metrics.Histogram("bot_webhook_request_seconds", "Webhook POST handling time (until ack)")
+updates_total = metrics.Counter("bot_updates_total", "Updates received by type", ("type",))
+rejected_total = metrics.Counter("bot_webhook_rejected_total", "Webhook bodies that are not a valid Update",
+                                 ("reason",))
+metrics.Gauge("bot_user_states", "Entries in the in-memory user state store", func=lambda: len(user_states))
+
+
+def default_secret_token(bot_token: str) -> str:
+    """
+    WEBHOOK_SECRET یا در نبود آن یک مقدار ثابت مشتق از توکن ربات
+    (حروف مجاز تلگرام: A-Z a-z 0-9 _ -)
+    """
+    secret = os.environ.get("WEBHOOK_SECRET")
+    if secret:
+        return secret
+    return hashlib.sha256(f"webhook:{bot_token}".encode()).hexdigest()
+
+
+def _authorized(request: web.Request, token: str) -> bool:
+    """
+    توکن در هدر Authorization: Bearer یا پارامتر ?token=
+    """
+    received = request.headers.get("Authorization", "").removeprefix("Bearer ") or request.query.get("token", "")
+    return hmac.compare_digest(received.encode(), token.encode())
+
+
+def create_webhook_app(application, path: str = "/webhook", secret_token: str = None,
+                       ingress: UpdateIngress = None) -> web.Application:
+    """
+    ساخت اپلیکیشن aiohttp با مسیر POST وبهوک و مسیر GET / برای health check
+
+    بدون ingress آپدیت‌ها مستقیم در application.update_queue قرار می‌گیرند.
+    """
+    expected = secret_token.encode() if secret_token else None
+
+    async def handle_update(request: web.Request) -> web.Response:
+        start = time.perf_counter()
+        if expected is not None:
+            received = request.headers.get(SECRET_HEADER, "").encode()
+            if not hmac.compare_digest(received, expected):
+                return web.Response(status=403)
+        try:
+            data = await request.json()
+        except ValueError:
+            rejected_total.labels("json").inc()
+            return web.Response(status=400)
+        if not isinstance(data, dict):
+            rejected_total.labels("not_object").inc()
+            return web.Response(status=400)
+
+        # نوع آپدیت: تنها کلید غیر از update_id (message، callback_query، ...)
+        kind = next((key for key in data if key != "update_id"), "unknown")
+        updates_total.labels(kind).inc()
+        trace = tracer.begin(data.get("update_id"), kind, start)
+        try:
+            if trace is not None:
+                trace.add("webhook.receive", start, time.perf_counter())
+                with trace.span("de_json"):
+                    update = Update.de_json(data, application.bot)
+            else:
+                update = Update.de_json(data, application.bot)
+            if update is None:
+                raise ValueError("empty update")
+        except Exception:
+            # 200 تا تلگرام همان آپدیت خراب را دوباره نفرستد
+            rejected_total.labels("de_json").inc()
+            logger.warning("آپدیت نامعتبر کنار گذاشته شد (update_id=%s)", data.get("update_id"), exc_info=True)
+            return web.Response(text="ok")
+        if ingress is not None:
+            ingress.submit(update)
+        else:
+            application.update_queue.put_nowait(update)
+        if trace is not None:
+            trace.enqueued = time.perf_counter()
+        request_seconds.observe(time.perf_counter() - start)
+        return web.Response(text="ok")
+
+    async def index(request: web.Request) -> web.Response:
+        return web.Response(text="ربات فعال است!")
+
+    async def stats(request: web.Request) -> web.Response:
+        return web.json_response({
+            "ingress": ingress.stats() if ingress is not None else {},
+            "user_states": user_states.stats(),
+            "outbound": rate_limiter.stats(),
+            "broadcast": daily_broadcast.stats(),
+            "file_ids": file_ids.stats(),
+            "lazy_imports": lazy.stats(),
+            "event_loop": loop_monitor.stats(),
+            "tracing": tracer.stats(),
+        })
+
+    async def metrics_endpoint(request: web.Request) -> web.Response:
+        if METRICS_TOKEN and not _authorized(request, METRICS_TOKEN):
+            return web.Response(status=403)
+        return web.Response(body=metrics.render().encode(), headers={"Content-Type": metrics.CONTENT_TYPE})
+
+    async def debug_traces(request: web.Request) -> web.Response:
+        """
+        ?min_ms=حداقل مدت&limit=تعداد؛ کندترین trace های ring buffer
+        """
+        if not _authorized(request, DEBUG_TOKEN):
+            return web.Response(status=403)
+        try:
+            min_ms = float(request.query.get("min_ms", 0))
+            limit = int(request.query.get("limit", 20))
+        except ValueError:
+            return web.Response(status=400)
+        return web.json_response(dict(tracer.stats(), traces=tracer.slowest(min_ms, limit)))
+
+    async def debug_profile(request: web.Request) -> web.Response:
+        """
+        ?seconds=10&mode=sample|cprofile؛ sample با interval و threads=all اختیاری
+        خروجی collapsed stacks می‌دهد و cprofile (با sort اختیاری) متن pstats
+        """
+        if not _authorized(request, DEBUG_TOKEN):
+            return web.Response(status=403)
+        mode = request.query.get("mode", "sample")
+        sort = request.query.get("sort", "cumulative")
+        try:
+            seconds = float(request.query.get("seconds", 10))
+            interval = float(request.query.get("interval", 0.005))
+        except ValueError:
+            return web.Response(status=400)
+        if mode not in ("sample", "cprofile") or sort not in ("cumulative", "tottime", "calls"):
+            return web.Response(status=400)
+        try:
+            if mode == "sample":
+                text = await profiler.sample(seconds, interval, request.query.get("threads") == "all")
+            else:
+                text = await profiler.cprofile(seconds, sort)
+        except profiler.ProfilerBusy:
+            return web.Response(status=409, text="another profile is running")
+        return web.Response(text=text)
+
+    app = web.Application()
+    app["application"] = application
+    app["ingress"] = ingress
+    app.router.add_post(path, handle_update)
+    app.router.add_get("/", index)
+    app.router.add_get("/stats", stats)
+    app.router.add_get("/metrics", metrics_endpoint)
+    if DEBUG_TOKEN:
+        app.router.add_get("/debug/traces", debug_traces)
+        app.router.add_get("/debug/profile", debug_profile)
+    return app
+
+
+async def serve(application, webhook_url: str, port: int, path: str = None,
+                secret_token: str = None, host: str = "0.0.0.0"):
+    """
+    راه‌اندازی اپلیکیشن، سرور aiohttp و ثبت وبهوک؛ تا دریافت SIGTERM/SIGINT اجرا می‌ماند
+    """
+    path = path or urlparse(webhook_url).path or "/"
+    if secret_token is None:
+        secret_token = default_secret_token(application.bot.token)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    ingress = UpdateIngress(application)
+    runner = web.AppRunner(create_webhook_app(application, path, secret_token, ingress), access_log=None)
+    prewarm = None
+    try:
+        # اول پورت bind می‌شود تا بعد از cold start تلگرام/Render زودتر جواب بگیرند؛
+        # آپدیت‌های این فاصله در صف ingress می‌مانند تا ingress.start
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info("webhook server listening on %s:%s%s", host, port, path)
+
+        await application.initialize()
+        if application.post_init:
+            await application.post_init(application)
+        metrics.instrument_handlers(application)
+        await application.start()
+        ingress.start()
+
+        await application.bot.set_webhook(webhook_url, secret_token=secret_token, allowed_updates=Update.ALL_TYPES)
+        logger.info("Webhook set to: %s", webhook_url)
+        loop_monitor.start()
+
+        # بعد از post_init (ساخت worker های executor) تا fork وسط import انجام نشود
+        if lazy.PREWARM:
+            prewarm = asyncio.create_task(lazy.prewarm())
+
+        await stop.wait()
+    finally:
+        if prewarm is not None and not prewarm.done():
+            prewarm.cancel()
+        await loop_monitor.stop()
+        await runner.cleanup()
+        await ingress.stop()
+        if application.running:
+            await application.stop()
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+
+
+def run(application, webhook_url: str, port: int, path: str = None, secret_token: str = None):
+    """
+    نقطه ورود همزمان (sync) برای `if __name__ == "__main__"` فایل‌های ربات
+    """
+    asyncio.run(serve(application, webhook_url, port, path=path, secret_token=secret_token))